@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark các backend JSON của json_codec
+
+So sánh stdlib ``json`` với orjson/msgspec (nếu có cài) trên translation cache
+hiện tại (``translation_cache/translation_cache.json``), một cache tổng hợp
+cỡ lớn và response Google điển hình, kèm kích thước/thời gian của snapshot
+nhị phân.
+
+Ví dụ:
+    python benchmark_json.py
+    python benchmark_json.py --synthetic-mb 50 --repeat 3
+"""
+import argparse
+import hashlib
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import json_codec
+
+SYLLABLES = ['tấm', 'sắt', 'đồng', 'máy', 'lắp', 'ráp', 'băng', 'chuyền', 'lò', 'điện', 'khai', 'thác',
+             'nâng', 'cao', 'tốc', 'độ', 'nhanh', 'robot', 'tháp', 'pháo', 'năng', 'lượng', 'hơi', 'nước']
+
+
+def best_time(fn: Callable[[], object], repeat: int) -> float:
+    """Thời gian nhỏ nhất (giây) qua ``repeat`` lần chạy"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def synthetic_cache(target_bytes: int, seed: int) -> Dict[str, str]:
+    """Cache phẳng {md5: bản dịch} có kích thước JSON (indent=2) xấp xỉ target_bytes"""
+    rng = random.Random(seed)
+    cache = {}
+    size = 2
+    while size < target_bytes:
+        key = hashlib.md5(str(len(cache)).encode()).hexdigest()
+        value = ' '.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 12))).capitalize()
+        cache[key] = value
+        size += len(key) + len(value.encode('utf-8')) + 10
+    return cache
+
+
+def google_response(lines: int) -> bytes:
+    """Response Google (client=gtx) cho một chunk ``lines`` dòng"""
+    segments = [[f"Bản dịch số {i}\n", f"Translation number {i}\n", None, None, 10] for i in range(lines)]
+    return json_codec.dumps_bytes([segments, None, 'en'])
+
+
+def run_backends(name: str, data, repeat: int, backends: List[str]) -> List[Dict[str, object]]:
+    rows = []
+    for backend in backends:
+        json_codec.BACKEND = backend
+        encoded = json_codec.dumps_bytes(data, indent=True)
+        rows.append({
+            'dataset': name,
+            'backend': backend,
+            'bytes': len(encoded),
+            'load': best_time(lambda: json_codec.loads(encoded), repeat),
+            'dump': best_time(lambda: json_codec.dumps_bytes(data, indent=True), repeat),
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark JSON backends của json_codec")
+    parser.add_argument('--cache-file', default='translation_cache/translation_cache.json')
+    parser.add_argument('--synthetic-mb', type=float, default=50, help="Kích thước cache tổng hợp (MB, 0 = bỏ qua)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    selected = json_codec.BACKEND
+    backends = ['json'] + [name for name, module in (('orjson', json_codec.orjson), ('msgspec', json_codec.msgspec))
+                           if module is not None]
+    datasets = {}
+    cache_file = Path(args.cache_file)
+    if not cache_file.exists():
+        cache_file = cache_file.with_name(cache_file.name + '.migrated')
+    if cache_file.exists():
+        datasets[f"cache ({cache_file.stat().st_size / 1024:.0f} KB)"] = json_codec.load_file(cache_file)
+    if args.synthetic_mb:
+        datasets[f"synthetic ({args.synthetic_mb:g} MB)"] = synthetic_cache(int(args.synthetic_mb * 1024 * 1024),
+                                                                          args.seed)
+
+    rows = []
+    try:
+        for name, data in datasets.items():
+            rows.extend(run_backends(name, data, args.repeat, backends))
+
+        # Response Google: nhiều payload nhỏ, overhead mỗi lần gọi quan trọng hơn throughput
+        response = google_response(100)
+        for backend in backends:
+            json_codec.BACKEND = backend
+            rows.append({'dataset': 'google response x1000', 'backend': backend, 'bytes': len(response),
+                         'load': best_time(lambda: [json_codec.loads(response) for _ in range(1000)], args.repeat),
+                         'dump': None})
+    finally:
+        json_codec.BACKEND = selected
+
+    print(f"\n📊 JSON BENCHMARK (default backend: {selected}):")
+    print(f"{'dataset':28} {'backend':8} {'KB':>9} {'load ms':>9} {'dump ms':>9} {'speedup':>8}")
+    print("-" * 76)
+    baseline = {}
+    for row in rows:
+        if row['backend'] == 'json':
+            baseline[row['dataset']] = row['load'] + (row['dump'] or 0)
+        total = row['load'] + (row['dump'] or 0)
+        dump = f"{row['dump'] * 1000:9.2f}" if row['dump'] is not None else f"{'-':>9}"
+        print(f"{row['dataset']:28} {row['backend']:8} {row['bytes'] / 1024:9.1f} {row['load'] * 1000:9.2f} "
+              f"{dump} {baseline[row['dataset']] / total:7.1f}x")
+
+    print(f"\n💾 Binary snapshot ({'msgpack' if json_codec.msgspec else 'zlib JSON'}):")
+    for name, data in datasets.items():
+        snapshot = json_codec.dumps_binary(data)
+        text_size = len(json_codec.dumps_bytes(data, indent=True))
+        load = best_time(lambda: json_codec.loads_binary(snapshot), args.repeat)
+        dump = best_time(lambda: json_codec.dumps_binary(data), args.repeat)
+        print(f"{name:28} {len(snapshot) / 1024:9.1f} KB ({len(snapshot) / text_size:.0%} of JSON), "
+              f"load {load * 1000:.2f} ms, dump {dump * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Benchmark throughput của translation pipeline, chạy offline với mock server
+
+Chạy toàn bộ pipeline (đọc zip, parse, cache, dịch, ghép file) trên các pack
+trong ``Code mau`` và các mod tổng hợp, báo cáo strings/s, requests/s,
+cache hit rate và latency p50/p99. Có thể so sánh với baseline để phát hiện
+regression trên CI.
+
+Ví dụ:
+    python benchmark_translation.py --providers google,safe --synthetic-keys 10000
+    python benchmark_translation.py --output bench.json --baseline baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from google_translate_core import GoogleTranslateAPI
+from google_translate_safe import SafeGoogleTranslateAPI
+from instrumentation import start_tracer, stop_tracer
+from profiling import JobProfiler
+from mock_translate_server import MockServerConfig, MockTranslateServer
+from network_utils import DeepLAPI
+from translation_pipeline import TranslationPipeline
+from translation_router import DeepLProvider, GoogleProvider, SafeGoogleProvider, TranslationRouter
+
+
+SECTIONS = ['item-name', 'item-description', 'entity-name', 'entity-description',
+            'technology-name', 'technology-description', 'recipe-name', 'mod-setting-name',
+            'mod-setting-description', 'gui']
+ADJECTIVES = ['Advanced', 'Basic', 'Fast', 'Heavy', 'Improved', 'Armored', 'Toxic', 'Electric',
+              'Nuclear', 'Express', 'Compact', 'Reinforced']
+NOUNS = ['iron plate', 'copper cable', 'inserter', 'assembling machine', 'transport belt',
+         'mining drill', 'furnace', 'turret', 'robot', 'drone', 'biter', 'spawner', 'module',
+         'accumulator', 'solar panel', 'pipe', 'pump', 'wagon', 'loader', 'chest']
+PHRASES = ['Increases the speed of', 'Allows crafting of', 'Deals extra damage to',
+           'Reduces the energy consumption of', 'Unlocks a new tier of',
+           'Can be placed next to', 'Automatically refuels', 'Protects nearby']
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Percentile theo nearest-rank"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def build_mod_zip(zip_path: Path, mod_name: str, cfg_content: str):
+    """Đóng gói một cfg thành mod zip với locale/en"""
+    info = {"name": mod_name, "version": "1.0.0", "title": mod_name, "factorio_version": "2.0"}
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr(f"{mod_name}/info.json", json.dumps(info))
+        zipf.writestr(f"{mod_name}/locale/en/{mod_name}.cfg", cfg_content)
+
+
+def build_pack_mods(packs_dir: Path, work_dir: Path) -> List[Path]:
+    """Tạo mod zip từ các file cfg trong Code mau (mỗi cfg là một mod)"""
+    mod_paths = []
+    for cfg_path in sorted(packs_dir.glob('*/locale/*/*.cfg')):
+        mod_name = f"bench-{cfg_path.parent.parent.parent.name[-5:]}-{cfg_path.stem}"
+        zip_path = work_dir / f"{mod_name}.zip"
+        build_mod_zip(zip_path, mod_name, cfg_path.read_text(encoding='utf-8', errors='replace'))
+        mod_paths.append(zip_path)
+    return mod_paths
+
+
+def synthetic_cfg(key_count: int, seed: int) -> str:
+    """Sinh nội dung cfg tiếng Anh kiểu Factorio với các họ chuỗi theo tier"""
+    rng = random.Random(seed)
+    lines = []
+    per_section = max(1, key_count // len(SECTIONS))
+    written = 0
+    for section in SECTIONS:
+        lines.append(f"[{section}]")
+        for i in range(per_section):
+            if written >= key_count:
+                break
+            noun = rng.choice(NOUNS)
+            tier = rng.randint(1, 5)
+            if section.endswith('description'):
+                value = f"{rng.choice(PHRASES)} {rng.choice(ADJECTIVES).lower()} {noun} (tier {tier})."
+            else:
+                value = f"{rng.choice(ADJECTIVES)} {noun} {tier}"
+            lines.append(f"{section}-{i}={value}")
+            written += 1
+        lines.append("")
+    return '\n'.join(lines)
+
+
+def build_synthetic_mods(work_dir: Path, mod_count: int, key_count: int, seed: int) -> List[Path]:
+    mod_paths = []
+    for i in range(mod_count):
+        mod_name = f"bench-synthetic-{i}"
+        zip_path = work_dir / f"{mod_name}.zip"
+        build_mod_zip(zip_path, mod_name, synthetic_cfg(key_count, seed + i))
+        mod_paths.append(zip_path)
+    return mod_paths
+
+
+class LatencyRecorder:
+    """Ghi lại latency của mọi response qua requests hooks"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+
+    def attach(self, session):
+        session.hooks['response'].append(self._hook)
+
+    def _hook(self, response, *args, **kwargs):
+        self.latencies.append(response.elapsed.total_seconds())
+
+
+def make_translator(provider: str, server: MockTranslateServer, cache_dir: Path,
+                    recorder: LatencyRecorder):
+    """
+    Tạo translator trỏ tới mock server
+
+    Returns:
+        Tuple of (translate_fn, safe_translator hoặc None)
+    """
+    def google():
+        api = GoogleTranslateAPI(cache_dir=str(cache_dir))
+        api.base_url = server.google_url
+        api.rate_limit_delay = 0
+        api.chunk_delay = 0
+        recorder.attach(api.session)
+        return api
+
+    def safe():
+        api = SafeGoogleTranslateAPI(cache_dir=str(cache_dir))
+        api.base_url = server.google_url
+        api.min_delay = api.max_delay = api.current_delay = 0
+        api.max_requests_per_minute = api.max_requests_per_hour = 10 ** 9
+        recorder.attach(api.session)
+        return api
+
+    def deepl():
+        api = DeepLAPI("mock-key", endpoint="mock")
+        api.base_url = server.deepl_url
+        api.network.retry_delay = 0.01
+        recorder.attach(api.network.session)
+        return api
+
+    if provider == 'google':
+        api = google()
+        return (lambda texts: api.translate_texts(texts, 'VI', 'en')), None
+    if provider == 'safe':
+        api = safe()
+        return (lambda texts: api.translate_texts(texts, 'VI', 'en')), api
+    if provider == 'deepl':
+        api = deepl()
+        return (lambda texts: api.translate_texts_batch(texts, 'VI')), None
+    if provider == 'router':
+        safe_api = safe()
+        router = TranslationRouter([SafeGoogleProvider(safe_api), GoogleProvider(google()),
+                                    DeepLProvider(deepl())])
+        return (lambda texts: router.translate_texts(texts, 'VI', 'en')), safe_api
+    raise ValueError(f"Unknown provider: {provider}")
+
+
+def run_scenario(name: str, translate_fn, safe_api, pipeline: TranslationPipeline,
+                 mod_paths: List[Path], server: MockTranslateServer, recorder: LatencyRecorder,
+                 output_dir: Path, verbose: bool, trace_dir: Optional[str] = None,
+                 profile_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Chạy pipeline một lần và thu thập số liệu"""
+    recorder.latencies.clear()
+    before = server.config.snapshot()
+    if safe_api:
+        for key in safe_api.stats:
+            safe_api.stats[key] = 0
+
+    sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    if trace_dir:
+        start_tracer(name.replace('/', '_'), trace_dir)
+    profiler = JobProfiler(name.replace('/', '_'), profile_dir) if profile_dir else None
+    started = time.perf_counter()
+    with sink:
+        if profiler:
+            profiler.start()
+        results = pipeline.run([str(p) for p in mod_paths], translate_fn, str(output_dir))
+    elapsed = time.perf_counter() - started
+    if profiler:
+        paths = profiler.stop()
+        print(f"🔬 {name}: {paths['report']} (peak {profiler.peak_memory / (1024 * 1024):.1f} MB)")
+    if trace_dir:
+        tracer = stop_tracer()
+        trace_file = tracer.write()
+        print(f"\n⏱️ {name}\n{tracer.format_summary()}\n   Trace: {trace_file}")
+
+    after = server.config.snapshot()
+    strings = sum(r.entry_count for r in results)
+    requests_made = after['requests'] - before['requests']
+
+    hit_rate = None
+    if safe_api:
+        lookups = safe_api.stats['cache_hits'] + safe_api.stats['cache_misses']
+        hit_rate = safe_api.stats['cache_hits'] / lookups if lookups else 0.0
+
+    p50 = percentile(recorder.latencies, 0.50)
+    p99 = percentile(recorder.latencies, 0.99)
+    return {
+        'scenario': name,
+        'mods': len(mod_paths),
+        'strings': strings,
+        'seconds': round(elapsed, 4),
+        'strings_per_second': round(strings / elapsed, 2) if elapsed else None,
+        'requests': requests_made,
+        'requests_per_second': round(requests_made / elapsed, 2) if elapsed else None,
+        'cache_hit_rate': round(hit_rate, 4) if hit_rate is not None else None,
+        'latency_p50_ms': round(p50 * 1000, 2) if p50 is not None else None,
+        'latency_p99_ms': round(p99 * 1000, 2) if p99 is not None else None,
+        'rate_limited': after['rate_limited'] - before['rate_limited'],
+        'malformed': after['malformed'] - before['malformed'],
+    }
+
+
+def print_report(rows: List[Dict[str, Any]]):
+    """In bảng kết quả"""
+    def fmt(value, suffix=''):
+        if value is None:
+            return '-'
+        if isinstance(value, float) and suffix == '%':
+            return f"{value:.1%}"
+        return f"{value}{suffix}"
+
+    header = f"{'scenario':<22}{'strings':>9}{'sec':>9}{'str/s':>10}{'req':>7}{'req/s':>8}" \
+             f"{'cache':>8}{'p50 ms':>9}{'p99 ms':>9}{'429':>6}{'bad':>6}"
+    print("\n📊 BENCHMARK RESULTS:")
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print(f"{row['scenario']:<22}{row['strings']:>9}{row['seconds']:>9}"
+              f"{fmt(row['strings_per_second']):>10}{row['requests']:>7}{fmt(row['requests_per_second']):>8}"
+              f"{fmt(row['cache_hit_rate'], '%'):>8}{fmt(row['latency_p50_ms']):>9}"
+              f"{fmt(row['latency_p99_ms']):>9}{row['rate_limited']:>6}{row['malformed']:>6}")
+
+
+def compare_with_baseline(rows: List[Dict[str, Any]], baseline_path: str, max_regression: float) -> bool:
+    """
+    So sánh strings/s với baseline
+
+    Returns:
+        True nếu không có scenario nào chậm hơn baseline quá max_regression
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {row['scenario']: row for row in json.load(f)['results']}
+
+    ok = True
+    for row in rows:
+        base = baseline.get(row['scenario'])
+        if not base or not base.get('strings_per_second') or not row.get('strings_per_second'):
+            continue
+        ratio = row['strings_per_second'] / base['strings_per_second']
+        status = "✅" if ratio >= 1 - max_regression else "❌"
+        if ratio < 1 - max_regression:
+            ok = False
+        print(f"{status} {row['scenario']}: {ratio:.2f}x baseline throughput")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark cho translation pipeline")
+    parser.add_argument('--providers', default='google,safe,deepl,router',
+                        help="Danh sách provider: google, safe, deepl, router")
+    parser.add_argument('--packs', default='Code mau', help="Thư mục chứa các language pack mẫu")
+    parser.add_argument('--synthetic-mods', type=int, default=1)
+    parser.add_argument('--synthetic-keys', type=int, default=10000)
+    parser.add_argument('--latency', type=float, default=0.02, help="Latency mock server (giây)")
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Ghi kết quả JSON ra file")
+    parser.add_argument('--baseline', help="File JSON kết quả trước đó để so sánh")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="Tỉ lệ giảm throughput tối đa cho phép so với baseline")
+    parser.add_argument('--verbose', action='store_true', help="Hiện log của translators")
+    parser.add_argument('--trace', metavar='DIR', help="Ghi trace thời gian từng stage vào thư mục DIR")
+    parser.add_argument('--profile', metavar='DIR', help="Profile mỗi scenario (cProfile + tracemalloc) vào DIR")
+    args = parser.parse_args(argv)
+
+    config = MockServerConfig(args.latency, args.jitter, args.rate_429, args.malformed_rate,
+                              character_limit=10 ** 12, seed=args.seed)
+    rows = []
+
+    with tempfile.TemporaryDirectory(prefix="translate_bench_") as temp_dir, \
+            MockTranslateServer(config=config) as server:
+        work_dir = Path(temp_dir)
+        inputs = {}
+        packs_dir = Path(args.packs)
+        if packs_dir.exists():
+            inputs['packs'] = build_pack_mods(packs_dir, work_dir)
+        if args.synthetic_mods and args.synthetic_keys:
+            inputs['synthetic'] = build_synthetic_mods(work_dir, args.synthetic_mods,
+                                                       args.synthetic_keys, args.seed)
+
+        # Dữ liệu mẫu là tiếng Việt nên không lọc English content
+        pipeline = TranslationPipeline('VI', english_only=False)
+
+        for provider in [p.strip() for p in args.providers.split(',') if p.strip()]:
+            for input_name, mod_paths in inputs.items():
+                recorder = LatencyRecorder()
+                cache_dir = work_dir / f"cache-{provider}-{input_name}"
+                cache_dir.mkdir()
+                translate_fn, safe_api = make_translator(provider, server, cache_dir, recorder)
+                output_dir = work_dir / f"out-{provider}-{input_name}"
+
+                rows.append(run_scenario(f"{provider}/{input_name}", translate_fn, safe_api, pipeline,
+                                         mod_paths, server, recorder, output_dir, args.verbose,
+                                         args.trace, args.profile))
+                if safe_api:
+                    # Lần chạy thứ hai đo hiệu quả cache
+                    rows.append(run_scenario(f"{provider}/{input_name}/warm", translate_fn, safe_api,
+                                             pipeline, mod_paths, server, recorder, output_dir,
+                                             args.verbose, args.trace, args.profile))
+
+    print_report(rows)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': rows}, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+    if args.baseline and not compare_with_baseline(rows, args.baseline, args.max_regression):
+        print("❌ Throughput regression detected")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Điều chỉnh kích thước chunk theo AIMD (additive increase, multiplicative decrease)
+
+Mỗi provider và target language có một kích thước chunk (byte UTF-8) riêng.
+Request thành công với latency tốt và chunk gần đầy thì kích thước tăng thêm
+``step`` byte; lỗi, response bị cắt hoặc số dòng không khớp thì kích thước bị
+nhân với ``decrease``. Payload lỗi gần nhất được nhớ làm trần để kích thước
+dừng lại ngay dưới mức an toàn thay vì dao động mãi, trần được nới dần sau
+nhiều request thành công liên tiếp. State được lưu trong ``chunk_sizes.json``
+của thư mục cache nên lần chạy sau bắt đầu từ kích thước đã học.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+CHUNK_STATE_FILE = "chunk_sizes.json"
+
+# Google web endpoint từ chối query quá dài, không tăng quá mức này
+GOOGLE_MAX_CHUNK_SIZE = 5000
+
+# Lỗi do chính payload gây ra: payload đó trở thành trần kích thước
+SIZE_FAILURES = ('truncated', 'mismatch', 'too_large')
+
+
+def is_truncated(segments, combined_text: str) -> bool:
+    """
+    Response Google có bị cắt không: phần source được echo lại trong các
+    segment (``part[1]``) phải phủ gần hết text đã gửi
+
+    Returns:
+        True nếu response thiếu phần cuối, False nếu đủ hoặc không kiểm tra được
+    """
+    originals = [part[1] for part in segments if part and len(part) > 1 and isinstance(part[1], str)]
+    if not originals:
+        return False
+    sent = len(''.join(combined_text.split()))
+    echoed = len(''.join(''.join(originals).split()))
+    return echoed < sent * 0.9
+
+
+def adaptive_chunks(texts: List[str], size_fn: Callable[[], int]) -> Iterator[List[str]]:
+    """
+    Chia texts thành chunks giống ``split_text_into_chunks`` nhưng đọc lại
+    kích thước sau mỗi chunk, nên kết quả của chunk trước ảnh hưởng ngay tới
+    chunk sau. Kích thước tính cả ký tự xuống dòng nối các text, để khớp với
+    payload mà chunk sizer nhận được.
+
+    Text lớn hơn kích thước hiện tại được gửi nguyên trong một chunk riêng,
+    không bị cắt theo từ: mỗi text luôn cho đúng một kết quả.
+
+    Args:
+        texts: List of strings
+        size_fn: Trả về kích thước chunk hiện tại (byte)
+    """
+    chunk: List[str] = []
+    chunk_size = 0
+    limit = size_fn()
+    for text in texts:
+        text_size = len(text.encode('utf-8')) + 1  # +1 cho '\n'
+        if text_size > limit:
+            if chunk:
+                yield chunk
+                chunk, chunk_size = [], 0
+            yield [text]
+            limit = size_fn()
+            continue
+        if chunk and chunk_size + text_size > limit:
+            yield chunk
+            chunk, chunk_size = [], 0
+            limit = size_fn()
+        chunk.append(text)
+        chunk_size += text_size
+    if chunk:
+        yield chunk
+
+
+class AdaptiveChunkSizer:
+    """Kích thước chunk AIMD cho một provider, tách theo target language"""
+
+    def __init__(self, cache_dir: str, provider: str, initial: int, minimum: int = 500,
+                 maximum: int = GOOGLE_MAX_CHUNK_SIZE, step: int = 250, decrease: float = 0.5,
+                 target_latency: float = 2.0, probe_after: int = 50, save_interval: float = 30.0):
+        """
+        Args:
+            cache_dir: Thư mục chứa chunk_sizes.json
+            provider: Tên provider (key trong file state)
+            initial: Kích thước cho ngôn ngữ chưa có state
+            minimum: Kích thước nhỏ nhất
+            maximum: Kích thước lớn nhất
+            step: Số byte tăng sau mỗi request tốt
+            decrease: Hệ số nhân khi lỗi
+            target_latency: Latency (giây) tối đa để còn được tăng kích thước
+            probe_after: Số request tốt liên tiếp ở trần trước khi nới trần thêm một step
+            save_interval: Khoảng cách tối thiểu giữa hai lần tự lưu (giây)
+        """
+        self.state_file = Path(cache_dir) / CHUNK_STATE_FILE
+        self.provider = provider
+        self.initial = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.step = step
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self.probe_after = probe_after
+        self.save_interval = save_interval
+        self.lock = threading.Lock()
+        self.states: Dict[str, Dict] = self._load().get(provider, {})
+        self.successes: Dict[str, int] = {}
+        self.dirty = set()
+        self.last_save = time.monotonic()
+
+    def _load(self) -> Dict:
+        if not self.state_file.exists():
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            logging.warning(f"Could not load chunk size state: {e}")
+            return {}
+
+    def _state(self, lang: str) -> Dict:
+        state = self.states.get(lang)
+        if state is None:
+            state = self.states[lang] = {'size': self.initial, 'ceiling': None}
+        return state
+
+    def size(self, lang: str) -> int:
+        """Kích thước chunk hiện tại cho target language"""
+        with self.lock:
+            return int(max(self.minimum, min(self._state(lang)['size'], self.maximum)))
+
+    def record_success(self, lang: str, payload_bytes: int, latency: float):
+        """Request thành công: tăng kích thước nếu chunk gần đầy và latency tốt"""
+        with self.lock:
+            state = self._state(lang)
+            if latency > self.target_latency:
+                # Server bắt đầu chậm: coi như tín hiệu nghẽn nhẹ
+                self._shrink(lang, state, 0.8, None)
+                return
+            if payload_bytes < state['size'] * 0.75:
+                return  # Chunk cuối/ít text không chứng minh được kích thước lớn hơn an toàn
+
+            ceiling = state['ceiling'] or self.maximum + 1
+            if state['size'] + self.step < ceiling:
+                state['size'] = min(state['size'] + self.step, self.maximum)
+                self.successes[lang] = 0
+                self.dirty.add(lang)
+            else:
+                self.successes[lang] = self.successes.get(lang, 0) + 1
+                if state['ceiling'] and self.successes[lang] >= self.probe_after:
+                    state['ceiling'] = min(state['ceiling'] + self.step, self.maximum)
+                    self.successes[lang] = 0
+                    self.dirty.add(lang)
+        self._maybe_save()
+
+    def record_failure(self, lang: str, payload_bytes: int, reason: str):
+        """
+        Request lỗi, bị cắt hoặc sai số dòng: giảm kích thước theo hệ số nhân
+
+        Args:
+            lang: Target language
+            payload_bytes: Kích thước payload bị lỗi
+            reason: error (lỗi mạng/HTTP) hoặc một trong SIZE_FAILURES
+        """
+        with self.lock:
+            state = self._state(lang)
+            self._shrink(lang, state, self.decrease, payload_bytes if reason in SIZE_FAILURES else None)
+            size = state['size']
+        logging.warning(f"{self.provider} [{lang}] {reason} at {payload_bytes} bytes, chunk size -> {size}")
+        self.save()
+
+    def _shrink(self, lang: str, state: Dict, factor: float, payload_bytes: Optional[int]):
+        """Giảm kích thước (gọi khi đang giữ lock)"""
+        if payload_bytes:
+            # Lùi thêm một step dưới payload lỗi để lần sau dừng hẳn ở mức an toàn
+            limit = min(state['size'], payload_bytes) - self.step
+            ceiling = state['ceiling']
+            state['ceiling'] = max(self.minimum, min(ceiling, limit) if ceiling else limit)
+        state['size'] = max(self.minimum, int(state['size'] * factor))
+        self.successes[lang] = 0
+        self.dirty.add(lang)
+
+    def _maybe_save(self):
+        if self.dirty and time.monotonic() - self.last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        """
+        Ghi state của các ngôn ngữ đã thay đổi
+
+        Đọc lại file trước khi ghi để giữ state của provider/process khác, rồi
+        ghi file tạm và rename.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            changed = {lang: dict(self.states[lang]) for lang in self.dirty}
+            self.dirty = set()
+            self.last_save = time.monotonic()
+        try:
+            merged = self._load()
+            merged.setdefault(self.provider, {}).update(changed)
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.state_file.with_name(f"{self.state_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(merged, f, indent=2)
+            os.replace(temp_path, self.state_file)
+        except Exception as e:
+            logging.warning(f"Could not save chunk size state: {e}")
@@ -0,0 +1,171 @@
+"""
+Quản lý vòng đời DeepL glossary với cache glossary ID trên disk
+"""
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from network_utils import APIError, DeepLAPI
+
+
+def parse_glossary_file(glossary_path: str) -> Dict[str, str]:
+    """
+    Đọc file glossary (.txt) thành dict source -> target
+
+    Mỗi dòng có dạng ``source=target``, ``source<TAB>target`` hoặc
+    ``source -> target``. Dòng trống và dòng bắt đầu bằng ``#`` hoặc ``;`` bị bỏ qua.
+
+    Args:
+        glossary_path: Path to glossary file
+
+    Returns:
+        Dict chứa các cặp thuật ngữ
+    """
+    entries = {}
+    with open(glossary_path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            stripped = line.strip()
+            if not stripped or stripped.startswith(('#', ';')):
+                continue
+
+            for separator in ('\t', '->', '='):
+                if separator in stripped:
+                    source, target = stripped.split(separator, 1)
+                    source, target = source.strip(), target.strip()
+                    if source and target:
+                        entries[source] = target
+                    break
+
+    return entries
+
+
+class DeepLGlossaryManager:
+    """Tạo DeepL glossary khi nội dung thay đổi và cache glossary ID trên disk"""
+
+    def __init__(self, api: DeepLAPI, cache_dir: str = "translation_cache"):
+        self.api = api
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+        self.cache_file = self.cache_dir / "deepl_glossaries.json"
+        self.glossaries = self._load_cache()
+
+    def _load_cache(self) -> Dict[str, Dict[str, str]]:
+        """Tải cache glossary ID từ file"""
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.warning(f"Could not load glossary cache: {e}")
+        return {}
+
+    def _save_cache(self, key: str):
+        """
+        Lưu glossary ID của ``key`` vào file
+
+        Đọc lại file trước khi ghi để giữ entry do process khác (job ngôn ngữ
+        khác) vừa thêm, rồi ghi file tạm và rename để không bao giờ để lại
+        file bị cắt dở.
+        """
+        try:
+            merged = self._load_cache()
+            merged[key] = self.glossaries[key]
+            temp_path = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(merged, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.cache_file)
+            self.glossaries = merged
+        except Exception as e:
+            logging.warning(f"Could not save glossary cache: {e}")
+
+    def _cache_key(self, source_lang: str, target_lang: str) -> str:
+        """Glossary ID chỉ có giá trị trên đúng endpoint và cặp ngôn ngữ"""
+        return f"{self.api.endpoint}|{source_lang.upper()}|{target_lang.upper()}"
+
+    @staticmethod
+    def hash_entries(entries: Dict[str, str], source_lang: str, target_lang: str) -> str:
+        """
+        Tính hash ổn định cho nội dung glossary
+
+        Args:
+            entries: Dict source -> target
+            source_lang: Source language code
+            target_lang: Target language code
+
+        Returns:
+            SHA-256 hex digest
+        """
+        hasher = hashlib.sha256(f"{source_lang.upper()}->{target_lang.upper()}\n".encode('utf-8'))
+        for source in sorted(entries):
+            hasher.update(f"{source}\t{entries[source]}\n".encode('utf-8'))
+        return hasher.hexdigest()
+
+    def ensure_glossary(self, glossary_path: Optional[str], target_lang: str,
+                        source_lang: str = "EN") -> Optional[str]:
+        """
+        Đảm bảo glossary trên DeepL khớp với file local và trả về glossary ID
+
+        Glossary chỉ được tạo lại khi hash nội dung thay đổi hoặc DeepL báo
+        glossary cũ không còn (404); glossary cũ được dọn dẹp sau khi tạo mới.
+
+        Args:
+            glossary_path: Path to local glossary file (None nếu không dùng)
+            target_lang: Target language code
+            source_lang: Source language code
+
+        Returns:
+            glossary_id, hoặc None nếu không có glossary / không tạo được
+        """
+        if not glossary_path:
+            return None
+
+        try:
+            entries = parse_glossary_file(glossary_path)
+        except Exception as e:
+            logging.warning(f"Could not read glossary {glossary_path}: {e}")
+            return None
+
+        if not entries:
+            logging.warning(f"Glossary {glossary_path} has no entries, skipping")
+            return None
+
+        key = self._cache_key(source_lang, target_lang)
+        content_hash = self.hash_entries(entries, source_lang, target_lang)
+        cached = self.glossaries.get(key)
+
+        if cached and cached.get('hash') == content_hash:
+            try:
+                exists = self.api.glossary_exists(cached['glossary_id'])
+            except APIError as e:
+                # Lỗi tạm thời không có nghĩa glossary đã mất: giữ ID đã cache
+                logging.warning(f"Could not check glossary {cached['glossary_id']}, keeping cached ID: {e}")
+                return cached['glossary_id']
+            if exists:
+                return cached['glossary_id']
+            logging.info(f"Cached glossary {cached['glossary_id']} no longer exists, recreating")
+
+        name = f"{Path(glossary_path).stem}-{source_lang.lower()}-{target_lang.lower()}-{content_hash[:8]}"
+        try:
+            glossary_id = self.api.create_glossary(name, source_lang.upper(), target_lang.upper(), entries)
+        except APIError as e:
+            logging.warning(f"Could not create DeepL glossary: {e}")
+            return None
+
+        # Dọn glossary cũ để không vượt giới hạn số glossary của tài khoản
+        if cached and cached.get('glossary_id') != glossary_id:
+            self.api.delete_glossary(cached['glossary_id'])
+
+        self.glossaries[key] = {
+            'hash': content_hash,
+            'glossary_id': glossary_id,
+            'name': name,
+            'entries': len(entries),
+            'created': datetime.now().isoformat()
+        }
+        self._save_cache(key)
+        logging.info(f"Created DeepL glossary {name} ({len(entries)} entries)")
+        return glossary_id
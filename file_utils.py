@@ -4,13 +4,17 @@ File utilities với memory optimization và better error handling
 import os
 import zipfile
 import tempfile
-import json
 import shutil
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any, Generator
 import logging
 from contextlib import contextmanager
 
+from instrumentation import span
+import json_codec
+from locale_table import LocaleTable
+import metrics
+
 
 class FileError(Exception):
     """Custom exception cho file operations"""
@@ -117,9 +121,10 @@ class MemoryOptimizedZipHandler:
             File content as string
         """
         try:
-            with self.open_zip(zip_path) as zipf:
+            with span("zip_read") as stage, self.open_zip(zip_path) as zipf:
                 with zipf.open(file_path) as f:
                     content = f.read()
+                    stage.add_bytes(len(content))
                     try:
                         return content.decode(encoding)
                     except UnicodeDecodeError:
@@ -191,7 +196,7 @@ class ModFileProcessor:
                     info_file = info_files[0]  # Fallback to first found
                     
                 content = self.zip_handler.read_text_from_zip(zip_path, info_file)
-                return json.loads(content)
+                return json_codec.loads(content)
                 
         except Exception as e:
             logging.warning(f"Failed to find mod info in {zip_path}: {e}")
@@ -208,7 +213,7 @@ class ModFileProcessor:
             List of (file_path, root_folder) tuples
         """
         try:
-            with self.zip_handler.open_zip(zip_path) as zipf:
+            with span("zip_read"), self.zip_handler.open_zip(zip_path) as zipf:
                 namelist = zipf.namelist()
                 
                 # Tìm root folder
@@ -260,6 +265,21 @@ class ModFileProcessor:
             logging.warning(f"Failed to process locale file {locale_file}: {e}")
             return [], []
     
+    def read_locale_table(self, zip_path: str, locale_file: str) -> LocaleTable:
+        """
+        Đọc một file locale thành LocaleTable (dạng cột, dùng chung buffer nguồn)
+
+        Returns:
+            LocaleTable (rỗng nếu không đọc được file)
+        """
+        try:
+            content = self.zip_handler.read_text_from_zip(zip_path, locale_file)
+        except Exception as e:
+            logging.warning(f"Failed to process locale file {locale_file}: {e}")
+            content = ''
+        with span("parse", bytes_count=len(content)):
+            return LocaleTable.parse(locale_file, content)
+
     def parse_cfg_content(self, content: str) -> Tuple[List[Dict], List[str]]:
         """
         Parse nội dung file .cfg
@@ -270,22 +290,23 @@ class ModFileProcessor:
         Returns:
             Tuple of (key_value_pairs, original_lines)
         """
-        lines = content.splitlines(keepends=True)
-        key_val_pairs = []
-        
-        for i, line in enumerate(lines):
-            stripped = line.strip()
-            if "=" in stripped and not stripped.startswith(";"):
-                try:
-                    key, val = stripped.split('=', 1)
-                    key_val_pairs.append({
-                        'index': i,
-                        'key': key.strip(),
-                        'val': val.strip()
-                    })
-                except ValueError:
-                    # Skip malformed lines
-                    continue
+        with span("parse", bytes_count=len(content)):
+            lines = content.splitlines(keepends=True)
+            key_val_pairs = []
+            
+            for i, line in enumerate(lines):
+                stripped = line.strip()
+                if "=" in stripped and not stripped.startswith(";"):
+                    try:
+                        key, val = stripped.split('=', 1)
+                        key_val_pairs.append({
+                            'index': i,
+                            'key': key.strip(),
+                            'val': val.strip()
+                        })
+                    except ValueError:
+                        # Skip malformed lines
+                        continue
                     
         return key_val_pairs, lines
     
@@ -303,7 +324,7 @@ class ModFileProcessor:
             Path to created zip file
         """
         try:
-            with zipfile.ZipFile(output_path, 'w', 
+            with span("zip_write") as stage, zipfile.ZipFile(output_path, 'w', 
                                zipfile.ZIP_DEFLATED, 
                                compresslevel=compression_level) as zipf:
                 
@@ -312,6 +333,8 @@ class ModFileProcessor:
                     if file_path.is_file():
                         arcname = file_path.relative_to(source_path.parent)
                         zipf.write(file_path, arcname)
+                        stage.add_bytes(file_path.stat().st_size)
+                        metrics.ZIP_BYTES.inc(file_path.stat().st_size)
                         
             return output_path
         except Exception as e:
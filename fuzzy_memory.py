@@ -0,0 +1,286 @@
+"""
+Fuzzy translation memory: tra bản dịch gần đúng trên các source string đã cache
+
+Index n-gram ký tự (mặc định trigram) cho mỗi target language, build lười từ
+translation cache (cần cột source, xem translation_cache). Mỗi process chỉ có
+một memory cho mỗi file cache (``shared_memory``), dùng chung cho mọi
+translator, và mỗi index chỉ giữ ``max_entries`` entry dùng gần nhất nên memory
+không tăng theo kích thước cache trên disk. Tìm láng giềng bằng
+prefix filtering: chỉ duyệt posting list của các n-gram hiếm nhất mà mọi ứng
+viên đạt ngưỡng bắt buộc phải chia sẻ, rồi tính chính xác Dice similarity cho
+các ứng viên đó.
+
+Khi câu mới chỉ khác bản đã dịch ở vài token xuất hiện nguyên văn trong bản dịch
+(số, cấp Mk2/Mk3, số La Mã, tham số ``__1__``, rich text ``[item=...]``), bản
+dịch được suy ra bằng cách thay token ngay tại chỗ, không cần gọi network.
+Các match gần nhưng không thay thế được trả về dưới dạng gợi ý (hint).
+"""
+import re
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Token để so sánh hai câu: rich text, tham số Factorio, từ/số, dấu câu
+TOKEN_PATTERN = re.compile(r'\[[^\]]*\]|__[^_\s]+(?:__[^_\s]+)*__|\w+|[^\w\s]')
+
+# Số entry tối đa của một index (các entry dùng gần nhất)
+DEFAULT_MAX_ENTRIES = 50000
+
+# Index vượt max_entries theo hệ số này thì được build lại từ các entry gần nhất
+SHRINK_SLACK = 1.25
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text)
+
+
+def substitute_tokens(text: str, source: str, translation: str, max_changes: int = 2) -> Optional[str]:
+    """
+    Suy ra bản dịch của ``text`` từ cặp (source, translation) khi hai câu chỉ
+    khác nhau ở các token được giữ nguyên văn trong bản dịch
+
+    Returns:
+        Bản dịch đã thay token, None nếu không thay thế an toàn được
+    """
+    old_tokens = tokenize(source)
+    new_tokens = tokenize(text)
+    if len(old_tokens) != len(new_tokens):
+        return None
+
+    changes = {}
+    for old, new in zip(old_tokens, new_tokens):
+        if old != new:
+            if changes.get(old, new) != new:
+                return None
+            changes[old] = new
+    if len(changes) > max_changes or set(changes) & set(changes.values()):
+        return None
+
+    result = translation
+    for old, new in changes.items():
+        pattern = re.compile(rf'(?<!\w){re.escape(old)}(?!\w)')
+        # Token phải xuất hiện đúng số lần như trong source, nếu không không biết thay chỗ nào
+        if len(pattern.findall(result)) != old_tokens.count(old):
+            return None
+        result = pattern.sub(lambda match: new, result)
+    return result
+
+
+class FuzzyMatch:
+    """Một láng giềng trong translation memory"""
+
+    __slots__ = ('source', 'translation', 'similarity', 'resolved')
+
+    def __init__(self, source: str, translation: str, similarity: float, resolved: Optional[str] = None):
+        self.source = source
+        self.translation = translation
+        self.similarity = similarity
+        self.resolved = resolved    # Bản dịch suy ra bằng thay token (None = chỉ là hint)
+
+
+class NgramIndex:
+    """Inverted index n-gram -> id các source string của một target language"""
+
+    def __init__(self, ngram: int = 3):
+        self.ngram = ngram
+        self.sources: List[str] = []
+        self.translations: List[Optional[str]] = []
+        self.gram_counts = array('H')
+        self.used = array('Q')      # Thời điểm dùng (bộ đếm tăng dần) của từng entry
+        self.clock = 0
+        self.live = 0               # Số entry chưa bị discard
+        self.postings: Dict[str, array] = {}
+        self.ids: Dict[str, int] = {}
+
+    def grams(self, text: str) -> set:
+        padded = f" {' '.join(text.split()).casefold()} "
+        if len(padded) <= self.ngram:
+            return {padded}
+        return {padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def touch(self, entry_id: int):
+        self.clock += 1
+        self.used[entry_id] = self.clock
+
+    def add(self, source: str, translation: str):
+        entry_id = self.ids.get(source)
+        if entry_id is not None:
+            if self.translations[entry_id] is None:
+                self.live += 1
+            self.translations[entry_id] = translation
+            self.touch(entry_id)
+            return
+        entry_id = len(self.sources)
+        grams = self.grams(source)
+        self.ids[source] = entry_id
+        self.sources.append(source)
+        self.translations.append(translation)
+        self.gram_counts.append(min(len(grams), 65535))
+        self.clock += 1
+        self.used.append(self.clock)
+        self.live += 1
+        for gram in grams:
+            postings = self.postings.get(gram)
+            if postings is None:
+                postings = self.postings[gram] = array('I')
+            postings.append(entry_id)
+
+    def discard(self, source: str):
+        entry_id = self.ids.get(source)
+        if entry_id is not None and self.translations[entry_id] is not None:
+            self.translations[entry_id] = None
+            self.live -= 1
+
+    def most_recent(self, count: int) -> 'NgramIndex':
+        """Index mới chỉ gồm ``count`` entry dùng gần nhất (giữ thứ tự dùng)"""
+        live = [entry_id for entry_id, translation in enumerate(self.translations) if translation is not None]
+        live.sort(key=lambda entry_id: self.used[entry_id])
+        index = NgramIndex(self.ngram)
+        for entry_id in live[-count:] if count else ():
+            index.add(self.sources[entry_id], self.translations[entry_id])
+        return index
+
+    def nearest(self, text: str, threshold: float, limit: int = 3,
+                max_candidates: int = 32) -> List[Tuple[int, float]]:
+        """
+        Các entry có Dice similarity >= threshold
+
+        Returns:
+            List of (entry_id, similarity) giảm dần theo similarity
+        """
+        grams = self.grams(text)
+        size = len(grams)
+        # Dice >= t cần ít nhất t*|A|/(2-t) n-gram chung, nên ứng viên phải có
+        # ít nhất một n-gram trong (|A| - overlap + 1) n-gram hiếm nhất của query
+        min_overlap = max(1, int(threshold * size / (2 - threshold)))
+        prefix_length = size - min_overlap + 1
+        ordered = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))
+        candidates = Counter()
+        for gram in ordered[:prefix_length]:
+            postings = self.postings.get(gram)
+            if postings:
+                candidates.update(postings)
+
+        matches = []
+        suffix_length = size - prefix_length
+        for entry_id, prefix_shared in candidates.most_common(max_candidates):
+            if self.translations[entry_id] is None:
+                continue
+            other = self.gram_counts[entry_id]
+            # Cận trên của số n-gram chung: khớp trong prefix + toàn bộ phần còn lại
+            if 2 * min(prefix_shared + suffix_length, other) / (size + other) < threshold:
+                continue
+            shared = len(grams & self.grams(self.sources[entry_id]))
+            similarity = 2 * shared / (size + other)
+            if similarity >= threshold:
+                matches.append((entry_id, similarity))
+        matches.sort(key=lambda item: -item[1])
+        return matches[:limit]
+
+
+class FuzzyTranslationMemory:
+    """Translation memory gần đúng trên translation cache, một index cho mỗi target language"""
+
+    def __init__(self, cache, threshold: float = 0.8, hint_threshold: float = 0.6, ngram: int = 3,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            cache: TranslationCache (nguồn các cặp source/bản dịch)
+            threshold: Similarity tối thiểu để thử suy ra bản dịch bằng thay token
+            hint_threshold: Similarity tối thiểu để trả về match làm hint
+            ngram: Độ dài n-gram ký tự
+            max_entries: Số entry dùng gần nhất tối đa của mỗi index
+        """
+        self.cache = cache
+        self.threshold = threshold
+        self.hint_threshold = hint_threshold
+        self.ngram = ngram
+        self.max_entries = max_entries
+        self.indexes: Dict[str, NgramIndex] = {}
+        self.lock = threading.RLock()
+
+    def index(self, target_lang: str) -> NgramIndex:
+        """Index của target_lang, build từ max_entries entry dùng gần nhất ở lần dùng đầu tiên"""
+        with self.lock:
+            index = self.indexes.get(target_lang)
+            if index is None:
+                index = NgramIndex(self.ngram)
+                # Entry chưa lưu trước, rồi store theo thứ tự dùng giảm dần: add ngược để entry mới nhất dùng sau cùng
+                pairs = [(source, translation) for source, translation, _, _, _
+                         in self.cache.iter_pairs(target_lang, limit=self.max_entries)]
+                for source, translation in reversed(pairs):
+                    index.add(source, translation)
+                if index.live > self.max_entries:
+                    index = index.most_recent(self.max_entries)
+                self.indexes[target_lang] = index
+            return index
+
+    def add(self, source: str, translation: str, target_lang: str):
+        """Thêm bản dịch mới vào index (chỉ khi index của ngôn ngữ đó đã được build)"""
+        with self.lock:
+            index = self.indexes.get(target_lang)
+            if index is not None:
+                index.add(source, translation)
+                if index.live > self.max_entries * SHRINK_SLACK:
+                    self.indexes[target_lang] = index.most_recent(self.max_entries)
+
+    def discard(self, source: str, target_lang: str):
+        with self.lock:
+            index = self.indexes.get(target_lang)
+            if index is not None:
+                index.discard(source)
+
+    def nearest(self, text: str, target_lang: str, limit: int = 3) -> List[FuzzyMatch]:
+        """Các láng giềng có similarity >= hint_threshold"""
+        with self.lock:
+            index = self.index(target_lang)
+            return [FuzzyMatch(index.sources[entry_id], index.translations[entry_id], similarity)
+                    for entry_id, similarity in index.nearest(text, self.hint_threshold, limit)]
+
+    def lookup(self, text: str, target_lang: str) -> Optional[FuzzyMatch]:
+        """
+        Tìm bản dịch gần đúng cho text
+
+        Returns:
+            FuzzyMatch có ``resolved`` nếu suy ra được bản dịch, FuzzyMatch chỉ làm
+            hint nếu chỉ có match gần, None nếu không có láng giềng nào
+        """
+        matches = self.nearest(text, target_lang)
+        for match in matches:
+            if match.similarity < self.threshold:
+                break
+            match.resolved = substitute_tokens(text, match.source, match.translation)
+            if match.resolved is not None:
+                with self.lock:
+                    index = self.index(target_lang)
+                    entry_id = index.ids.get(match.source)
+                    if entry_id is not None:
+                        index.touch(entry_id)
+                return match
+        return matches[0] if matches else None
+
+
+_shared: Dict[str, FuzzyTranslationMemory] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_memory(cache, **kwargs) -> FuzzyTranslationMemory:
+    """
+    FuzzyTranslationMemory dùng chung trong process cho mọi translator trên cùng
+    file cache, nên index chỉ được build một lần dù mỗi mod tạo translator mới
+
+    Args:
+        cache: TranslationCache của translator gọi (memory giữ cache đầu tiên)
+        **kwargs: Tham số của FuzzyTranslationMemory (chỉ dùng khi tạo mới)
+    """
+    key = str(Path(cache.db_path).resolve())
+    with _shared_lock:
+        memory = _shared.get(key)
+        if memory is None:
+            memory = _shared[key] = FuzzyTranslationMemory(cache, **kwargs)
+        return memory
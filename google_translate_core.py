@@ -12,15 +12,30 @@ import urllib.parse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 
+from chunk_sizing import AdaptiveChunkSizer, adaptive_chunks, is_truncated
+from instrumentation import span
+import json_codec
+import metrics
+from logger_config import sampled_print
+
+
+class LineCountMismatch(ValueError):
+    """Response Google có số dòng khác số text đã gửi (không ghép lại được)"""
+    pass
+
+
 class GoogleTranslateAPI:
-    def __init__(self):
+    def __init__(self, cache_dir="translation_cache"):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
         self.base_url = "https://translate.googleapis.com/translate_a/single"
         self.rate_limit_delay = 0.1  # Giây giữa các request
-        self.max_chunk_size = 4500  # Kích thước tối đa mỗi chunk
+        self.max_chunk_size = 4500  # Kích thước chunk ban đầu, sau đó do chunk_sizer điều chỉnh
+        # Kích thước chunk học được theo từng target language, lưu giữa các lần chạy
+        self.chunk_sizer = AdaptiveChunkSizer(cache_dir, "google", self.max_chunk_size)
+        self.chunk_delay = 0.5  # Giây nghỉ giữa các chunks
         self.lock = threading.Lock()
         
     def get_language_code(self, lang_code):
@@ -45,30 +60,14 @@ class GoogleTranslateAPI:
         for text in texts:
             text_size = len(text.encode('utf-8'))
             
-            # Nếu text quá lớn, chia nhỏ text đó
+            # Text quá lớn được gửi nguyên trong một chunk riêng: cắt theo từ sẽ
+            # sinh nhiều kết quả cho một text và làm lệch các bản dịch phía sau
             if text_size > max_size:
                 if current_chunk:
                     chunks.append(current_chunk)
                     current_chunk = []
                     current_size = 0
-                
-                # Chia text lớn thành các phần nhỏ hơn
-                words = text.split()
-                temp_chunk = []
-                temp_size = 0
-                
-                for word in words:
-                    word_size = len(word.encode('utf-8')) + 1  # +1 cho space
-                    if temp_size + word_size > max_size and temp_chunk:
-                        chunks.append([' '.join(temp_chunk)])
-                        temp_chunk = [word]
-                        temp_size = word_size
-                    else:
-                        temp_chunk.append(word)
-                        temp_size += word_size
-                
-                if temp_chunk:
-                    chunks.append([' '.join(temp_chunk)])
+                chunks.append([text])
                     
             else:
                 # Kiểm tra xem có thể thêm vào chunk hiện tại không
@@ -91,51 +90,15 @@ class GoogleTranslateAPI:
             return []
             
         try:
-            # Tạo request parameters
-            combined_text = '\n'.join(texts)
-            
-            params = {
-                'client': 'gtx',
-                'sl': source_lang,
-                'tl': target_lang,
-                'dt': 't',
-                'q': combined_text
-            }
-            
-            # Rate limiting
-            with self.lock:
-                time.sleep(self.rate_limit_delay + random.uniform(0, 0.1))
-            
-            response = self.session.get(self.base_url, params=params, timeout=30)
-            
-            if response.status_code == 200:
-                # Parse JSON response
-                result = response.json()
-                
-                if result and len(result) > 0 and result[0]:
-                    # Ghép các phần đã dịch
-                    translated_parts = []
-                    for part in result[0]:
-                        if part and len(part) > 0:
-                            translated_parts.append(part[0])
-                    
-                    translated_text = ''.join(translated_parts)
-                    
-                    # Tách lại thành các phần riêng lẻ
-                    translated_lines = translated_text.split('\n')
-                    
-                    # Đảm bảo số lượng kết quả khớp với input
-                    if len(translated_lines) == len(texts):
-                        return translated_lines
-                    else:
-                        # Nếu không khớp, trả về kết quả gộp cho từng text
-                        return [translated_text] * len(texts)
-                else:
-                    return texts  # Trả về text gốc nếu không dịch được
-            else:
-                print(f"Google Translate Error: {response.status_code}")
+            return self.request_chunk(texts, target_lang, source_lang)
+        except LineCountMismatch as e:
+            if len(texts) == 1:
+                print(f"Google Translate: {e}")
                 return texts
-                
+            # Chia đôi chunk và dịch lại từng nửa
+            middle = len(texts) // 2
+            return (self.translate_chunk(texts[:middle], target_lang, source_lang) +
+                    self.translate_chunk(texts[middle:], target_lang, source_lang))
         except requests.exceptions.RequestException as e:
             print(f"Network error in Google Translate: {e}")
             return texts
@@ -146,6 +109,82 @@ class GoogleTranslateAPI:
             print(f"Unexpected error in Google Translate: {e}")
             return texts
     
+    def request_chunk(self, texts, target_lang, source_lang='en'):
+        """
+        Dịch một chunk văn bản, raise exception nếu request thất bại
+
+        Raises:
+            LineCountMismatch: Response có số dòng khác số text đã gửi
+        """
+        # Tạo request parameters
+        combined_text = '\n'.join(texts)
+        
+        params = {
+            'client': 'gtx',
+            'sl': source_lang,
+            'tl': target_lang,
+            'dt': 't',
+            'q': combined_text
+        }
+        
+        # Rate limiting
+        wait_started = time.perf_counter()
+        with span("limiter_wait"), self.lock:
+            time.sleep(self.rate_limit_delay + random.uniform(0, 0.1))
+        metrics.LIMITER_WAIT.observe(time.perf_counter() - wait_started, provider="google")
+        
+        metrics.CHUNK_SIZE.observe(len(texts), provider="google")
+        payload_bytes = len(combined_text.encode('utf-8'))
+        started = time.perf_counter()
+        try:
+            with span("http", bytes_count=len(combined_text)) as stage:
+                response = self.session.get(self.base_url, params=params, timeout=30)
+                stage.add_bytes(len(response.content))
+        except requests.exceptions.RequestException:
+            self.chunk_sizer.record_failure(target_lang, payload_bytes, 'error')
+            raise
+        latency = time.perf_counter() - started
+        metrics.REQUEST_LATENCY.observe(latency, provider="google")
+        metrics.REQUESTS.inc(provider="google", status=response.status_code)
+        
+        if response.status_code != 200:
+            print(f"Google Translate Error: {response.status_code}")
+            # 429 là do tần suất request, không phải kích thước payload
+            if response.status_code != 429:
+                reason = 'too_large' if response.status_code in (413, 414) else 'error'
+                self.chunk_sizer.record_failure(target_lang, payload_bytes, reason)
+            raise requests.exceptions.HTTPError(f"HTTP {response.status_code}", response=response)
+            
+        # Parse JSON response
+        result = json_codec.response_json(response)
+        
+        if not (result and len(result) > 0 and result[0]):
+            self.chunk_sizer.record_failure(target_lang, payload_bytes, 'error')
+            raise ValueError("Empty response from Google Translate")
+            
+        # Ghép các phần đã dịch
+        translated_parts = []
+        for part in result[0]:
+            if part and len(part) > 0:
+                translated_parts.append(part[0])
+        
+        translated_text = ''.join(translated_parts)
+        
+        # Tách lại thành các phần riêng lẻ
+        translated_lines = translated_text.split('\n')
+        
+        if is_truncated(result[0], combined_text):
+            self.chunk_sizer.record_failure(target_lang, payload_bytes, 'truncated')
+        elif len(translated_lines) != len(texts):
+            self.chunk_sizer.record_failure(target_lang, payload_bytes, 'mismatch')
+        else:
+            self.chunk_sizer.record_success(target_lang, payload_bytes, latency)
+        
+        # Số dòng không khớp thì không biết dòng nào thuộc text nào: để caller chia nhỏ/failover
+        if len(translated_lines) != len(texts):
+            raise LineCountMismatch(f"Google returned {len(translated_lines)} lines for {len(texts)} texts")
+        return translated_lines
+    
     def translate_texts(self, texts, target_lang, source_lang='en', progress_callback=None):
         """
         Dịch danh sách văn bản sử dụng Google Translate
@@ -168,33 +207,39 @@ class GoogleTranslateAPI:
         
         print(f"🌐 Starting Google Translate: {len(texts)} texts from {source_lang} to {target_lang}")
         
-        # Chia nhỏ texts thành chunks
-        chunks = self.split_text_into_chunks(texts, self.max_chunk_size)
-        print(f"📦 Split into {len(chunks)} chunks for processing")
+        # Chia nhỏ texts thành chunks, kích thước được đọc lại sau mỗi chunk
+        chunk_size = self.chunk_sizer.size(target_lang)
+        total = len(self.split_text_into_chunks(texts, chunk_size))
+        print(f"📦 Split into ~{total} chunks for processing (chunk size: {chunk_size})")
+        chunks = adaptive_chunks(texts, lambda: self.chunk_sizer.size(target_lang))
         
         all_results = []
         processed_texts = 0
         
         # Xử lý từng chunk tuần tự để tránh rate limiting
         for i, chunk in enumerate(chunks):
+            total = max(total, i + 1)
             try:
+                # Thêm delay giữa các chunks để tránh rate limiting
+                if i > 0:
+                    with span("limiter_wait"):
+                        time.sleep(self.chunk_delay)
+                
                 if progress_callback:
-                    progress_callback(i, len(chunks), f"Translating chunk {i+1}/{len(chunks)}")
+                    progress_callback(i, total, f"Translating chunk {i+1}/{total}")
                 
                 chunk_results = self.translate_chunk(chunk, target_lang, source_lang)
                 all_results.extend(chunk_results)
                 processed_texts += len(chunk)
                 
-                print(f"✅ Chunk {i+1}/{len(chunks)}: Translated {len(chunk)} texts")
-                
-                # Thêm delay giữa các chunks để tránh rate limiting
-                if i < len(chunks) - 1:
-                    time.sleep(0.5)
+                sampled_print("google.chunk", f"✅ Chunk {i+1}/{total}: Translated {len(chunk)} texts",
+                              force=processed_texts >= len(texts))
                     
             except Exception as e:
                 print(f"❌ Error processing chunk {i+1}: {e}")
                 all_results.extend(chunk)  # Trả về text gốc nếu lỗi
         
+        self.chunk_sizer.save()
         print(f"🎉 Google Translate completed: {len(all_results)} texts translated")
         return all_results
 
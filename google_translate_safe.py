@@ -5,17 +5,24 @@ Cải tiến với advanced rate limiting, caching, và error handling
 """
 import time
 import random
-import hashlib
-import json
-import os
 from pathlib import Path
-from typing import List, Optional, Dict, Any
 import requests
 import threading
-from datetime import datetime, timedelta
+
+from instrumentation import span
+import json_codec
+import metrics
+from logger_config import sampled_print
+from chunk_sizing import AdaptiveChunkSizer, adaptive_chunks, is_truncated
+from fuzzy_memory import shared_memory
+from google_translate_core import LineCountMismatch
+from parameter_masking import mask_slots, unmask_slots
+from shared_rate_limiter import shared_limiter
+from translation_cache import TranslationCache
 
 class SafeGoogleTranslateAPI:
-    def __init__(self, cache_dir="translation_cache"):
+    def __init__(self, cache_dir="translation_cache", max_hot_entries=20000, cache_ttl_days=365,
+                 fuzzy_matching=True, read_only=False):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
@@ -27,21 +34,30 @@ class SafeGoogleTranslateAPI:
         self.max_delay = 3.0  # Delay tối đa
         self.current_delay = self.min_delay
         self.consecutive_errors = 0
-        self.max_chunk_size = 3000  # Giảm chunk size để an toàn hơn
+        self.max_chunk_size = 3000  # Chunk size ban đầu (an toàn), sau đó do chunk_sizer điều chỉnh
         
         # Request tracking
-        self.requests_this_minute = 0
-        self.requests_this_hour = 0
-        self.last_minute_reset = datetime.now()
-        self.last_hour_reset = datetime.now()
         self.max_requests_per_minute = 25  # Conservative limit
         self.max_requests_per_hour = 1000
         
         # Caching system
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(exist_ok=True)
-        self.cache = {}
+        # read_only (dry-run): chỉ tra cache, không mở rate_limits.db và không ghi gì xuống disk
+        self.read_only = read_only
+        if read_only:
+            self.rate_limiter = None
+            self.requests_this_minute = self.requests_this_hour = 0
+        else:
+            # Budget phút/giờ dùng chung cho mọi instance, ngôn ngữ và process trên máy (Google
+            # throttle theo IP), giữ qua các lần khởi động lại
+            self.rate_limiter = shared_limiter(self.cache_dir / "rate_limits.db", "google_safe")
+            self.requests_this_minute, self.requests_this_hour = self.rate_limiter.counts((60, 3600))
+        # Chunk size học được theo từng target language (AIMD), lưu giữa các lần chạy
+        self.chunk_sizer = AdaptiveChunkSizer(self.cache_dir, "google_safe", self.max_chunk_size)
+        self.cache = TranslationCache(cache_dir, max_hot_entries, cache_ttl_days, read_only=read_only)
         self.load_cache()
+        # Fuzzy TM: suy ra bản dịch cho câu chỉ khác bản đã cache ở số/tham số (index dùng chung trong process)
+        self.fuzzy = shared_memory(self.cache) if fuzzy_matching else None
         
         # Thread safety
         self.lock = threading.Lock()
@@ -52,76 +68,76 @@ class SafeGoogleTranslateAPI:
             'cache_hits': 0,
             'cache_misses': 0,
             'errors': 0,
-            'blocked_periods': 0
+            'blocked_periods': 0,
+            'fuzzy_hits': 0,
+            'fuzzy_hints': 0,
+            'template_shared': 0
         }
     
     def load_cache(self):
         """Tải cache từ file"""
-        cache_file = self.cache_dir / "translation_cache.json"
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    self.cache = json.load(f)
-                print(f"📦 Loaded {len(self.cache)} cached translations")
-            except Exception as e:
-                print(f"⚠️ Could not load cache: {e}")
-                self.cache = {}
+        try:
+            count = self.cache.load()
+            if count:
+                print(f"📦 Cache store has {count} cached translations")
+        except Exception as e:
+            print(f"⚠️ Could not load cache: {e}")
     
     def save_cache(self):
-        """Lưu cache vào file"""
-        cache_file = self.cache_dir / "translation_cache.json"
+        """Lưu cache (và chunk size đã học) vào file"""
+        if self.read_only:
+            return
+        self.chunk_sizer.save()
         try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+            self.cache.save()
         except Exception as e:
             print(f"⚠️ Could not save cache: {e}")
     
     def get_cache_key(self, text, target_lang, source_lang='en'):
         """Tạo cache key từ text và language"""
-        combined = f"{source_lang}->{target_lang}:{text}"
-        return hashlib.md5(combined.encode('utf-8')).hexdigest()
+        return TranslationCache.make_key(text, target_lang, source_lang)
     
     def get_cached_translation(self, text, target_lang, source_lang='en'):
         """Lấy bản dịch từ cache nếu có"""
-        cache_key = self.get_cache_key(text, target_lang, source_lang)
-        return self.cache.get(cache_key)
+        return self.cache.get(text, target_lang, source_lang)
     
-    def cache_translation(self, text, translation, target_lang, source_lang='en'):
+    def cache_translation(self, text, translation, target_lang, source_lang='en', provider='google_safe'):
         """Lưu bản dịch vào cache"""
-        cache_key = self.get_cache_key(text, target_lang, source_lang)
-        self.cache[cache_key] = translation
+        self.cache.put(text, translation, target_lang, source_lang, provider)
+        if self.fuzzy:
+            self.fuzzy.add(text, translation, target_lang)
         
         # Định kỳ lưu cache (mỗi 50 translations)
-        if len(self.cache) % 50 == 0:
+        if self.cache.dirty >= 50:
             self.save_cache()
     
+    def mark_bad_translation(self, text, target_lang, source_lang='en'):
+        """Đánh dấu bản dịch trong cache là sai để dịch lại lần sau"""
+        if self.fuzzy:
+            self.fuzzy.discard(text, target_lang)
+        return self.cache.mark_bad(text, target_lang, source_lang)
+    
     def check_rate_limits(self):
-        """Kiểm tra và reset rate limits"""
-        now = datetime.now()
-        
-        # Reset minute counter
-        if now - self.last_minute_reset > timedelta(minutes=1):
-            self.requests_this_minute = 0
-            self.last_minute_reset = now
-        
-        # Reset hour counter
-        if now - self.last_hour_reset > timedelta(hours=1):
-            self.requests_this_hour = 0
-            self.last_hour_reset = now
-        
-        # Check limits
-        if self.requests_this_minute >= self.max_requests_per_minute:
-            wait_time = 60 - (now - self.last_minute_reset).seconds
-            print(f"⏳ Rate limit reached, waiting {wait_time}s...")
-            time.sleep(wait_time + 1)
-            self.check_rate_limits()  # Recheck after waiting
-        
-        if self.requests_this_hour >= self.max_requests_per_hour:
-            wait_time = 3600 - (now - self.last_hour_reset).seconds
-            print(f"⏳ Hourly limit reached, waiting {wait_time/60:.1f} minutes...")
-            self.stats['blocked_periods'] += 1
-            time.sleep(wait_time + 1)
-            self.check_rate_limits()
+        """
+        Chờ tới khi budget chung còn slot rồi ghi nhận request
+
+        Sliding window phút/giờ được lưu trong rate_limits.db nên mọi instance và
+        process trên máy rút từ một budget.
+        """
+        if self.rate_limiter is None:
+            raise RuntimeError("Read-only translator cannot send requests")
+        limits = ((60, self.max_requests_per_minute), (3600, self.max_requests_per_hour))
+        while True:
+            wait_time, (self.requests_this_minute, self.requests_this_hour) = self.rate_limiter.try_acquire(limits)
+            if wait_time <= 0:
+                return
+            if self.requests_this_hour >= self.max_requests_per_hour:
+                print(f"⏳ Hourly limit reached, waiting {wait_time/60:.1f} minutes...")
+                self.stats['blocked_periods'] += 1
+            else:
+                print(f"⏳ Rate limit reached, waiting {wait_time:.0f}s...")
+            metrics.LIMITER_WAIT.observe(wait_time, provider="google_safe")
+            time.sleep(wait_time)
     
     def adaptive_delay(self, success=True):
         """Adaptive delay based on success/failure"""
@@ -139,8 +155,13 @@ class SafeGoogleTranslateAPI:
         jitter = random.uniform(0.8, 1.2)
         actual_delay = self.current_delay * jitter
         
-        print(f"⏱️ Waiting {actual_delay:.1f}s (errors: {self.consecutive_errors})")
-        time.sleep(actual_delay)
+        sampled_print("safe.delay", f"⏱️ Waiting {actual_delay:.1f}s (errors: {self.consecutive_errors})",
+                      force=self.consecutive_errors > 0)
+        if not success:
+            metrics.RETRIES.inc(provider="google_safe", reason="backoff")
+        metrics.LIMITER_WAIT.observe(actual_delay, provider="google_safe")
+        with span("limiter_wait"):
+            time.sleep(actual_delay)
     
     def get_language_code(self, lang_code):
         """Chuyển đổi language code"""
@@ -162,30 +183,13 @@ class SafeGoogleTranslateAPI:
         for text in texts:
             text_size = len(text.encode('utf-8'))
             
-            # Nếu text quá lớn, chia nhỏ
+            # Text quá lớn: gửi nguyên trong một chunk riêng (một kết quả cho mỗi text)
             if text_size > max_size:
                 if current_chunk:
                     chunks.append(current_chunk)
                     current_chunk = []
                     current_size = 0
-                
-                # Chia text lớn thành từng từ
-                words = text.split()
-                temp_chunk = []
-                temp_size = 0
-                
-                for word in words:
-                    word_size = len(word.encode('utf-8')) + 1
-                    if temp_size + word_size > max_size and temp_chunk:
-                        chunks.append([' '.join(temp_chunk)])
-                        temp_chunk = [word]
-                        temp_size = word_size
-                    else:
-                        temp_chunk.append(word)
-                        temp_size += word_size
-                
-                if temp_chunk:
-                    chunks.append([' '.join(temp_chunk)])
+                chunks.append([text])
             else:
                 # Kiểm tra xem có thể thêm vào chunk hiện tại không
                 if current_size + text_size > max_size and current_chunk:
@@ -206,64 +210,172 @@ class SafeGoogleTranslateAPI:
         if not texts:
             return []
         
+        try:
+            return self.translate_chunk_or_raise(texts, target_lang, source_lang)
+        except Exception as e:
+            print(f"❌ Translation error: {e}")
+            self.stats['errors'] += 1
+            self.adaptive_delay(success=False)
+            return texts  # Trả về text gốc nếu lỗi
+    
+    def translate_chunk_or_raise(self, texts, target_lang, source_lang='en'):
+        """
+        Dịch chunk với cache support, raise exception nếu request thất bại
+
+        Text được tra cache nguyên văn trước (bản dịch import/cache cũ), phần còn lại
+        được mask số/tham số thành slot: các chuỗi cùng template (Tier 1..Tier 5)
+        dùng chung một cache entry và chỉ được dịch một lần.
+        """
+        if not texts:
+            return []
+
+        result = [None] * len(texts)
+        masked = {}
+        for i, text in enumerate(texts):
+            template, values = mask_slots(text)
+            if values:
+                masked[i] = (template, values)
+
+        if masked:
+            with span("cache_lookup"):
+                indices = list(masked)
+                exact = self.cache.get_many([texts[i] for i in indices], target_lang, source_lang)
+            exact_hits = 0
+            for i, cached in zip(indices, exact):
+                if cached:
+                    result[i] = cached
+                    del masked[i]
+                    exact_hits += 1
+            self.stats['cache_hits'] += exact_hits
+            metrics.record_cache_lookups(exact_hits, 0)
+
+        # Gom các text cùng template
+        pending = {}
+        for i, text in enumerate(texts):
+            if result[i] is not None:
+                continue
+            template, values = masked.get(i, (text, []))
+            pending.setdefault(template, []).append((i, values))
+        self.stats['template_shared'] += sum(len(items) - 1 for items in pending.values())
+
+        templates = list(pending)
+        translations = self.translate_templates_or_raise(templates, target_lang, source_lang)
+        failed = []
+        for template, translation in zip(templates, translations):
+            for i, values in pending[template]:
+                restored = unmask_slots(translation, values)
+                if restored is None:
+                    failed.append(i)
+                else:
+                    result[i] = restored
+
+        # Provider làm mất slot: bỏ bản dịch template, dịch lại text gốc không mask
+        if failed:
+            for template in {masked[i][0] for i in failed}:
+                self.mark_bad_translation(template, target_lang, source_lang)
+            raw_texts = [texts[i] for i in failed]
+            for i, translation in zip(failed, self.translate_templates_or_raise(raw_texts, target_lang, source_lang)):
+                result[i] = translation
+        return result
+
+    def translate_templates_or_raise(self, texts, target_lang, source_lang='en'):
+        """Tra cache/fuzzy TM rồi dịch phần còn thiếu của một list text (đã mask)"""
+        if not texts:
+            return []
+        
         # Kiểm tra cache cho từng text
         cached_results = []
         uncached_texts = []
         uncached_indices = []
+        fuzzy_hits = 0
         
-        for i, text in enumerate(texts):
-            cached = self.get_cached_translation(text, target_lang, source_lang)
-            if cached:
-                cached_results.append((i, cached))
-                self.stats['cache_hits'] += 1
-            else:
+        with span("cache_lookup"):
+            # Tra cả chunk một lần: hot LRU trước, miss được tra SQLite theo lô
+            for i, cached in enumerate(self.cache.get_many(texts, target_lang, source_lang)):
+                text = texts[i]
+                if cached:
+                    cached_results.append((i, cached))
+                    self.stats['cache_hits'] += 1
+                    continue
+
+                # Miss: thử suy ra từ câu gần giống đã dịch (chỉ khác số/tham số)
+                match = self.fuzzy.lookup(text, target_lang) if self.fuzzy else None
+                if match and match.resolved is not None:
+                    cached_results.append((i, match.resolved))
+                    self.cache_translation(text, match.resolved, target_lang, source_lang, provider='fuzzy_tm')
+                    self.stats['fuzzy_hits'] += 1
+                    fuzzy_hits += 1
+                    continue
+                if match:
+                    self.stats['fuzzy_hints'] += 1
+                    sampled_print("safe.fuzzy", f"💡 Fuzzy hint ({match.similarity:.0%}): "
+                                                f"'{match.source[:40]}' -> '{match.translation[:40]}'")
                 uncached_texts.append(text)
                 uncached_indices.append(i)
                 self.stats['cache_misses'] += 1
+        metrics.record_cache_lookups(len(cached_results) - fuzzy_hits, len(uncached_texts))
+        if fuzzy_hits:
+            metrics.CACHE_LOOKUPS.inc(fuzzy_hits, result='fuzzy')
         
         # Nếu tất cả đã có trong cache
         if not uncached_texts:
             result = [''] * len(texts)
             for i, translation in cached_results:
                 result[i] = translation
-            print(f"💾 All {len(texts)} texts from cache")
+            sampled_print("safe.cache", f"💾 All {len(texts)} texts from cache")
             return result
         
         # Dịch các text chưa có trong cache
-        print(f"💾 {len(cached_results)} from cache, {len(uncached_texts)} need translation")
+        sampled_print("safe.cache", f"💾 {len(cached_results)} from cache, {len(uncached_texts)} need translation")
         
-        try:
-            with self.lock:
-                self.check_rate_limits()
-                self.stats['total_requests'] += 1
-                self.requests_this_minute += 1
-                self.requests_this_hour += 1
-            
-            translated_uncached = self.translate_chunk_direct(uncached_texts, target_lang, source_lang)
-            
-            # Cache các kết quả mới
-            for text, translation in zip(uncached_texts, translated_uncached):
+        translated_uncached = self.translate_uncached(uncached_texts, target_lang, source_lang)
+        
+        # Cache các kết quả mới (text không dịch được thì giữ nguyên và không cache)
+        for text, translation in zip(uncached_texts, translated_uncached):
+            if translation is not None:
                 self.cache_translation(text, translation, target_lang, source_lang)
-            
-            # Kết hợp kết quả
-            result = [''] * len(texts)
-            for i, translation in cached_results:
-                result[i] = translation
-            
-            for i, translation in zip(uncached_indices, translated_uncached):
-                result[i] = translation
-            
-            self.adaptive_delay(success=True)
-            return result
-            
-        except Exception as e:
-            print(f"❌ Translation error: {e}")
-            self.stats['errors'] += 1
-            self.adaptive_delay(success=False)
-            return texts  # Trả về text gốc nếu lỗi
+        
+        # Kết hợp kết quả
+        result = [''] * len(texts)
+        for i, translation in cached_results:
+            result[i] = translation
+        
+        for i, text, translation in zip(uncached_indices, uncached_texts, translated_uncached):
+            result[i] = text if translation is None else translation
+        
+        self.adaptive_delay(success=True)
+        return result
+    
+    def translate_uncached(self, texts, target_lang, source_lang='en'):
+        """
+        Gửi texts qua rate limiter, chia đôi chunk khi response sai số dòng
+
+        Returns:
+            List bản dịch theo thứ tự texts, None cho text vẫn sai số dòng khi
+            gửi riêng (caller giữ text gốc và không cache)
+        """
+        with span("limiter_wait"), self.lock:
+            self.check_rate_limits()
+            self.stats['total_requests'] += 1
+        
+        try:
+            return self.translate_chunk_direct(texts, target_lang, source_lang)
+        except LineCountMismatch as e:
+            if len(texts) == 1:
+                print(f"❌ Translation error: {e}")
+                self.stats['errors'] += 1
+                return [None]
+            middle = len(texts) // 2
+            return (self.translate_uncached(texts[:middle], target_lang, source_lang) +
+                    self.translate_uncached(texts[middle:], target_lang, source_lang))
     
     def translate_chunk_direct(self, texts, target_lang, source_lang='en'):
-        """Dịch chunk trực tiếp (không cache)"""
+        """
+        Dịch chunk trực tiếp (không cache)
+
+        Raises:
+            LineCountMismatch: Response có số dòng khác số text đã gửi
+        """
         try:
             combined_text = '\n'.join(texts)
             
@@ -275,10 +387,22 @@ class SafeGoogleTranslateAPI:
                 'q': combined_text
             }
             
-            response = self.session.get(self.base_url, params=params, timeout=30)
+            metrics.CHUNK_SIZE.observe(len(texts), provider="google_safe")
+            payload_bytes = len(combined_text.encode('utf-8'))
+            started = time.perf_counter()
+            try:
+                with span("http", bytes_count=len(combined_text)) as stage:
+                    response = self.session.get(self.base_url, params=params, timeout=30)
+                    stage.add_bytes(len(response.content))
+            except requests.exceptions.RequestException:
+                self.chunk_sizer.record_failure(target_lang, payload_bytes, 'error')
+                raise
+            latency = time.perf_counter() - started
+            metrics.REQUEST_LATENCY.observe(latency, provider="google_safe")
+            metrics.REQUESTS.inc(provider="google_safe", status=response.status_code)
             
             if response.status_code == 200:
-                result = response.json()
+                result = json_codec.response_json(response)
                 
                 if result and len(result) > 0 and result[0]:
                     translated_parts = []
@@ -289,21 +413,26 @@ class SafeGoogleTranslateAPI:
                     translated_text = ''.join(translated_parts)
                     translated_lines = translated_text.split('\n')
                     
-                    if len(translated_lines) == len(texts):
-                        return translated_lines
+                    if is_truncated(result[0], combined_text):
+                        self.chunk_sizer.record_failure(target_lang, payload_bytes, 'truncated')
+                    elif len(translated_lines) != len(texts):
+                        self.chunk_sizer.record_failure(target_lang, payload_bytes, 'mismatch')
                     else:
-                        # Fallback: chia đều
-                        words_per_text = len(translated_text.split()) // len(texts)
-                        words = translated_text.split()
-                        result_texts = []
-                        for i in range(len(texts)):
-                            start_idx = i * words_per_text
-                            end_idx = (i + 1) * words_per_text if i < len(texts) - 1 else len(words)
-                            result_texts.append(' '.join(words[start_idx:end_idx]))
-                        return result_texts
+                        self.chunk_sizer.record_success(target_lang, payload_bytes, latency)
+                    
+                    # Không đoán dòng nào thuộc text nào: bản đoán sẽ bị cache và lan sang mọi text cùng template
+                    if len(translated_lines) != len(texts):
+                        raise LineCountMismatch(
+                            f"Google returned {len(translated_lines)} lines for {len(texts)} texts")
+                    return translated_lines
                 else:
+                    self.chunk_sizer.record_failure(target_lang, payload_bytes, 'error')
                     raise Exception("Empty response from Google Translate")
             else:
+                # 429 là do tần suất request, không phải kích thước payload
+                if response.status_code != 429:
+                    reason = 'too_large' if response.status_code in (413, 414) else 'error'
+                    self.chunk_sizer.record_failure(target_lang, payload_bytes, reason)
                 raise Exception(f"HTTP {response.status_code}: {response.text}")
                 
         except Exception as e:
@@ -320,20 +449,25 @@ class SafeGoogleTranslateAPI:
         print(f"🔒 Safe Google Translate: {len(texts)} texts {source_lang} -> {target_lang}")
         print(f"📊 Cache: {len(self.cache)} entries, Max RPM: {self.max_requests_per_minute}")
         
-        chunks = self.split_text_into_chunks(texts, self.max_chunk_size)
-        print(f"📦 Split into {len(chunks)} chunks (max size: {self.max_chunk_size})")
+        chunk_size = self.chunk_sizer.size(target_lang)
+        total = len(self.split_text_into_chunks(texts, chunk_size))
+        print(f"📦 Split into ~{total} chunks (max size: {chunk_size})")
+        # Chunk size được đọc lại sau mỗi chunk để áp dụng ngay kết quả của chunk trước
+        chunks = adaptive_chunks(texts, lambda: self.chunk_sizer.size(target_lang))
         
         all_results = []
         
         for i, chunk in enumerate(chunks):
+            total = max(total, i + 1)
             try:
                 if progress_callback:
-                    progress_callback(i, len(chunks), f"Safe translate chunk {i+1}/{len(chunks)}")
+                    progress_callback(i, total, f"Safe translate chunk {i+1}/{total}")
                 
                 chunk_results = self.translate_chunk_with_cache(chunk, target_lang, source_lang)
                 all_results.extend(chunk_results)
                 
-                print(f"✅ Chunk {i+1}/{len(chunks)}: {len(chunk)} texts")
+                sampled_print("safe.chunk", f"✅ Chunk {i+1}/{total}: {len(chunk)} texts",
+                              force=len(all_results) >= len(texts))
                 
             except Exception as e:
                 print(f"❌ Chunk {i+1} failed: {e}")
@@ -355,9 +489,13 @@ class SafeGoogleTranslateAPI:
         print(f"• Cache misses: {self.stats['cache_misses']}")
         hit_rate = self.stats['cache_hits'] / max(self.stats['cache_hits'] + self.stats['cache_misses'], 1)
         print(f"• Cache hit rate: {hit_rate:.1%}")
+        print(f"• Fuzzy TM: {self.stats['fuzzy_hits']} resolved locally, {self.stats['fuzzy_hints']} hints")
+        print(f"• Shared templates: {self.stats['template_shared']} texts reused a masked translation")
         print(f"• Errors: {self.stats['errors']}")
         print(f"• Blocked periods: {self.stats['blocked_periods']}")
         print(f"• Current delay: {self.current_delay:.1f}s")
+        sizes = ', '.join(f"{lang}={state['size']}" for lang, state in sorted(self.chunk_sizer.states.items()))
+        print(f"• Chunk size: {sizes or self.max_chunk_size}")
 
 def test_safe_translation():
     """Test Safe Google Translate"""
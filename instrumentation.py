@@ -0,0 +1,236 @@
+"""
+Span-based instrumentation cho translation pipeline
+
+Mỗi stage (zip_read, parse, cache_lookup, limiter_wait, http, reconstruct,
+zip_write...) được bọc trong một span đo wall time, CPU time và số bytes.
+Khi kết thúc job, trace được ghi ra JSON (định dạng Chrome trace event,
+mở được bằng chrome://tracing hoặc Perfetto) kèm bảng tổng hợp theo stage và mod.
+
+Khi không có tracer nào đang chạy, ``span()`` là no-op nên có thể gọi từ hot path.
+Các stage chạy song song (http trên nhiều thread) có thể có tổng wall time
+lớn hơn wall time của cả job.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Span:
+    """Một khoảng thời gian đo được của một stage"""
+
+    __slots__ = ('stage', 'mod', 'start', 'wall', 'cpu', 'bytes', 'thread_id')
+
+    def __init__(self, stage: str, mod: Optional[str], start: float, thread_id: int):
+        self.stage = stage
+        self.mod = mod
+        self.start = start
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.bytes = 0
+        self.thread_id = thread_id
+
+    def add_bytes(self, count: int):
+        self.bytes += count
+
+
+class _NullSpan:
+    """Span rỗng dùng khi không có tracer"""
+
+    def add_bytes(self, count: int):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _NullContext:
+    """Context manager rỗng, tái sử dụng để span() gần như không tốn chi phí"""
+
+    def __enter__(self):
+        return _NULL_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class JobTracer:
+    """Thu thập spans của một job và xuất trace/summary"""
+
+    def __init__(self, job_id: Optional[str] = None, trace_dir: str = "logs/traces"):
+        self.job_id = job_id or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.trace_dir = Path(trace_dir)
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.started_at = datetime.now()
+        self.current_mod: Optional[str] = None
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, stage: str, mod: Optional[str] = None, bytes_count: int = 0):
+        """
+        Đo một stage
+
+        Args:
+            stage: Tên stage
+            mod: Tên mod (mặc định lấy từ mod_context/current_mod)
+            bytes_count: Số bytes xử lý (có thể cộng thêm qua span.add_bytes)
+        """
+        mod = mod or getattr(self._local, 'mod', None) or self.current_mod
+        record = Span(stage, mod, time.perf_counter(), threading.get_ident())
+        record.bytes = bytes_count
+        cpu_start = time.thread_time()
+        try:
+            yield record
+        finally:
+            record.wall = time.perf_counter() - record.start
+            record.cpu = time.thread_time() - cpu_start
+            with self.lock:
+                self.spans.append(record)
+
+    @contextmanager
+    def mod_context(self, mod: str):
+        """Gắn tên mod cho các spans tạo ra trong block (theo thread và mặc định cho job)"""
+        previous_local = getattr(self._local, 'mod', None)
+        previous_current = self.current_mod
+        self._local.mod = mod
+        self.current_mod = mod
+        try:
+            yield
+        finally:
+            self._local.mod = previous_local
+            self.current_mod = previous_current
+
+    def summarize(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """
+        Tổng hợp spans theo (mod, stage)
+
+        Returns:
+            Dict (mod, stage) -> {calls, wall, cpu, bytes}
+        """
+        summary: Dict[Tuple[str, str], Dict[str, float]] = {}
+        with self.lock:
+            spans = list(self.spans)
+        for record in spans:
+            key = (record.mod or '-', record.stage)
+            entry = summary.setdefault(key, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'bytes': 0})
+            entry['calls'] += 1
+            entry['wall'] += record.wall
+            entry['cpu'] += record.cpu
+            entry['bytes'] += record.bytes
+        return summary
+
+    def stage_totals(self) -> Dict[str, Dict[str, float]]:
+        """Tổng hợp spans theo stage cho toàn job"""
+        totals: Dict[str, Dict[str, float]] = {}
+        for (_, stage), entry in self.summarize().items():
+            total = totals.setdefault(stage, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'bytes': 0})
+            for field in total:
+                total[field] += entry[field]
+        return totals
+
+    def format_summary(self) -> str:
+        """Bảng tổng hợp wall/CPU/bytes theo stage, sau đó theo mod"""
+        job_wall = time.perf_counter() - self.origin
+        lines = [f"Trace {self.job_id} - job wall time {job_wall:.2f}s",
+                 f"{'stage':<18}{'calls':>8}{'wall s':>10}{'cpu s':>10}{'bytes':>14}{'% wall':>8}"]
+
+        totals = self.stage_totals()
+        for stage, entry in sorted(totals.items(), key=lambda item: -item[1]['wall']):
+            share = entry['wall'] / job_wall * 100 if job_wall else 0
+            lines.append(f"{stage:<18}{entry['calls']:>8}{entry['wall']:>10.3f}{entry['cpu']:>10.3f}"
+                         f"{entry['bytes']:>14,}{share:>7.1f}%")
+
+        per_mod = self.summarize()
+        mods = sorted({mod for mod, _ in per_mod})
+        if len(mods) > 1 or (mods and mods[0] != '-'):
+            lines.append("")
+            lines.append(f"{'mod':<30}{'stage':<18}{'wall s':>10}{'cpu s':>10}{'bytes':>14}")
+            for mod in mods:
+                for (entry_mod, stage), entry in sorted(per_mod.items(), key=lambda item: -item[1]['wall']):
+                    if entry_mod == mod:
+                        lines.append(f"{mod[:29]:<30}{stage:<18}{entry['wall']:>10.3f}{entry['cpu']:>10.3f}"
+                                     f"{entry['bytes']:>14,}")
+        return '\n'.join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Trace ở định dạng Chrome trace event kèm summary"""
+        with self.lock:
+            spans = list(self.spans)
+        pid = os.getpid()
+        events = [{
+            'name': record.stage,
+            'cat': record.mod or '-',
+            'ph': 'X',
+            'ts': round((record.start - self.origin) * 1e6, 1),
+            'dur': round(record.wall * 1e6, 1),
+            'pid': pid,
+            'tid': record.thread_id,
+            'args': {'mod': record.mod, 'cpu_ms': round(record.cpu * 1000, 3), 'bytes': record.bytes}
+        } for record in spans]
+
+        return {
+            'job_id': self.job_id,
+            'started_at': self.started_at.isoformat(),
+            'wall_seconds': round(time.perf_counter() - self.origin, 4),
+            'stages': self.stage_totals(),
+            'mods': {f"{mod}|{stage}": entry for (mod, stage), entry in self.summarize().items()},
+            'traceEvents': events
+        }
+
+    def write(self) -> Path:
+        """Ghi trace JSON vào trace_dir/<job_id>.json và bảng tổng hợp vào <job_id>.txt"""
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        trace_file = self.trace_dir / f"{self.job_id}.json"
+        with open(trace_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        with open(self.trace_dir / f"{self.job_id}.txt", 'w', encoding='utf-8') as f:
+            f.write(self.format_summary() + '\n')
+        return trace_file
+
+
+# Tracer đang hoạt động (một job tại một thời điểm)
+_active_tracer: Optional[JobTracer] = None
+
+
+def start_tracer(job_id: Optional[str] = None, trace_dir: str = "logs/traces") -> JobTracer:
+    """Bắt đầu tracer mới và đặt làm tracer hiện tại"""
+    global _active_tracer
+    _active_tracer = JobTracer(job_id, trace_dir)
+    return _active_tracer
+
+
+def stop_tracer() -> Optional[JobTracer]:
+    """Dừng tracer hiện tại và trả về nó"""
+    global _active_tracer
+    tracer, _active_tracer = _active_tracer, None
+    return tracer
+
+
+def get_tracer() -> Optional[JobTracer]:
+    return _active_tracer
+
+
+def span(stage: str, mod: Optional[str] = None, bytes_count: int = 0):
+    """Span trên tracer hiện tại, no-op nếu không có tracer"""
+    tracer = _active_tracer
+    if tracer is None:
+        return _NULL_CONTEXT
+    return tracer.span(stage, mod, bytes_count)
+
+
+def mod_context(mod: str):
+    """Gắn tên mod cho các spans, no-op nếu không có tracer"""
+    tracer = _active_tracer
+    if tracer is None:
+        return _NULL_CONTEXT
+    return tracer.mod_context(mod)
@@ -0,0 +1,124 @@
+"""
+JSON codec dùng orjson hoặc msgspec khi có cài, fallback về json của stdlib
+
+Mọi chỗ đọc/ghi JSON trên đường nóng (response Google/DeepL, info.json,
+cache/TM) đi qua module này, nên cài thêm ``orjson`` (hoặc ``msgspec``) là đủ
+để tăng tốc mà không phải sửa code gọi. Có thể ép backend bằng biến môi trường
+``JSON_BACKEND=orjson|msgspec|json``.
+
+Snapshot cache dùng định dạng nhị phân gọn hơn: msgpack (qua msgspec) nếu có,
+ngược lại là JSON nén zlib. Byte đầu tiên cho biết định dạng nên file ghi bằng
+backend nào cũng đọc lại được (trừ msgpack khi máy đọc không có msgspec).
+"""
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _select_backend() -> str:
+    requested = os.getenv('JSON_BACKEND', '').lower()
+    available = {'orjson': orjson is not None, 'msgspec': msgspec is not None, 'json': True}
+    if available.get(requested):
+        return requested
+    for name in ('orjson', 'msgspec'):
+        if available[name]:
+            return name
+    return 'json'
+
+
+BACKEND = _select_backend()
+
+# Header của snapshot nhị phân
+SNAPSHOT_MSGPACK = b'M'
+SNAPSHOT_ZLIB_JSON = b'Z'
+
+UTF8_BOM = b'\xef\xbb\xbf'
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """Parse JSON từ bytes hoặc str (bỏ BOM UTF-8 nếu có)"""
+    if isinstance(data, str):
+        data = data.lstrip('\ufeff')
+    elif data[:3] == UTF8_BOM:
+        data = data[3:]
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    if BACKEND == 'msgspec':
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serialize sang JSON UTF-8 (không escape ký tự non-ASCII)
+
+    Args:
+        obj: Dữ liệu cần ghi
+        indent: Thụt lề 2 space như ``json.dump(..., indent=2)``
+    """
+    try:
+        if BACKEND == 'orjson':
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+            return orjson.dumps(obj, option=option)
+        if BACKEND == 'msgspec':
+            data = msgspec.json.encode(obj)
+            return msgspec.json.format(data, indent=2) if indent else data
+    except (TypeError, OverflowError):
+        pass  # Kiểu mà backend nhanh không hỗ trợ (int quá lớn...): dùng stdlib
+    text = json.dumps(obj, ensure_ascii=False, indent=2 if indent else None,
+                      separators=None if indent else (',', ':'))
+    return text.encode('utf-8')
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Như ``dumps_bytes`` nhưng trả về str"""
+    return dumps_bytes(obj, indent).decode('utf-8')
+
+
+def load_file(path: Union[str, Path]) -> Any:
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump_file(path: Union[str, Path], obj: Any, indent: bool = False):
+    with open(path, 'wb') as f:
+        f.write(dumps_bytes(obj, indent))
+
+
+def response_json(response) -> Any:
+    """Thay cho ``response.json()`` của requests: parse thẳng từ bytes của body"""
+    return loads(response.content)
+
+
+def dumps_binary(obj: Any) -> bytes:
+    """Snapshot nhị phân: msgpack nếu có msgspec, ngược lại JSON nén zlib"""
+    if msgspec is not None:
+        return SNAPSHOT_MSGPACK + msgspec.msgpack.encode(obj)
+    return SNAPSHOT_ZLIB_JSON + zlib.compress(dumps_bytes(obj), 1)
+
+
+def loads_binary(data: bytes) -> Any:
+    """Đọc snapshot do ``dumps_binary`` ghi"""
+    header, body = data[:1], data[1:]
+    if header == SNAPSHOT_MSGPACK:
+        if msgspec is None:
+            raise ValueError("Snapshot uses msgpack, install msgspec to read it")
+        return msgspec.msgpack.decode(body)
+    if header == SNAPSHOT_ZLIB_JSON:
+        return loads(zlib.decompress(body))
+    raise ValueError(f"Unknown snapshot format: {header!r}")
@@ -0,0 +1,108 @@
+"""
+Mô hình dạng cột cho các entry của một file locale .cfg
+
+Thay vì một dict ``{'index', 'key', 'val'}`` cho mỗi entry cộng với list toàn
+bộ các dòng, ``LocaleTable`` giữ nội dung file gốc trong một buffer duy nhất và
+các mảng offset song song (``array('I')``) trỏ vào buffer đó. Key và value
+chỉ được cắt ra khi cần, tên section được intern và lưu theo id. File đã dịch
+được sinh thẳng từ buffer: các đoạn không đổi giữa hai entry là một slice, nên
+không còn bước copy ``lines[:]`` khi ghép lại.
+"""
+import sys
+from array import array
+from typing import Iterator, List, Sequence
+
+
+class LocaleTable:
+    """Các entry ``key=value`` của một file cfg, lưu theo cột trên buffer nguồn"""
+
+    __slots__ = ('locale_file', 'content', 'line_starts', 'next_starts', 'key_starts', 'key_ends',
+                 'value_starts', 'value_ends', 'section_ids', 'sections')
+
+    def __init__(self, locale_file: str, content: str):
+        self.locale_file = locale_file
+        self.content = content
+        self.line_starts = array('I')    # Offset đầu dòng chứa entry
+        self.next_starts = array('I')    # Offset đầu dòng kế tiếp (sau ký tự xuống dòng)
+        self.key_starts = array('I')
+        self.key_ends = array('I')
+        self.value_starts = array('I')
+        self.value_ends = array('I')
+        self.section_ids = array('I')
+        self.sections: List[str] = ['']
+
+    @classmethod
+    def parse(cls, locale_file: str, content: str) -> 'LocaleTable':
+        """
+        Parse nội dung cfg, cùng quy tắc với ``ModFileProcessor.parse_cfg_content``:
+        dòng có ``=`` và không bắt đầu bằng ``;`` là một entry (key/value đã strip)
+        """
+        table = cls(locale_file, content)
+        section_index = {'': 0}
+        section_id = 0
+        offset = 0
+        for line in content.splitlines(keepends=True):
+            start = offset
+            offset += len(line)
+            stripped = line.strip()
+            if stripped.startswith('[') and stripped.endswith(']'):
+                name = sys.intern(stripped[1:-1].strip())
+                section_id = section_index.get(name)
+                if section_id is None:
+                    section_id = section_index[name] = len(table.sections)
+                    table.sections.append(name)
+            if '=' not in stripped or stripped.startswith(';'):
+                continue
+
+            equals = line.index('=')
+            key = line[:equals]
+            value = line[equals + 1:]
+            key_start = start + len(key) - len(key.lstrip())
+            value_start = start + equals + 1 + len(value) - len(value.lstrip())
+            table.line_starts.append(start)
+            table.next_starts.append(offset)
+            table.key_starts.append(key_start)
+            table.key_ends.append(key_start + len(key.strip()))
+            table.value_starts.append(value_start)
+            table.value_ends.append(value_start + len(value.strip()))
+            table.section_ids.append(section_id)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.line_starts)
+
+    def key(self, i: int) -> str:
+        return self.content[self.key_starts[i]:self.key_ends[i]]
+
+    def value(self, i: int) -> str:
+        return self.content[self.value_starts[i]:self.value_ends[i]]
+
+    @property
+    def values(self) -> List[str]:
+        content = self.content
+        return [content[start:end] for start, end in zip(self.value_starts, self.value_ends)]
+
+    def entry_sections(self) -> List[str]:
+        """Tên section của từng entry (string đã intern, không tạo bản sao)"""
+        sections = self.sections
+        return [sections[section_id] for section_id in self.section_ids]
+
+    def iter_output(self, translations: Sequence[str]) -> Iterator[str]:
+        """
+        Sinh nội dung file đã dịch: các đoạn giữa hai entry được lấy nguyên từ
+        buffer, mỗi entry được thay bằng ``key=bản dịch``
+
+        Args:
+            translations: Bản dịch theo thứ tự entry (thiếu thì giữ value gốc)
+        """
+        content = self.content
+        position = 0
+        for i in range(len(self.line_starts)):
+            line_start = self.line_starts[i]
+            if line_start > position:
+                yield content[position:line_start]
+            translation = translations[i] if i < len(translations) else self.value(i)
+            yield f"{self.key(i)}={translation}\n"
+            position = self.next_starts[i]
+        if position < len(content):
+            yield content[position:]
@@ -1,12 +1,20 @@
 """
 Logging configuration cho Factorio Mod Translator
 """
+import atexit
+import copy
+import json
 import logging
 import logging.handlers
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+from instrumentation import JobTracer, start_tracer, stop_tracer
 
 
 class ColoredFormatter(logging.Formatter):
@@ -23,23 +31,150 @@ class ColoredFormatter(logging.Formatter):
     }
     
     def format(self, record):
-        # Add color to levelname
+        # Tô màu levelname trên bản copy để các handler khác dùng chung record không bị dính mã ANSI
         if record.levelname in self.COLORS:
+            record = copy.copy(record)
             record.levelname = f"{self.COLORS[record.levelname]}{record.levelname}{self.COLORS['RESET']}"
         
         return super().format(record)
 
 
+class JsonLinesFormatter(logging.Formatter):
+    """Formatter JSON-lines: mỗi record là một object JSON trên một dòng"""
+    
+    def format(self, record):
+        entry: Dict[str, Any] = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'func': record.funcName,
+            'line': record.lineno,
+            'thread': record.threadName,
+        }
+        context = getattr(record, 'context', None)
+        if context:
+            entry.update(context)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ContextLogger(logging.LoggerAdapter):
+    """
+    Logger gắn sẵn context (job_id, mod, chunk...) vào mọi record
+    
+    Context được đưa vào ``record.context`` để JsonLinesFormatter xuất thành field riêng.
+    Dùng %-style args (``log.info("Chunk %d done", i)``) để message chỉ được format
+    khi record thực sự được ghi.
+    """
+    
+    def bind(self, **context) -> 'ContextLogger':
+        """Tạo logger mới với context bổ sung"""
+        return ContextLogger(self.logger, {**self.extra, **context})
+    
+    def process(self, msg, kwargs):
+        extra = kwargs.get('extra') or {}
+        kwargs['extra'] = {**extra, 'context': {**self.extra, **extra.get('context', {})}}
+        return msg, kwargs
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler không format record ở thread gọi log; listener thread sẽ format"""
+    
+    def prepare(self, record):
+        return record
+
+
+class LogSampler:
+    """
+    Giới hạn tần suất cho các message lặp lại (ví dụ log theo từng chunk)
+    
+    Mỗi key chỉ được emit tối đa một lần trong ``interval`` giây, các message
+    bị bỏ qua được đếm và báo lại ở lần emit tiếp theo.
+    """
+    
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._last_emit: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+        self.lock = threading.Lock()
+    
+    def _acquire(self, key: str, force: bool) -> Optional[int]:
+        """Trả về số message đã bị bỏ qua nếu được emit, None nếu phải bỏ qua"""
+        now = time.monotonic()
+        with self.lock:
+            last = self._last_emit.get(key)
+            if not force and last is not None and now - last < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return None
+            self._last_emit[key] = now
+            return self._suppressed.pop(key, 0)
+    
+    @staticmethod
+    def _with_suppressed(message: str, suppressed: int) -> str:
+        return f"{message} (+{suppressed} similar messages)" if suppressed else message
+    
+    def print(self, key: str, message: str, force: bool = False) -> bool:
+        """
+        Print message nếu key chưa emit trong interval
+        
+        Args:
+            key: Nhóm message (ví dụ "google.chunk")
+            message: Nội dung
+            force: Luôn emit (dùng cho chunk cuối cùng)
+            
+        Returns:
+            True nếu đã emit
+        """
+        suppressed = self._acquire(key, force)
+        if suppressed is None:
+            return False
+        print(self._with_suppressed(message, suppressed))
+        return True
+    
+    def log(self, logger: logging.Logger, level: int, key: str, message: str, force: bool = False) -> bool:
+        """Giống print() nhưng ghi vào logger"""
+        if not logger.isEnabledFor(level):
+            return False
+        suppressed = self._acquire(key, force)
+        if suppressed is None:
+            return False
+        logger.log(level, self._with_suppressed(message, suppressed))
+        return True
+
+
+# Sampler dùng chung cho các message theo chunk của translators
+_chunk_sampler = LogSampler(interval=float(os.getenv('LOG_SAMPLE_INTERVAL', '1.0')))
+
+
+def sampled_print(key: str, message: str, force: bool = False) -> bool:
+    """Print message qua sampler dùng chung"""
+    return _chunk_sampler.print(key, message, force)
+
+
 class LoggerManager:
     """Manager cho logging system"""
     
-    def __init__(self, app_name: str = "FactorioModTranslator", log_dir: str = "logs"):
+    def __init__(self, app_name: str = "FactorioModTranslator", log_dir: str = "logs",
+                 use_queue: Optional[bool] = None, json_logs: Optional[bool] = None):
+        """
+        Args:
+            app_name: Tên ứng dụng
+            log_dir: Thư mục chứa log files
+            use_queue: Ghi log qua QueueListener (mặc định theo biến môi trường LOG_QUEUE)
+            json_logs: Ghi file log dạng JSON-lines (mặc định theo LOG_FORMAT=json)
+        """
         self.app_name = app_name
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
+        self.use_queue = self._is_queue_mode() if use_queue is None else use_queue
+        self.json_logs = self._is_json_mode() if json_logs is None else json_logs
+        self.handlers: List[logging.Handler] = []
+        self.listener: Optional[logging.handlers.QueueListener] = None
         
         # Tạo các log files
-        self.main_log_file = self.log_dir / "app.log"
+        self.main_log_file = self.log_dir / ("app.jsonl" if self.json_logs else "app.log")
         self.error_log_file = self.log_dir / "errors.log"
         self.debug_log_file = self.log_dir / "debug.log"
         
@@ -51,6 +186,7 @@ class LoggerManager:
         self.logger = logging.getLogger(self.app_name)
         self.logger.setLevel(logging.DEBUG)
         self.logger.handlers.clear()  # Clear existing handlers
+        self.handlers = []
         
         # Console handler với màu sắc
         console_handler = logging.StreamHandler()
@@ -60,7 +196,7 @@ class LoggerManager:
             datefmt='%H:%M:%S'
         )
         console_handler.setFormatter(console_formatter)
-        self.logger.addHandler(console_handler)
+        self.handlers.append(console_handler)
         
         # File handler cho tất cả logs
         file_handler = logging.handlers.RotatingFileHandler(
@@ -70,11 +206,14 @@ class LoggerManager:
             encoding='utf-8'
         )
         file_handler.setLevel(logging.DEBUG)
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
-        )
+        if self.json_logs:
+            file_formatter = JsonLinesFormatter()
+        else:
+            file_formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
+            )
         file_handler.setFormatter(file_formatter)
-        self.logger.addHandler(file_handler)
+        self.handlers.append(file_handler)
         
         # Error file handler
         error_handler = logging.handlers.RotatingFileHandler(
@@ -85,7 +224,7 @@ class LoggerManager:
         )
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(file_formatter)
-        self.logger.addHandler(error_handler)
+        self.handlers.append(error_handler)
         
         # Debug file handler (optional, chỉ khi debug mode)
         if self._is_debug_mode():
@@ -100,12 +239,41 @@ class LoggerManager:
                 '%(asctime)s - %(name)s - %(levelname)s - %(module)s.%(funcName)s:%(lineno)d - %(message)s'
             )
             debug_handler.setFormatter(debug_formatter)
-            self.logger.addHandler(debug_handler)
+            self.handlers.append(debug_handler)
+        
+        if self.use_queue:
+            # Thread gọi log chỉ put record vào queue, listener thread format và ghi file
+            log_queue = queue.SimpleQueue()
+            self.logger.addHandler(_LazyQueueHandler(log_queue))
+            self.listener = logging.handlers.QueueListener(
+                log_queue, *self.handlers, respect_handler_level=True
+            )
+            self.listener.start()
+            atexit.register(self.shutdown)
+        else:
+            for handler in self.handlers:
+                self.logger.addHandler(handler)
     
     def _is_debug_mode(self) -> bool:
         """Kiểm tra có đang ở debug mode không"""
         return os.getenv('DEBUG', '').lower() in ['1', 'true', 'yes']
     
+    def _is_json_mode(self) -> bool:
+        """Kiểm tra có ghi log dạng JSON-lines không"""
+        return os.getenv('LOG_FORMAT', '').lower() == 'json'
+    
+    def _is_queue_mode(self) -> bool:
+        """Kiểm tra có bật queue logging không (mặc định bật)"""
+        return os.getenv('LOG_QUEUE', '1').lower() in ['1', 'true', 'yes']
+    
+    def shutdown(self):
+        """Dừng listener thread, ghi nốt các record còn trong queue"""
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+        for handler in self.handlers:
+            handler.flush()
+    
     def get_logger(self, name: Optional[str] = None) -> logging.Logger:
         """
         Lấy logger instance
@@ -120,9 +288,22 @@ class LoggerManager:
             return logging.getLogger(f"{self.app_name}.{name}")
         return self.logger
     
+    def bind(self, name: Optional[str] = None, **context) -> ContextLogger:
+        """
+        Lấy logger có sẵn context
+        
+        Args:
+            name: Tên của logger (optional)
+            **context: Các field gắn vào mọi record (job_id, mod, chunk...)
+            
+        Returns:
+            ContextLogger instance
+        """
+        return ContextLogger(self.get_logger(name), context)
+    
     def set_level(self, level: int):
         """Set logging level cho console output"""
-        for handler in self.logger.handlers:
+        for handler in self.handlers:
             if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
                 handler.setLevel(level)
     
@@ -144,43 +325,51 @@ class LoggerManager:
     def log_translation_start(self, mod_count: int, target_lang: str, endpoint: str):
         """Log bắt đầu translation"""
         logger = self.get_logger("translation")
-        logger.info(f"Starting translation process:")
-        logger.info(f"  - Mods to translate: {mod_count}")
-        logger.info(f"  - Target language: {target_lang}")
-        logger.info(f"  - DeepL endpoint: {endpoint}")
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        logger.info("Starting translation process:")
+        logger.info("  - Mods to translate: %d", mod_count)
+        logger.info("  - Target language: %s", target_lang)
+        logger.info("  - DeepL endpoint: %s", endpoint)
     
     def log_translation_progress(self, current: int, total: int, mod_name: str):
         """Log tiến độ translation"""
         logger = self.get_logger("translation")
+        if not logger.isEnabledFor(logging.INFO):
+            return
         percentage = (current / total) * 100 if total > 0 else 0
-        logger.info(f"Progress: {current}/{total} ({percentage:.1f}%) - Processing: {mod_name}")
+        logger.info("Progress: %d/%d (%.1f%%) - Processing: %s", current, total, percentage, mod_name)
     
     def log_translation_complete(self, success_count: int, failed_count: int, duration: float):
         """Log kết thúc translation"""
         logger = self.get_logger("translation")
-        logger.info(f"Translation completed:")
-        logger.info(f"  - Successful: {success_count}")
-        logger.info(f"  - Failed: {failed_count}")
-        logger.info(f"  - Duration: {duration:.2f}s")
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        logger.info("Translation completed:")
+        logger.info("  - Successful: %d", success_count)
+        logger.info("  - Failed: %d", failed_count)
+        logger.info("  - Duration: %.2fs", duration)
     
     def log_api_usage(self, character_count: int, character_limit: int):
         """Log API usage"""
         logger = self.get_logger("api")
+        if not logger.isEnabledFor(logging.INFO):
+            return
         percentage = (character_count / character_limit) * 100 if character_limit > 0 else 0
-        logger.info(f"DeepL API Usage: {character_count:,}/{character_limit:,} characters ({percentage:.1f}%)")
+        logger.info("DeepL API Usage: %s/%s characters (%.1f%%)",
+                    f"{character_count:,}", f"{character_limit:,}", percentage)
     
     def log_file_operation(self, operation: str, file_path: str, success: bool, details: str = ""):
         """Log file operations"""
         logger = self.get_logger("file")
+        level = logging.INFO if success else logging.ERROR
+        if not logger.isEnabledFor(level):
+            return
         status = "SUCCESS" if success else "FAILED"
-        message = f"File {operation} {status}: {file_path}"
         if details:
-            message += f" - {details}"
-        
-        if success:
-            logger.info(message)
+            logger.log(level, "File %s %s: %s - %s", operation, status, file_path, details)
         else:
-            logger.error(message)
+            logger.log(level, "File %s %s: %s", operation, status, file_path)
     
     def log_error(self, error: Exception, context: str = ""):
         """Log errors với full traceback"""
@@ -188,6 +377,42 @@ class LoggerManager:
         message = f"Error in {context}: {str(error)}" if context else f"Error: {str(error)}"
         logger.error(message, exc_info=True)
     
+    def start_trace(self, job_id: Optional[str] = None) -> JobTracer:
+        """
+        Bắt đầu đo thời gian từng stage cho một job
+        
+        Args:
+            job_id: ID của job (tự sinh nếu None)
+            
+        Returns:
+            JobTracer đang hoạt động
+        """
+        tracer = start_tracer(job_id, str(self.log_dir / "traces"))
+        self.get_logger("trace").info("Started trace %s", tracer.job_id)
+        return tracer
+    
+    def finish_trace(self) -> Optional[Path]:
+        """
+        Kết thúc trace hiện tại, ghi JSON trace và log bảng tổng hợp
+        
+        Returns:
+            Path tới file trace, hoặc None nếu không có trace nào
+        """
+        tracer = stop_tracer()
+        if tracer is None:
+            return None
+        
+        logger = self.get_logger("trace")
+        try:
+            trace_file = tracer.write()
+        except Exception as e:
+            logger.error(f"Failed to write trace {tracer.job_id}: {e}")
+            return None
+        
+        logger.info("Stage timings:\n%s", tracer.format_summary())
+        logger.info("Trace written to %s", trace_file)
+        return trace_file
+    
     def cleanup_old_logs(self, days_to_keep: int = 7):
         """Cleanup logs cũ hơn n ngày"""
         try:
@@ -207,19 +432,24 @@ class LoggerManager:
 _logger_manager: Optional[LoggerManager] = None
 
 
-def setup_logging(app_name: str = "FactorioModTranslator", log_dir: str = "logs") -> LoggerManager:
+def setup_logging(app_name: str = "FactorioModTranslator", log_dir: str = "logs",
+                  use_queue: Optional[bool] = None, json_logs: Optional[bool] = None) -> LoggerManager:
     """
     Setup logging cho toàn bộ ứng dụng
     
     Args:
         app_name: Tên ứng dụng
         log_dir: Thư mục chứa log files
+        use_queue: Ghi log qua queue listener thread (None = theo LOG_QUEUE)
+        json_logs: Ghi file log dạng JSON-lines (None = theo LOG_FORMAT)
         
     Returns:
         LoggerManager instance
     """
     global _logger_manager
-    _logger_manager = LoggerManager(app_name, log_dir)
+    if _logger_manager is not None:
+        _logger_manager.shutdown()
+    _logger_manager = LoggerManager(app_name, log_dir, use_queue, json_logs)
     _logger_manager.log_system_info()
     return _logger_manager
 
@@ -0,0 +1,358 @@
+"""
+Metrics registry theo kiểu Prometheus cho các job dịch chạy lâu
+
+Translators, limiter, cache và zip writer cập nhật counters/gauges/histograms
+trong registry dùng chung ``REGISTRY``. Registry có thể được xuất qua endpoint
+HTTP ``/metrics`` (text exposition format) và/hoặc ghi snapshot JSON định kỳ.
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Buckets mặc định (giây) cho latency
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Buckets cho số texts mỗi chunk
+CHUNK_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500)
+# Buckets cho thời gian chờ limiter
+WAIT_BUCKETS = (0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 15.0, 60.0)
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """Base class cho các metric có labels"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+    def snapshot(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Counter chỉ tăng"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        with self.lock:
+            return sum(self.values.values())
+
+    def render(self) -> List[str]:
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in items]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {'|'.join(key) or '_': value for key, value in self.values.items()}
+
+
+class Gauge(Counter):
+    """Gauge có thể set giá trị bất kỳ"""
+
+    type_name = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(_Metric):
+    """Histogram với buckets cố định (cumulative như Prometheus)"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., count, sum]
+        self.values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            data = self.values.get(key)
+            if data is None:
+                data = self.values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += 1
+            data[-1] += value
+
+    def render(self) -> List[str]:
+        with self.lock:
+            items = sorted((key, list(data)) for key, data in self.values.items())
+        lines = []
+        for key, data in items:
+            for bound, count in zip(self.buckets, data):
+                bucket_labels = _format_labels(self.label_names, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            inf_labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {data[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {data[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {round(data[-1], 6)}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {'|'.join(key) or '_': {'count': data[-2], 'sum': round(data[-1], 6),
+                                          'buckets': dict(zip(map(str, self.buckets), data))}
+                    for key, data in self.values.items()}
+
+
+class MetricsRegistry:
+    """Tập hợp các metric, render ra text format hoặc snapshot dict"""
+
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {'timestamp': time.time(),
+                'metrics': {metric.name: metric.snapshot() for metric in metrics}}
+
+
+REGISTRY = MetricsRegistry()
+
+# Metrics dùng chung cho translators/limiter/cache/zip writer
+REQUESTS = REGISTRY.counter('translate_requests_total', 'Translation HTTP requests', ('provider', 'status'))
+REQUEST_LATENCY = REGISTRY.histogram('translate_request_seconds', 'Translation request latency',
+                                     ('provider',), LATENCY_BUCKETS)
+CHUNK_SIZE = REGISTRY.histogram('translate_chunk_texts', 'Texts per translation request',
+                                ('provider',), CHUNK_SIZE_BUCKETS)
+RETRIES = REGISTRY.counter('translate_retries_total', 'Retried or backed-off requests', ('provider', 'reason'))
+LIMITER_WAIT = REGISTRY.histogram('translate_limiter_wait_seconds', 'Time spent waiting on rate limiters',
+                                  ('provider',), WAIT_BUCKETS)
+CACHE_LOOKUPS = REGISTRY.counter('translate_cache_lookups_total', 'Translation cache lookups', ('result',))
+CACHE_HIT_RATIO = REGISTRY.gauge('translate_cache_hit_ratio', 'Translation cache hit ratio')
+STRINGS = REGISTRY.counter('translate_strings_total', 'Strings translated')
+STRINGS_PER_SECOND = REGISTRY.gauge('translate_strings_per_second', 'Strings translated per second in the current job')
+ZIP_BYTES = REGISTRY.counter('zip_written_bytes_total', 'Uncompressed bytes written into zip files')
+
+_job_lock = threading.Lock()
+_job_started = time.monotonic()
+_job_strings = 0
+
+
+def record_cache_lookups(hits: int, misses: int):
+    """Cập nhật counters cache và hit ratio"""
+    if hits:
+        CACHE_LOOKUPS.inc(hits, result='hit')
+    if misses:
+        CACHE_LOOKUPS.inc(misses, result='miss')
+    total_hits = CACHE_LOOKUPS.get(result='hit')
+    total = total_hits + CACHE_LOOKUPS.get(result='miss')
+    if total:
+        CACHE_HIT_RATIO.set(round(total_hits / total, 4))
+
+
+def start_job():
+    """Reset mốc thời gian tính strings/s cho job mới"""
+    global _job_started, _job_strings
+    with _job_lock:
+        _job_started = time.monotonic()
+        _job_strings = 0
+    STRINGS_PER_SECOND.set(0)
+
+
+def record_strings(count: int):
+    """Ghi nhận số strings đã dịch và cập nhật strings/s của job hiện tại"""
+    global _job_strings
+    STRINGS.inc(count)
+    with _job_lock:
+        _job_strings += count
+        elapsed = time.monotonic() - _job_started
+        rate = _job_strings / elapsed if elapsed > 0 else 0.0
+    STRINGS_PER_SECOND.set(round(rate, 2))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serve /metrics (text format) và /metrics.json (snapshot)"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        registry = self.server.registry
+        if self.path.split('?')[0] == '/metrics':
+            body, content_type = registry.render(), 'text/plain; version=0.0.4'
+        elif self.path.split('?')[0] == '/metrics.json':
+            body, content_type = json.dumps(registry.snapshot()), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class MetricsServer:
+    """HTTP endpoint /metrics chạy trên thread nền, chỉ bind localhost mặc định"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = '127.0.0.1', port: int = 9464):
+        self.httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.registry = registry
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> 'MetricsServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class SnapshotWriter:
+    """Ghi snapshot JSON của registry định kỳ (ghi file tạm rồi rename)"""
+
+    def __init__(self, path: str, registry: MetricsRegistry = REGISTRY, interval: float = 15.0):
+        self.path = Path(path)
+        self.registry = registry
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def write(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.registry.snapshot(), f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                pass
+
+    def start(self) -> 'SnapshotWriter':
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=1)
+        try:
+            self.write()
+        except OSError:
+            pass
+
+
+_server: Optional[MetricsServer] = None
+_snapshot_writer: Optional[SnapshotWriter] = None
+
+
+def start_exporters(port: int = 0, snapshot_path: Optional[str] = None,
+                    interval: float = 15.0) -> Optional[str]:
+    """
+    Bật endpoint /metrics và/hoặc snapshot file (idempotent)
+
+    Args:
+        port: Port cho endpoint /metrics (0 = không bật)
+        snapshot_path: File JSON snapshot (None = không ghi)
+        interval: Chu kỳ ghi snapshot (giây)
+
+    Returns:
+        URL của endpoint /metrics nếu đang chạy
+    """
+    global _server, _snapshot_writer
+    if port and _server is None:
+        _server = MetricsServer(port=port).start()
+    if snapshot_path and _snapshot_writer is None:
+        _snapshot_writer = SnapshotWriter(snapshot_path, interval=interval).start()
+    return _server.url if _server else None
+
+
+def stop_exporters():
+    """Dừng endpoint và ghi snapshot cuối cùng"""
+    global _server, _snapshot_writer
+    if _server:
+        _server.stop()
+        _server = None
+    if _snapshot_writer:
+        _snapshot_writer.stop()
+        _snapshot_writer = None
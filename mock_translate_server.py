@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Mock translation server cho benchmark và test offline
+
+Giả lập response của Google ``translate_a/single`` và DeepL ``/v2/*`` với
+latency, tỉ lệ 429 và tỉ lệ response hỏng có thể cấu hình.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+
+def fake_translate(text: str, target_lang: str) -> str:
+    """Bản dịch giả, giữ nguyên số dòng và placeholder"""
+    return '\n'.join(f"[{target_lang.lower()}] {line}" if line else line for line in text.split('\n'))
+
+
+class MockServerConfig:
+    """Cấu hình hành vi của mock server"""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, rate_429: float = 0.0,
+                 malformed_rate: float = 0.0, character_limit: int = 500000, seed: int = 42):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.malformed_rate = malformed_rate
+        self.character_limit = character_limit
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+        # Counters
+        self.requests = 0
+        self.rate_limited = 0
+        self.malformed = 0
+        self.characters = 0
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.random.random()
+
+    def delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'rate_limited': self.rate_limited,
+                'malformed': self.malformed,
+                'characters': self.characters
+            }
+
+
+class MockTranslateHandler(BaseHTTPRequestHandler):
+    """HTTP handler cho các endpoint Google/DeepL giả lập"""
+
+    server_version = "MockTranslate/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def config(self) -> MockServerConfig:
+        return self.server.config
+
+    def log_message(self, format, *args):
+        # Không in access log để tránh ảnh hưởng benchmark
+        pass
+
+    def _read_params(self) -> Dict[str, List[str]]:
+        params = parse_qs(urlparse(self.path).query, keep_blank_values=True)
+        length = int(self.headers.get('Content-Length', 0) or 0)
+        if length:
+            body = self.rfile.read(length).decode('utf-8')
+            for key, values in parse_qs(body, keep_blank_values=True).items():
+                params.setdefault(key, []).extend(values)
+        return params
+
+    def _send(self, status: int, body: str, content_type: str = 'application/json'):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        if status == 429:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _simulate(self) -> bool:
+        """Áp dụng latency và lỗi giả lập, trả về False nếu đã gửi response lỗi"""
+        config = self.config
+        with config.lock:
+            config.requests += 1
+        time.sleep(config.delay())
+
+        if config.rate_429 and config.roll() < config.rate_429:
+            with config.lock:
+                config.rate_limited += 1
+            self._send(429, json.dumps({"message": "Too many requests"}))
+            return False
+
+        if config.malformed_rate and config.roll() < config.malformed_rate:
+            with config.lock:
+                config.malformed += 1
+            self._send(200, '{"translations": [')
+            return False
+
+        return True
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def do_DELETE(self):
+        path = urlparse(self.path).path
+        if path.startswith('/v2/glossaries/'):
+            self._send(204, '')
+        else:
+            self._send(404, json.dumps({"message": "Not found"}))
+
+    def _dispatch(self):
+        path = urlparse(self.path).path
+        params = self._read_params()
+
+        if path.endswith('/translate_a/single'):
+            self._google_translate(params)
+        elif path == '/v2/translate':
+            self._deepl_translate(params)
+        elif path == '/v2/usage':
+            with self.config.lock:
+                usage = {"character_count": self.config.characters,
+                         "character_limit": self.config.character_limit}
+            self._send(200, json.dumps(usage))
+        elif path == '/v2/glossaries' and self.command == 'POST':
+            self._send(201, json.dumps({"glossary_id": str(uuid.uuid4()), "ready": True}))
+        elif path.startswith('/v2/glossaries/'):
+            self._send(200, json.dumps({"glossary_id": path.rsplit('/', 1)[-1], "ready": True}))
+        elif path == '/stats':
+            self._send(200, json.dumps(self.config.snapshot()))
+        else:
+            self._send(404, json.dumps({"message": "Not found"}))
+
+    def _google_translate(self, params):
+        if not self._simulate():
+            return
+        text = params.get('q', [''])[0]
+        target_lang = params.get('tl', ['vi'])[0]
+        with self.config.lock:
+            self.config.characters += len(text)
+
+        # Google chia response thành các segment theo câu/dòng
+        segments = []
+        lines = text.split('\n')
+        for i, line in enumerate(lines):
+            suffix = '\n' if i < len(lines) - 1 else ''
+            translated = fake_translate(line, target_lang)
+            segments.append([translated + suffix, line + suffix, None, None, 10])
+        self._send(200, json.dumps([segments, None, params.get('sl', ['en'])[0]], ensure_ascii=False))
+
+    def _deepl_translate(self, params):
+        if not self._simulate():
+            return
+        texts = params.get('text', [])
+        target_lang = params.get('target_lang', ['VI'])[0]
+        char_count = sum(len(text) for text in texts)
+        with self.config.lock:
+            if self.config.characters + char_count > self.config.character_limit:
+                quota_exceeded = True
+            else:
+                quota_exceeded = False
+                self.config.characters += char_count
+        if quota_exceeded:
+            self._send(456, json.dumps({"message": "Quota exceeded"}))
+            return
+
+        translations = [{"detected_source_language": "EN", "text": fake_translate(text, target_lang)}
+                        for text in texts]
+        self._send(200, json.dumps({"translations": translations}, ensure_ascii=False))
+
+
+class MockTranslateServer:
+    """Chạy mock server trên thread nền"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, config: MockServerConfig = None):
+        self.config = config or MockServerConfig()
+        self.httpd = ThreadingHTTPServer((host, port), MockTranslateHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = self.config
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def google_url(self) -> str:
+        return f"{self.base_url}/translate_a/single"
+
+    @property
+    def deepl_url(self) -> str:
+        return f"{self.base_url}/v2"
+
+    def start(self) -> 'MockTranslateServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Google/DeepL translation server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help="Latency trung bình (giây)")
+    parser.add_argument('--jitter', type=float, default=0.02, help="Biên độ dao động latency (giây)")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="Tỉ lệ response 429")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="Tỉ lệ response JSON hỏng")
+    parser.add_argument('--character-limit', type=int, default=500000, help="DeepL character quota")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    config = MockServerConfig(args.latency, args.jitter, args.rate_429, args.malformed_rate,
+                              args.character_limit, args.seed)
+    server = MockTranslateServer(args.host, args.port, config)
+    print(f"🧪 Mock translate server on {server.base_url}")
+    print(f"   Google: {server.google_url}")
+    print(f"   DeepL:  {server.deepl_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
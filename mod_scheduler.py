@@ -0,0 +1,111 @@
+"""
+Sắp xếp thứ tự dịch mod theo dependency trong info.json
+
+Thư viện (flib, mferrari_lib, alien-biomes...) được dịch trước các mod phụ thuộc
+vào chúng, và trong các mod cùng "tầng" thì mod có nhiều string dùng chung với
+mod khác nhất được dịch trước. Nhờ vậy cache đã ấm khi tới các mod phụ thuộc
+và modpack (Alien-Chaos...) thay vì gửi lại cùng một string nhiều lần.
+"""
+import heapq
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from translation_pipeline import ParsedMod, TranslationPipeline
+
+# "? flib >= 0.12", "(?) foo", "~ bar", "! incompatible", "base >= 2.0"
+DEPENDENCY_PATTERN = re.compile(r'^\s*(\(\?\)|\?|!|~)?\s*(.+?)\s*(?:(?:<=|>=|<|>|=)\s*[\d.]+)?\s*$')
+
+
+def parse_dependencies(info: Dict) -> List[str]:
+    """Tên các mod mà mod này phụ thuộc (bắt buộc hoặc tùy chọn), bỏ qua mod xung đột"""
+    names = []
+    for dependency in info.get('dependencies', []) or []:
+        match = DEPENDENCY_PATTERN.match(str(dependency))
+        if match and match.group(1) != '!':
+            names.append(match.group(2))
+    return names
+
+
+class ModScheduler:
+    """Parse trước các mod, tính thứ tự dịch theo dependency và số string dùng chung"""
+
+    def __init__(self, pipeline: TranslationPipeline):
+        self.pipeline = pipeline
+        self.parsed: Dict[str, Optional[ParsedMod]] = {}
+        self.shared_scores: Dict[str, int] = {}
+
+    def parse_mod(self, mod_path: str) -> Optional[ParsedMod]:
+        """ParsedMod đã parse khi lập lịch (chỉ dùng một lần), hoặc parse mới"""
+        if mod_path in self.parsed:
+            return self.parsed.pop(mod_path)
+        return self.pipeline.parse_mod(mod_path)
+
+    def schedule(self, mod_paths: List[str]) -> List[str]:
+        """
+        Thứ tự topo theo dependency giữa các mod được chọn; mod cùng tầng xếp theo
+        số string dùng chung với mod khác (nhiều trước), rồi theo thứ tự ban đầu.
+        Vòng phụ thuộc được phá bằng cách lấy mod có điểm cao nhất còn lại.
+
+        Returns:
+            mod_paths theo thứ tự nên dịch
+        """
+        names: Dict[str, str] = {}
+        values: Dict[str, Set[str]] = {}
+        for mod_path in mod_paths:
+            parsed = self.pipeline.parse_mod(mod_path)
+            self.parsed[mod_path] = parsed
+            if parsed is not None:
+                names[mod_path] = parsed.name
+                values[mod_path] = set(parsed.values)
+
+        occurrences = Counter(value for mod_values in values.values() for value in mod_values)
+        self.shared_scores = {mod_path: sum(occurrences[value] - 1 for value in mod_values)
+                              for mod_path, mod_values in values.items()}
+
+        path_by_name = {name: mod_path for mod_path, name in names.items()}
+        dependents: Dict[str, List[str]] = {mod_path: [] for mod_path in mod_paths}
+        pending_deps = {mod_path: 0 for mod_path in mod_paths}
+        for mod_path, parsed in self.parsed.items():
+            if parsed is None:
+                continue
+            for dependency in set(parse_dependencies(parsed.info)):
+                dependency_path = path_by_name.get(dependency)
+                if dependency_path and dependency_path != mod_path:
+                    dependents[dependency_path].append(mod_path)
+                    pending_deps[mod_path] += 1
+
+        position = {mod_path: i for i, mod_path in enumerate(mod_paths)}
+
+        def priority(mod_path):
+            return (-self.shared_scores.get(mod_path, 0), position[mod_path], mod_path)
+
+        ready = [priority(mod_path) for mod_path in mod_paths if pending_deps[mod_path] == 0]
+        heapq.heapify(ready)
+        order = []
+        done = set()
+        while len(order) < len(mod_paths):
+            if not ready:
+                # Vòng phụ thuộc: lấy mod tốt nhất trong số còn lại
+                remaining = min((mod_path for mod_path in mod_paths if mod_path not in done), key=priority)
+                pending_deps[remaining] = 0
+                heapq.heappush(ready, priority(remaining))
+            mod_path = heapq.heappop(ready)[2]
+            if mod_path in done:
+                continue
+            done.add(mod_path)
+            order.append(mod_path)
+            for dependent in dependents[mod_path]:
+                pending_deps[dependent] -= 1
+                if pending_deps[dependent] == 0 and dependent not in done:
+                    heapq.heappush(ready, priority(dependent))
+        return order
+
+    def describe(self, order: List[str]) -> str:
+        """Một dòng mô tả thứ tự dịch cho log"""
+        labels = []
+        for mod_path in order:
+            parsed = self.parsed.get(mod_path)
+            name = parsed.name if parsed else mod_path
+            labels.append(f"{name} ({self.shared_scores.get(mod_path, 0)} shared)")
+        return " → ".join(labels)
@@ -6,8 +6,6 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from pathlib import Path
 import zipfile
-import json
-import shutil
 import requests
 import time
 from threading import Lock
@@ -16,12 +14,24 @@ from datetime import datetime
 import os
 import threading
 from mod_translate_pack_core import process_mods_to_language_pack
-from mod_translate_core import read_cfg_file, translate_texts as core_translate_texts
 from mod_translate_pack_core import translate_texts as pack_translate_texts
-from improved_mod_finder import find_locale_files_improved
 from google_translate_core import GoogleTranslateAPI
 from google_translate_safe import SafeGoogleTranslateAPI
 from update_info_json import InfoJsonUpdater
+from network_utils import DeepLAPI
+from deepl_glossary import DeepLGlossaryManager
+from translation_pipeline import LanguageStream, ModResult, TranslationPipeline, is_english_content
+from output_sinks import DirectorySink, ZipSink
+from instrumentation import mod_context
+import json_codec
+from logger_config import get_logger_manager
+import metrics
+from profiling import JobProfiler
+from mod_scheduler import ModScheduler
+from priority_job import PriorityTranslationJob
+from translation_planner import JobPlanner
+from translation_router import (TranslationRouter, SafeGoogleProvider, GoogleProvider,
+                                DeepLProvider, LocalStubProvider)
 
 # Import Sample Mod Manager
 try:
@@ -29,6 +39,12 @@ try:
 except ImportError:
     show_sample_mod_dialog = None
 
+# Target language -> thư mục locale của Factorio
+FACTORIO_LOCALES = {'ZH': 'zh-CN'}
+
+LANGUAGE_PACK_VERSION = '1.0.0'
+
+
 class ModTranslatorApp(tk.Tk):
     def get_machine_key(self):
         mac = uuid.getnode()
@@ -52,9 +68,15 @@ class ModTranslatorApp(tk.Tk):
         config['SETTINGS'] = {
             'mod_name': self.mod_name_var.get(),
             'lang': self.lang_var.get(),
+            'extra_langs': self.extra_langs_var.get(),
             'api_key': self.encrypt_api_key(self.api_key_var.get()) if self.api_key_var.get() else '',
             'endpoint': self.endpoint_var.get(),
             'translation_service': self.translation_service_var.get(),
+            'deepl_concurrency': str(self.deepl_concurrency),
+            'glossary_path': self.glossary_path or '',
+            'metrics_port': str(self.metrics_port),
+            'interim_minutes': str(self.interim_minutes),
+            'metrics_snapshot': self.metrics_snapshot or '',
         }
         with open('config.ini', 'w', encoding='utf-8') as f:
             config.write(f)
@@ -67,8 +89,17 @@ class ModTranslatorApp(tk.Tk):
             if 'SETTINGS' in config:
                 self.mod_name_var.set(config['SETTINGS'].get('mod_name', ''))
                 self.lang_var.set(config['SETTINGS'].get('lang', 'VI'))
+                self.extra_langs_var.set(config['SETTINGS'].get('extra_langs', ''))
                 self.endpoint_var.set(config['SETTINGS'].get('endpoint', 'api.deepl.com'))
                 self.translation_service_var.set(config['SETTINGS'].get('translation_service', 'Safe Google Translate (Recommended)'))
+                self.deepl_concurrency = config['SETTINGS'].getint('deepl_concurrency', fallback=4)
+                self.metrics_port = config['SETTINGS'].getint('metrics_port', fallback=0)
+                self.interim_minutes = config['SETTINGS'].getfloat('interim_minutes', fallback=10)
+                self.metrics_snapshot = config['SETTINGS'].get('metrics_snapshot', '') or None
+                glossary_path = config['SETTINGS'].get('glossary_path', '')
+                if glossary_path and os.path.exists(glossary_path):
+                    self.glossary_path = glossary_path
+                    self.glossary_label.config(text=os.path.basename(glossary_path), fg="black")
                 api_key_enc = config['SETTINGS'].get('api_key', '')
                 if api_key_enc:
                     try:
@@ -99,6 +130,12 @@ class ModTranslatorApp(tk.Tk):
         self.is_translating = False  # Trạng thái đang dịch
         self.translation_cancelled = False  # Trạng thái hủy dịch
         self.translation_service_var = tk.StringVar(self, value="Safe Google Translate (Recommended)")
+        self.deepl_concurrency = 4  # Số batch DeepL gửi đồng thời
+        self.metrics_port = 0  # Port cho endpoint /metrics (0 = tắt)
+        self.metrics_snapshot = None  # File JSON snapshot metrics định kỳ
+        self.profile_var = tk.BooleanVar(self, value=False)  # Profile job bằng cProfile/tracemalloc
+        self.priority_var = tk.BooleanVar(self, value=False)  # Dịch tên trước, xuất bản pack tạm định kỳ
+        self.interim_minutes = 10  # Chu kỳ xuất bản pack tạm (phút)
         
         # Template mod info
         self.template_info = None
@@ -183,7 +220,8 @@ class ModTranslatorApp(tk.Tk):
         service_frame.pack(fill="x", padx=10, pady=5)
         tk.Label(service_frame, text="🌐 Translation Service:", font=('Arial', 9, 'bold')).pack(side="left")
         self.service_combo = ttk.Combobox(service_frame, textvariable=self.translation_service_var,
-                                        values=["Safe Google Translate (Recommended)", "Google Translate (Fast)", "DeepL API"],
+                                        values=["Safe Google Translate (Recommended)", "Google Translate (Fast)", "DeepL API",
+                                                "Auto Router (All Providers)"],
                                         state="readonly", width=30, font=('Arial', 9))
         self.service_combo.pack(side="left", padx=5)
         self.service_combo.bind('<<ComboboxSelected>>', self.on_service_change)
@@ -221,6 +259,11 @@ class ModTranslatorApp(tk.Tk):
                                       values=["VI", "JA", "EN", "ZH", "FR", "DE", "ES"], 
                                       state="readonly", width=8, font=('Arial', 9))
         self.lang_combo.pack(side="left", padx=5)
+        # Ngôn ngữ thêm (ví dụ "JA, ZH"): parse mod một lần, dịch song song, mỗi ngôn ngữ một pack
+        tk.Label(lang_subframe, text="➕ Also:", font=('Arial', 9)).pack(side="left")
+        self.extra_langs_var = tk.StringVar(value="")
+        tk.Entry(lang_subframe, textvariable=self.extra_langs_var, width=10,
+                 font=('Arial', 9)).pack(side="left", padx=5)
 
         # Endpoint selection
         endpoint_subframe = tk.Frame(config_frame)
@@ -232,6 +275,21 @@ class ModTranslatorApp(tk.Tk):
                                           state="readonly", width=15, font=('Arial', 9))
         self.endpoint_combo.pack(side="left", padx=5)
 
+        # Glossary selection (DeepL glossary)
+        glossary_frame = tk.Frame(settings_frame)
+        glossary_frame.pack(fill="x", padx=10, pady=5)
+        tk.Label(glossary_frame, text="📖 Glossary:", font=('Arial', 9, 'bold')).pack(side="left")
+        self.glossary_label = tk.Label(glossary_frame, text="None", fg="gray", font=('Arial', 9))
+        self.glossary_label.pack(side="left", padx=5)
+        tk.Button(glossary_frame, text="📂 Select", command=self.select_glossary,
+                 bg='#3498db', fg='white', font=('Arial', 8, 'bold')).pack(side="right")
+
+        # Profiling option
+        tk.Checkbutton(settings_frame, text="🔬 Profile job (cProfile + tracemalloc, lưu vào logs/profiles)",
+                       variable=self.profile_var, font=('Arial', 9)).pack(anchor="w", padx=10, pady=(0, 5))
+        tk.Checkbutton(settings_frame, text="⏩ Priority mode (dịch tên item/entity/technology trước, xuất pack tạm định kỳ)",
+                       variable=self.priority_var, font=('Arial', 9)).pack(anchor="w", padx=10, pady=(0, 5))
+
         # Translation Statistics (for Safe Google Translate)
         self.stats_frame = tk.LabelFrame(main_frame, text="📈 Translation Statistics", 
                                         font=('Arial', 10, 'bold'), fg='#2c3e50')
@@ -304,6 +362,10 @@ class ModTranslatorApp(tk.Tk):
         tk.Button(top_buttons_frame, text="💾 Save Settings", command=self.save_settings,
                  height=2, bg="#3498db", fg="white", font=('Arial', 11, 'bold')).pack(side="right")
         
+        # Dry run button (ước lượng trước khi dịch, không gọi API)
+        tk.Button(top_buttons_frame, text="🧮 Dry Run", command=self.dry_run,
+                 height=2, bg="#16a085", fg="white", font=('Arial', 11, 'bold')).pack(side="right", padx=(0, 5))
+        
         # Bottom row buttons
         bottom_buttons_frame = tk.Frame(control_frame)
         bottom_buttons_frame.pack(fill="x")
@@ -394,16 +456,15 @@ class ModTranslatorApp(tk.Tk):
                 info_files = [name for name in zipf.namelist() if name.endswith('info.json')]
                 
                 if info_files:
-                    with zipf.open(info_files[0]) as f:
-                        info_data = json.load(f)
-                        template_info.update({
-                            'name': info_data.get('name', ''),
-                            'version': info_data.get('version', '1.0.0'),
-                            'title': info_data.get('title', ''),
-                            'author': info_data.get('author', ''),
-                            'description': info_data.get('description', ''),
-                            'dependencies': info_data.get('dependencies', [])
-                        })
+                    info_data = json_codec.loads(zipf.read(info_files[0]))
+                    template_info.update({
+                        'name': info_data.get('name', ''),
+                        'version': info_data.get('version', '1.0.0'),
+                        'title': info_data.get('title', ''),
+                        'author': info_data.get('author', ''),
+                        'description': info_data.get('description', ''),
+                        'dependencies': info_data.get('dependencies', [])
+                    })
                 
                 # Tìm locale files (tiếng Việt) - flexible pattern matching
                 locale_files = [name for name in zipf.namelist() 
@@ -417,93 +478,89 @@ class ModTranslatorApp(tk.Tk):
             print(f"Error extracting template info: {e}")
             return None
     
-    def create_new_template_version(self, translated_mods):
-        """Tạo phiên bản mới của template mod với các bản dịch mới"""
-        if not self.template_info:
-            return None
-            
+    def start_template_version(self):
+        """
+        Mở zip cho phiên bản mới của template: output/<name>_<version>.zip
+
+        Các file cfg dịch xong được ghi thẳng vào zip này trong lúc dịch,
+        nội dung còn lại của template được copy vào khi kết thúc job.
+
+        Returns:
+            Tuple of (ZipSink, tên template mới, version mới)
+        """
+        new_version = self.increment_version(self.template_info['version'])
+        new_name = f"{self.template_info['name']}_{new_version.replace('.', '')}"
+        sink = ZipSink(Path("output") / f"{new_name}.zip")
+        return sink, new_name, new_version
+
+    def create_new_template_version(self, translated_mods, sink, new_name, new_version):
+        """
+        Hoàn tất phiên bản mới của template: copy nội dung template gốc vào zip
+        đang mở (đổi thư mục gốc thành new_name, cập nhật info.json) mà không
+        giải nén ra thư mục tạm
+
+        Các file locale/vi/*.cfg vừa dịch đã có trong sink được giữ nguyên, file
+        cfg cũ của template chỉ được copy khi mod đó không được dịch lại.
+
+        Returns:
+            Đường dẫn zip mới hoặc None nếu lỗi
+        """
         try:
-            # Tăng version của template
-            current_version = self.template_info['version']
-            new_version = self.increment_version(current_version)
-            
-            # Tạo tên mới cho template
-            base_name = self.template_info['name']
-            new_name = f"{base_name}_{new_version.replace('.', '')}"
-            
-            # Tạo thư mục tạm cho template mới
-            import tempfile
-            with tempfile.TemporaryDirectory() as temp_dir:
-                new_template_dir = os.path.join(temp_dir, new_name)
-                
-                # Giải nén template gốc
-                with zipfile.ZipFile(self.template_info['zip_path'], 'r') as zipf:
-                    zipf.extractall(temp_dir)
-                
-                # Tìm thư mục gốc của template
-                extracted_dirs = [d for d in os.listdir(temp_dir) if os.path.isdir(os.path.join(temp_dir, d))]
-                if not extracted_dirs:
+            with zipfile.ZipFile(self.template_info['zip_path'], 'r') as zipf:
+                members = [info for info in zipf.infolist() if not info.is_dir()]
+                # Thư mục gốc của template là thư mục chứa info.json
+                info_files = [info.filename for info in members if info.filename.endswith('info.json')]
+                root_names = info_files or [info.filename for info in members if '/' in info.filename]
+                if not root_names:
+                    sink.abort()
                     return None
-                
-                old_template_dir = os.path.join(temp_dir, extracted_dirs[0])
-                
-                # Đổi tên thư mục
-                os.rename(old_template_dir, new_template_dir)
-                
-                # Cập nhật info.json
-                info_json_path = os.path.join(new_template_dir, 'info.json')
-                if os.path.exists(info_json_path):
-                    with open(info_json_path, 'r', encoding='utf-8') as f:
-                        info_data = json.load(f)
-                    
-                    # Cập nhật thông tin
-                    info_data['name'] = new_name
-                    info_data['version'] = new_version
-                    
-                    # Thêm các mod đã dịch vào dependencies
-                    dependencies = info_data.get('dependencies', [])
-                    for mod_name in translated_mods:
-                        dep_entry = f"? {mod_name}"
-                        if dep_entry not in dependencies:
-                            dependencies.append(dep_entry)
-                    info_data['dependencies'] = dependencies
-                    
-                    # Cập nhật mô tả
-                    timestamp = datetime.now().strftime('%Y-%m-%d')
-                    info_data['description'] = f"{info_data.get('description', '')} (Updated: {timestamp})"
-                    
-                    with open(info_json_path, 'w', encoding='utf-8') as f:
-                        json.dump(info_data, f, ensure_ascii=False, indent=2)
-                
-                # Sao chép các file .cfg mới từ Code mau đến template
-                self.copy_new_locale_files_to_template(new_template_dir, translated_mods)
-                
-                # Tạo file zip mới
-                output_dir = "output"
-                os.makedirs(output_dir, exist_ok=True)
-                new_zip_path = os.path.join(output_dir, f"{new_name}.zip")
-                
-                with zipfile.ZipFile(new_zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for root, dirs, files in os.walk(new_template_dir):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            arcname = os.path.relpath(file_path, temp_dir)
-                            zipf.write(file_path, arcname)
-                
-                return new_zip_path
-                
+                root = root_names[0].split('/')[0]
+
+                for info in members:
+                    parts = info.filename.split('/', 1)
+                    if parts[0] != root or len(parts) < 2:
+                        continue
+                    name = f"{new_name}/{parts[1]}"
+                    if parts[1] == 'info.json':
+                        info_data = json_codec.loads(zipf.read(info))
+
+                        # Cập nhật thông tin
+                        info_data['name'] = new_name
+                        info_data['version'] = new_version
+
+                        # Thêm các mod đã dịch vào dependencies
+                        dependencies = info_data.get('dependencies', [])
+                        for mod_name in translated_mods:
+                            dep_entry = f"? {mod_name}"
+                            if dep_entry not in dependencies:
+                                dependencies.append(dep_entry)
+                        info_data['dependencies'] = dependencies
+
+                        # Cập nhật mô tả
+                        timestamp = datetime.now().strftime('%Y-%m-%d')
+                        info_data['description'] = f"{info_data.get('description', '')} (Updated: {timestamp})"
+
+                        sink.write_bytes(name, json_codec.dumps_bytes(info_data, indent=True))
+                    elif not sink.has(name):
+                        # Không ghi đè file mới dịch
+                        with zipf.open(info) as source:
+                            sink.write_bytes(name, source)
+
+                # File .cfg tiếng Việt nằm ngoài thư mục gốc của template
+                for locale_file_path in self.template_info.get('locale_files', []):
+                    name = f"{new_name}/locale/vi/{os.path.basename(locale_file_path)}"
+                    if not locale_file_path.startswith(f"{root}/") and not sink.has(name):
+                        with zipf.open(locale_file_path) as source:
+                            sink.write_bytes(name, source)
+
+            sink.close()
+            return str(sink.zip_path)
+
         except Exception as e:
+            sink.abort()
             print(f"Error creating new template version: {e}")
             return None
-        finally:
-            # Cleanup temp_translations directory
-            try:
-                temp_dir = Path("temp_translations")
-                if temp_dir.exists():
-                    shutil.rmtree(temp_dir)
-            except Exception as e:
-                print(f"Warning: Could not cleanup temp directory: {e}")
-    
+
     def increment_version(self, version_str):
         """Tăng version của mod"""
         try:
@@ -521,48 +578,6 @@ class ModTranslatorApp(tk.Tk):
         except:
             return "1.0.1"
     
-    def copy_new_locale_files_to_template(self, template_dir, translated_mods):
-        """Sao chép các file locale mới vào template"""
-        try:
-            # Thư mục locale/vi trong template
-            locale_vi_dir = os.path.join(template_dir, "locale", "vi")
-            os.makedirs(locale_vi_dir, exist_ok=True)
-            
-            # Sao chép các file .cfg từ thư mục temp_translations
-            temp_translations_dir = "temp_translations"
-            if os.path.exists(temp_translations_dir):
-                for cfg_file in os.listdir(temp_translations_dir):
-                    if cfg_file.endswith('.cfg'):
-                        mod_name = os.path.splitext(cfg_file)[0]
-                        if mod_name in translated_mods:
-                            source_file = os.path.join(temp_translations_dir, cfg_file)
-                            dest_file = os.path.join(locale_vi_dir, cfg_file)
-                            shutil.copy2(source_file, dest_file)
-            
-            # Sao chép các file .cfg cũ từ template gốc (nếu có)
-            if self.template_info and self.template_info.get('locale_files'):
-                with zipfile.ZipFile(self.template_info['zip_path'], 'r') as zipf:
-                    for locale_file_path in self.template_info['locale_files']:
-                        if (('locale/vi/' in locale_file_path or 'locale\\vi\\' in locale_file_path or '/vi/' in locale_file_path) 
-                            and locale_file_path.endswith('.cfg')):
-                            try:
-                                # Đọc nội dung file từ zip
-                                content = zipf.read(locale_file_path).decode('utf-8')
-                                
-                                # Tên file
-                                cfg_filename = os.path.basename(locale_file_path)
-                                dest_file = os.path.join(locale_vi_dir, cfg_filename)
-                                
-                                # Chỉ copy nếu chưa có file mới (không ghi đè file mới dịch)
-                                if not os.path.exists(dest_file):
-                                    with open(dest_file, 'w', encoding='utf-8') as f:
-                                        f.write(content)
-                            except Exception as e:
-                                print(f"Error copying old locale file {locale_file_path}: {e}")
-                        
-        except Exception as e:
-            print(f"Error copying locale files: {e}")
-    
     def analyze_language_pack(self):
         """Phân tích language pack hiện tại"""
         try:
@@ -610,10 +625,15 @@ class ModTranslatorApp(tk.Tk):
             self.api_status_label.config(text="✅", fg='green')
         else:
             # Hiện API key controls cho DeepL
-            self.api_label.config(text="🔑 DeepL API Key:")
             self.api_entry.config(state='normal')
-            # Ẩn statistics panel
-            self.stats_frame.pack_forget()
+            if "Auto" in service:
+                # Router dùng Safe Google làm provider chính, DeepL key là tùy chọn
+                self.api_label.config(text="🔀 DeepL API Key (optional):")
+                self.stats_frame.pack(fill="x", pady=(0, 10))
+            else:
+                self.api_label.config(text="🔑 DeepL API Key:")
+                # Ẩn statistics panel
+                self.stats_frame.pack_forget()
             self.on_api_key_change()
             
     def on_api_key_change(self, event=None):
@@ -699,6 +719,31 @@ class ModTranslatorApp(tk.Tk):
             self.glossary_label.config(text="None", fg="gray")
 
 
+    def dry_run(self):
+        """Ước lượng requests, ký tự và thời gian của job từ dữ liệu local"""
+        if not self.selected_files:
+            messagebox.showwarning("No Files", "Please add at least one mod file to estimate.")
+            return
+
+        def dry_run_thread():
+            try:
+                # Có DeepL key thì lấy quota còn lại từ /usage để ước lượng đúng phần DeepL
+                api_key = self.api_key_var.get().strip()
+                deepl = (DeepLAPI(api_key, self.endpoint_var.get(), max_concurrency=self.deepl_concurrency)
+                         if api_key else None)
+                planner = JobPlanner(self.lang_var.get(), self.glossary_path,
+                                     deepl_concurrency=self.deepl_concurrency, deepl_api=deepl)
+                report = JobPlanner.format_report(planner.plan(list(self.selected_files)))
+                print(report)
+                self.after(0, lambda: messagebox.showinfo("Dry Run Estimate", report))
+            except Exception as e:
+                self.after(0, lambda: messagebox.showerror("Dry Run Failed", str(e)))
+            finally:
+                self.after(0, lambda: self.status_label.config(text="🟢 Ready"))
+
+        self.status_label.config(text="🧮 Estimating job cost...")
+        threading.Thread(target=dry_run_thread, daemon=True).start()
+
     def start_translation(self):
         if not self.selected_files:
             messagebox.showwarning("No Files", "Please add at least one mod file to translate.")
@@ -711,6 +756,9 @@ class ModTranslatorApp(tk.Tk):
             if not deepl_api_key:
                 messagebox.showerror("DeepL API Key Missing", "Please enter your DeepL API Key.")
                 return
+        elif "Auto" in service:
+            # DeepL là tùy chọn trong chế độ router
+            deepl_api_key = self.api_key_var.get().strip() or None
         else:
             deepl_api_key = None  # Sử dụng Google Translate
 
@@ -746,111 +794,342 @@ class ModTranslatorApp(tk.Tk):
         threading.Thread(target=self.run_translation, args=(mods_to_translate, deepl_api_key, output_dir, service)).start()
 
     def run_translation(self, mods_to_translate, deepl_api_key, output_dir, translation_service):
+        job = self._run_translation_job
+        if len(self.get_target_languages()) > 1:
+            job = self._run_multi_language_job
+        elif self.priority_var.get():
+            job = self._run_priority_job
+        if not self.profile_var.get():
+            job(mods_to_translate, deepl_api_key, output_dir, translation_service)
+            return
+        with JobProfiler():
+            job(mods_to_translate, deepl_api_key, output_dir, translation_service)
+
+    def get_target_languages(self):
+        """Ngôn ngữ chính và các ngôn ngữ thêm, không trùng lặp"""
+        languages = [self.lang_var.get().upper()]
+        for lang in self.extra_langs_var.get().replace(',', ' ').split():
+            if lang.upper() not in languages:
+                languages.append(lang.upper())
+        return languages
+
+    def build_language_stream(self, lang, deepl_api_key, translation_service, output_dir):
+        """
+        Tạo luồng dịch cho một ngôn ngữ với translator riêng
+
+        Mọi stream (và mọi process trên máy) rút từ cùng một budget Safe Google trong
+        rate_limits.db vì Google giới hạn theo IP, không theo ngôn ngữ.
+
+        Glossary chỉ áp dụng cho ngôn ngữ chính vì file glossary chứa bản dịch của ngôn ngữ đó.
+
+        Returns:
+            Tuple of (LanguageStream, SafeGoogleTranslateAPI hoặc None)
+        """
+        glossary_path = self.glossary_path if lang == self.lang_var.get().upper() else None
+        progress = lambda current, total, msg: self.update_progress(current, total, f"[{lang}] {msg}")
+        safe = None
+        deepl = None
+        glossary_id = None
+        if deepl_api_key:
+            deepl = DeepLAPI(deepl_api_key, self.endpoint_var.get(), max_concurrency=self.deepl_concurrency)
+            if glossary_path:
+                glossary_id = DeepLGlossaryManager(deepl).ensure_glossary(glossary_path, lang)
+
+        if "Auto" in translation_service:
+            router = self.build_translation_router(deepl, glossary_id)
+            safe = self.google_translator
+            translate_fn = lambda texts: router.translate_texts(texts, lang, 'en', progress_callback=progress)
+        elif "Google" in translation_service:
+            api = SafeGoogleTranslateAPI() if "Safe" in translation_service else GoogleTranslateAPI()
+            if "Safe" in translation_service:
+                safe = api
+            translate_fn = lambda texts: api.translate_texts(texts, lang, 'en', progress_callback=progress)
+        else:
+            translate_fn = lambda texts: deepl.translate_texts_batch(
+                texts, lang, glossary_id=glossary_id,
+                progress_callback=lambda current, total, done: progress(current, total, ''),
+                source_lang="EN")
+
+        cache_lookup = None
+        invalidate_fn = None
+        if safe:
+            target_code = safe.get_language_code(lang)
+            cache_lookup = lambda text: safe.get_cached_translation(text, target_code)
+            invalidate_fn = lambda text: safe.mark_bad_translation(text, target_code)
+        stream = LanguageStream(lang, translate_fn, output_dir, glossary_path, cache_lookup, invalidate_fn)
+        return stream, safe
+
+    def language_pack_name(self, lang):
+        base_name = self.mod_name_var.get().strip() or "Auto_Translate_Mod_Langue"
+        return f"{base_name}_{lang}"
+
+    def open_language_pack(self, lang, output_dir):
+        """
+        Mở zip của pack một ngôn ngữ: <output_dir>/<pack>_<version>.zip
+
+        Zip được ghi ra file tạm và chỉ rename khi ``write_language_pack`` đóng
+        nó, nên server không bao giờ đọc phải zip đang ghi dở.
+
+        Returns:
+            Tuple of (ZipSink, sink của thư mục locale trong pack)
+        """
+        pack_name = self.language_pack_name(lang)
+        sink = ZipSink(Path(output_dir) / f"{pack_name}_{LANGUAGE_PACK_VERSION}.zip")
+        return sink, sink.subdir(f"{pack_name}/locale/{FACTORIO_LOCALES.get(lang, lang.lower())}")
+
+    def write_language_pack(self, lang, sink, translated_mods):
+        """Ghi info.json cho pack của một ngôn ngữ vào zip đang mở rồi đóng zip"""
+        pack_name = self.language_pack_name(lang)
+        info = {
+            'name': pack_name,
+            'version': LANGUAGE_PACK_VERSION,
+            'title': f"{self.mod_name_var.get().strip() or 'Auto_Translate_Mod_Langue'} ({lang})",
+            'author': 'Auto_Translate_Mod_Langue',
+            'factorio_version': '2.0',
+            'description': f"Language pack {lang} (Updated: {datetime.now().strftime('%Y-%m-%d')})",
+            'dependencies': [f"? {mod_name}" for mod_name in translated_mods],
+        }
+        sink.write_bytes(f"{pack_name}/info.json", json_codec.dumps_bytes(info, indent=True))
+        sink.close()
+        return str(sink.zip_path)
+
+    def start_job_metrics(self, job_log):
+        """Reset số liệu strings/s cho job mới và bật exporter; lỗi bind port chỉ là cảnh báo"""
+        metrics.start_job()
+        try:
+            metrics_url = metrics.start_exporters(self.metrics_port, self.metrics_snapshot)
+        except OSError as e:
+            job_log.warning("Could not start metrics exporter on port %s: %s", self.metrics_port, e)
+            return
+        if metrics_url:
+            print(f"📈 Metrics available at {metrics_url}")
+
+    def _run_priority_job(self, mods_to_translate, deepl_api_key, output_dir, translation_service):
+        """Job ưu tiên: dịch tên hiển thị của mọi mod trước, xuất bản pack tạm theo chu kỳ"""
+        lang = self.lang_var.get().upper()
+        self.progress["value"] = 0
+        self.status_label.config(text="Translating mods (priority mode)...")
+        tracer = get_logger_manager().start_trace()
+        job_log = get_logger_manager().bind("translation", job_id=tracer.job_id,
+                                            service=translation_service, target_lang=lang)
+        try:
+            self.start_job_metrics(job_log)
+            stream, safe = self.build_language_stream(lang, deepl_api_key, translation_service, None)
+            pipeline = TranslationPipeline(lang, self.glossary_path)
+
+            def publish(results, final):
+                # Mỗi lần xuất bản nén lại pack từ kết quả trong memory, không qua thư mục tạm
+                sink, cfg_sink = self.open_language_pack(lang, output_dir)
+                try:
+                    for result in results:
+                        pipeline.write_mod_cfg(result, cfg_sink)
+                    if safe:
+                        safe.save_cache()
+                    zip_path = self.write_language_pack(lang, sink, [r.name for r in results])
+                except Exception:
+                    sink.abort()
+                    raise
+                print(f"📦 {'Final' if final else 'Interim'} pack published: {zip_path}")
+                job_log.info("Published %s pack %s", 'final' if final else 'interim', zip_path)
+
+            scheduler = ModScheduler(pipeline)
+            schedule = scheduler.schedule(list(self.selected_files))
+            print(f"🗂️ Translation order: {scheduler.describe(schedule)}")
+            job = PriorityTranslationJob(pipeline, stream.translate_fn, stream.cache_lookup, stream.invalidate_fn,
+                                         publish, self.interim_minutes * 60)
+            results = job.run(schedule, scheduler.parse_mod)
+
+            translated_mods = [r.name for r in results if r.status == ModResult.TRANSLATED]
+            messagebox.showinfo("Translation Results",
+                                f"Translation completed.\n\nTranslated Mods: {len(translated_mods)}\n"
+                                f"Packs published: {job.publish_count}\n\n"
+                                f"Translated: {', '.join(translated_mods)}")
+            self.status_label.config(text="Translation completed.")
+        except Exception as e:
+            job_log.exception("Translation job failed")
+            self.status_label.config(text=f"Error: {e}")
+        finally:
+            trace_file = get_logger_manager().finish_trace()
+            if trace_file:
+                print(f"⏱️ Stage timings saved to {trace_file}")
+
+    def _run_multi_language_job(self, mods_to_translate, deepl_api_key, output_dir, translation_service):
+        """Job nhiều ngôn ngữ: parse mỗi mod một lần, dịch song song, mỗi ngôn ngữ một pack"""
+        languages = self.get_target_languages()
+        self.progress["value"] = 0
+        self.status_label.config(text=f"Translating mods to {', '.join(languages)}...")
+        tracer = get_logger_manager().start_trace()
+        job_log = get_logger_manager().bind("translation", job_id=tracer.job_id,
+                                            service=translation_service, target_lang=','.join(languages))
+        pack_sinks = {}
+        try:
+            self.start_job_metrics(job_log)
+            streams = []
+            safe_translators = []
+            for lang in languages:
+                # Mỗi mod dịch xong được nén thẳng vào zip của pack tương ứng
+                pack_sinks[lang], cfg_sink = self.open_language_pack(lang, output_dir)
+                stream, safe = self.build_language_stream(lang, deepl_api_key, translation_service, cfg_sink)
+                streams.append(stream)
+                if safe:
+                    safe_translators.append(safe)
+            print(f"🌍 Multi-language job: {', '.join(languages)} ({len(self.selected_files)} mods parsed once)")
+
+            pipeline = TranslationPipeline(self.lang_var.get(), self.glossary_path)
+            scheduler = ModScheduler(pipeline)
+            schedule = scheduler.schedule(list(self.selected_files))
+            print(f"🗂️ Translation order: {scheduler.describe(schedule)}")
+            results = pipeline.run_languages(schedule, streams, scheduler.parse_mod)
+            for safe in safe_translators:
+                safe.save_cache()
+
+            summary = []
+            for lang in languages:
+                translated_mods = [r.name for r in results[lang] if r.status == ModResult.TRANSLATED]
+                if translated_mods:
+                    zip_path = self.write_language_pack(lang, pack_sinks[lang], translated_mods)
+                    summary.append(f"{lang}: {len(translated_mods)} mods -> {os.path.basename(zip_path)}")
+                else:
+                    pack_sinks[lang].abort()
+                    summary.append(f"{lang}: no mods translated")
+                job_log.bind(target_lang=lang).info("Translated %d mods", len(translated_mods))
+
+            messagebox.showinfo("Translation Results", "Translation completed.\n\n" + "\n".join(summary))
+            self.status_label.config(text="Translation completed.")
+        except Exception as e:
+            for sink in pack_sinks.values():
+                sink.abort()
+            job_log.exception("Translation job failed")
+            self.status_label.config(text=f"Error: {e}")
+        finally:
+            trace_file = get_logger_manager().finish_trace()
+            if trace_file:
+                print(f"⏱️ Stage timings saved to {trace_file}")
+
+    def _run_translation_job(self, mods_to_translate, deepl_api_key, output_dir, translation_service):
         self.progress["value"] = 0
         self.status_label.config(text="Translating mods...")
         translated_mods = []
         skipped_mods = []
         no_lang_mods = []
-
+        deepl = None
+        glossary_id = None
+        router = None
+        template_sink = None
+        tracer = get_logger_manager().start_trace()
+        job_log = get_logger_manager().bind("translation", job_id=tracer.job_id,
+                                            service=translation_service, target_lang=self.lang_var.get())
         try:
-            # Process each mod zip file
-            for mod_path in self.selected_files:
-                with zipfile.ZipFile(mod_path, 'r') as zipf:
-                    # Read info.json to get mod name
-                    info_json_path = next((f for f in zipf.namelist() if f.endswith('info.json')), None)
-                    if not info_json_path:
-                        continue
+            self.start_job_metrics(job_log)
+            if deepl_api_key:
+                # Tạo DeepL client và đồng bộ glossary một lần cho cả job
+                deepl = DeepLAPI(deepl_api_key, self.endpoint_var.get(),
+                                 max_concurrency=self.deepl_concurrency)
+                glossary_id = DeepLGlossaryManager(deepl).ensure_glossary(
+                    self.glossary_path, self.lang_var.get())
+                if glossary_id:
+                    print(f"📖 Using DeepL glossary {glossary_id}")
 
-                    with zipf.open(info_json_path) as f:
-                        info = json.load(f)
-                        mod_name = info.get("name", "unknown_mod")
+            if "Auto" in translation_service:
+                router = self.build_translation_router(deepl, glossary_id)
 
-                    # Find locale files in the zip using improved finder
-                    root_folder, locale_files = find_locale_files_improved(mod_path)
-                    
-                    if not locale_files:
+            pipeline = TranslationPipeline(self.lang_var.get(), self.glossary_path)
+
+            # Thư viện và mod có nhiều string dùng chung được dịch trước để cache ấm cho mod phụ thuộc
+            scheduler = ModScheduler(pipeline)
+            schedule = scheduler.schedule(list(self.selected_files))
+            print(f"🗂️ Translation order: {scheduler.describe(schedule)}")
+
+            if self.template_info:
+                # Mở zip của template mới ngay từ đầu, mỗi mod dịch xong được nén luôn
+                template_sink, new_name, new_version = self.start_template_version()
+                cfg_sink = template_sink.subdir(f"{new_name}/locale/vi")
+            else:
+                # Nếu không có template, lưu vào Code mau mặc định
+                cfg_sink = DirectorySink("Code mau/Auto_Translate_Mod_Langue_Vietnamese_1.0.0/locale/vi")
+
+            # Process each mod zip file
+            for mod_path in schedule:
+                with mod_context(Path(mod_path).stem):
+                    # Read info.json và parse locale/en/*.cfg với English filtering (đã parse khi lập lịch)
+                    parsed = scheduler.parse_mod(mod_path)
+                    if parsed is None:
+                        continue
+                    mod_name = parsed.name
+                
+                    if not parsed.file_entries and not parsed.skipped_files:
                         print(f"Warning: {mod_name} has no English locale *.cfg files, skipping...")
                         skipped_mods.append(mod_name)
                         continue
 
-                    # Translate locale/en/*.cfg files using key->value mapping with English filtering
-                    from mod_translate_core import parse_cfg_lines
-                    all_values = []
-                    file_entries = []  # list of (locale_file, key_vals, lines)
-                    for locale_file in locale_files:
-                        raw_text = read_cfg_file(zipf, locale_file)
-                        key_vals, lines = parse_cfg_lines(raw_text)
-                        
-                        # Lọc chỉ nội dung tiếng Anh thực sự
-                        if self.is_english_content(key_vals):
-                            file_entries.append((locale_file, key_vals, lines))
-                            all_values.extend([item['val'] for item in key_vals])
-                            print(f"    ✅ Processed {len(key_vals)} English entries from {os.path.basename(locale_file)}")
-                        else:
-                            print(f"    ⚪ Skipped {os.path.basename(locale_file)} - not English content")
-
-                    translated_values = []
-                    if all_values:
-                        # Lựa chọn translation service
-                        if "Google" in translation_service:
-                            if "Safe" in translation_service:
-                                # Sử dụng Safe Google Translate
-                                self.google_translator = SafeGoogleTranslateAPI()
-                                print(f"    ⚙️ Using Safe Google Translate (Max 25 RPM, with caching)")
-                            else:
-                                # Sử dụng Fast Google Translate
-                                self.google_translator = GoogleTranslateAPI()
-                                print(f"    ⚡ Using Fast Google Translate (Higher speed, higher risk)")
-                                
-                            translated_values = self.google_translator.translate_texts(
-                                all_values, 
-                                self.lang_var.get(), 
-                                'en',
-                                progress_callback=lambda current, total, msg: self.update_progress_with_stats(current, total, msg)
-                            )
-                        else:
-                            # Sử dụng DeepL API
-                            endpoint = self.endpoint_var.get()
-                            from mod_translate_core import translate_texts
-                            translated_values = translate_texts(all_values, deepl_api_key, self.lang_var.get(), None, endpoint)
-                    else:
+                    all_values = parsed.values
+                    if not all_values:
                         no_lang_mods.append(mod_name)
                         continue
 
-                    # Reconstruct files and merge into single mod cfg
-                    merged_lines = []
-                    tv_iter = iter(translated_values)
-                    for locale_file, key_vals, lines in file_entries:
-                        translated_lines = lines[:]
-                        for item in key_vals:
-                            try:
-                                translated_val = next(tv_iter)
-                            except StopIteration:
-                                translated_val = item['val']
-                            translated_lines[item['index']] = f"{item['key']}={translated_val}\n"
-                        merged_lines.extend(translated_lines)
-
-                    # Save translated file - chỉ lưu vào tạm thời nếu có template
-                    if self.template_info:
-                        # Lưu tạm file CFG để sau này copy vào template mới
-                        temp_cfg_dir = Path("temp_translations")
-                        temp_cfg_dir.mkdir(exist_ok=True)
-                        mod_cfg_path = temp_cfg_dir / f"{mod_name}.cfg"
-                        with open(mod_cfg_path, "w", encoding="utf-8") as f:
-                            f.writelines(merged_lines)
+                    # Lựa chọn translation service
+                    cache_lookup = None
+                    invalidate_fn = None
+                    if router:
+                        target_code = self.google_translator.get_language_code(self.lang_var.get())
+                        cache_lookup = lambda text: self.google_translator.get_cached_translation(text, target_code)
+                        invalidate_fn = lambda text: self.google_translator.mark_bad_translation(text, target_code)
+                        translate_fn = lambda texts: router.translate_texts(
+                            texts,
+                            self.lang_var.get(),
+                            'en',
+                            progress_callback=lambda current, total, msg: self.update_progress_with_stats(current, total, msg)
+                        )
+                    elif "Google" in translation_service:
+                        if "Safe" in translation_service:
+                            # Sử dụng Safe Google Translate
+                            self.google_translator = SafeGoogleTranslateAPI()
+                            print(f"    ⚙️ Using Safe Google Translate (Max 25 RPM, with caching)")
+                            target_code = self.google_translator.get_language_code(self.lang_var.get())
+                            cache_lookup = lambda text: self.google_translator.get_cached_translation(text, target_code)
+                            invalidate_fn = lambda text: self.google_translator.mark_bad_translation(text, target_code)
+                        else:
+                            # Sử dụng Fast Google Translate
+                            self.google_translator = GoogleTranslateAPI()
+                            print(f"    ⚡ Using Fast Google Translate (Higher speed, higher risk)")
+                        
+                        translate_fn = lambda texts: self.google_translator.translate_texts(
+                            texts, 
+                            self.lang_var.get(), 
+                            'en',
+                            progress_callback=lambda current, total, msg: self.update_progress_with_stats(current, total, msg)
+                        )
                     else:
-                        # Nếu không có template, lưu vào Code mau mặc định
-                        mod_cfg_path = Path("Code mau/Auto_Translate_Mod_Langue_Vietnamese_1.0.0/locale/vi") / f"{mod_name}.cfg"
-                        mod_cfg_path.parent.mkdir(parents=True, exist_ok=True)
-                        with open(mod_cfg_path, "w", encoding="utf-8") as f:
-                            f.writelines(merged_lines)
+                        # Sử dụng DeepL API với batch song song theo quota
+                        translate_fn = lambda texts: deepl.translate_texts_batch(
+                            texts,
+                            self.lang_var.get(),
+                            glossary_id=glossary_id,
+                            progress_callback=lambda current, total, done: self.update_progress(current, total, mod_name),
+                            source_lang="EN"
+                        )
 
-                translated_mods.append(mod_name)
+                    translated_values = pipeline.translate_values(all_values, translate_fn, cache_lookup,
+                                                                 invalidate_fn)
+                    if router:
+                        self.google_translator.save_cache()
+                    if deepl and deepl.quota_exhausted:
+                        print(f"    ⚠️ DeepL quota exhausted, part of {mod_name} left untranslated")
+
+                    # Reconstruct files and merge into single mod cfg
+                    merged_lines = pipeline.reconstruct(parsed, translated_values)
+
+                    # Save translated file - ghi thẳng vào zip template mới nếu có template
+                    cfg_sink.write_text(f"{mod_name}.cfg", merged_lines)
+
+                    translated_mods.append(mod_name)
+                    job_log.bind(mod=mod_name).info("Translated %d entries", len(all_values))
 
             # Tạo mod template mới nếu có template info
             if self.template_info and len(translated_mods) >= 1:
                 try:
-                    new_template_path = self.create_new_template_version(translated_mods)
+                    new_template_path = self.create_new_template_version(translated_mods, template_sink,
+                                                                         new_name, new_version)
                     if new_template_path:
                         # Cập nhật info.json trong file zip mới tạo
                         self.update_template_info_json(new_template_path, translated_mods)
@@ -877,6 +1156,8 @@ class ModTranslatorApp(tk.Tk):
                         f"Translated: {', '.join(translated_mods)}"
                     )
             else:
+                if template_sink:
+                    template_sink.abort()
                 # Hiển thị kết quả bình thường
                 result_message = (
                     f"Translation completed.\n\n"
@@ -891,53 +1172,29 @@ class ModTranslatorApp(tk.Tk):
             messagebox.showinfo("Translation Results", result_message)
             self.status_label.config(text="Translation completed.")
         except Exception as e:
+            if template_sink:
+                template_sink.abort()
+            job_log.exception("Translation job failed")
             self.status_label.config(text=f"Error: {e}")
+        finally:
+            trace_file = get_logger_manager().finish_trace()
+            if trace_file:
+                print(f"⏱️ Stage timings saved to {trace_file}")
 
+    def build_translation_router(self, deepl=None, glossary_id=None):
+        """Tạo router dùng đồng thời tất cả providers đang có"""
+        self.google_translator = SafeGoogleTranslateAPI()
+        # Google nhanh dùng chung budget request với Safe (cùng endpoint, cùng IP)
+        providers = [SafeGoogleProvider(self.google_translator), GoogleProvider(budget=self.google_translator)]
+        if deepl:
+            providers.append(DeepLProvider(deepl, glossary_id))
+        providers.append(LocalStubProvider())
+        print(f"🔀 Using translation router: {', '.join(p.name for p in providers)}")
+        return TranslationRouter(providers, cache=self.google_translator.cache)
+    
     def is_english_content(self, key_vals):
-        """
-        Kiểm tra nội dung có thực sự là tiếng Anh không
-        Sử dụng thuật toán đơn giản: kiểm tra các từ thông dụng tiếng Anh
-        """
-        if not key_vals:
-            return False
-            
-        # Các từ tiếng Anh thông dụng trong Factorio
-        english_indicators = [
-            'the', 'and', 'for', 'with', 'from', 'this', 'that', 'can', 'will', 'are', 'is',
-            'iron', 'copper', 'steel', 'plate', 'gear', 'wire', 'engine', 'motor', 'belt',
-            'inserter', 'assembling', 'machine', 'furnace', 'drill', 'mining', 'electric',
-            'steam', 'boiler', 'generator', 'solar', 'panel', 'accumulator', 'lab',
-            'science', 'pack', 'research', 'technology', 'recipe', 'item', 'entity'
-        ]
-        
-        # Các ký tự ngôn ngữ khác
-        non_english_chars = ['č', 'ř', 'ě', 'š', 'ž', 'ä', 'ö', 'ü', 'ß', 'à', 'â', 'ç', 'è', 'é', 'ê', 'ë', 'ñ']
-        
-        english_score = 0
-        non_english_score = 0
-        
-        for item in key_vals:
-            value = item['val'].strip().lower()
-            if len(value) < 2:
-                continue
-                
-            # Kiểm tra các từ tiếng Anh
-            for indicator in english_indicators:
-                if indicator in value:
-                    english_score += 1
-                    break
-            
-            # Kiểm tra các ký tự không phải tiếng Anh
-            for char in non_english_chars:
-                if char in value:
-                    non_english_score += 2
-                    break
-        
-        english_ratio = english_score / max(len(key_vals), 1)
-        non_english_ratio = non_english_score / max(len(key_vals), 1)
-        
-        # Ít nhất 30% các entry có từ tiếng Anh và không quá 20% các entry có ký tự không phải tiếng Anh
-        return english_ratio >= 0.3 and non_english_ratio <= 0.2
+        """Kiểm tra nội dung có thực sự là tiếng Anh không"""
+        return is_english_content([item['val'] for item in key_vals])
     
     def update_template_info_json(self, template_zip_path, translated_mods):
         """Cập nhật info.json trong template zip với danh sách mods đã dịch"""
@@ -976,7 +1233,7 @@ class ModTranslatorApp(tk.Tk):
                 response = requests.get(endpoint, params={"auth_key": api_key}, timeout=10)
                 
                 if response.status_code == 200:
-                    usage_data = response.json()
+                    usage_data = json_codec.response_json(response)
                     character_count = usage_data.get('character_count', 0)
                     character_limit = usage_data.get('character_limit', 0)
                     
@@ -988,7 +1245,7 @@ class ModTranslatorApp(tk.Tk):
                 else:
                     error_message = "Unknown error"
                     try:
-                        error_data = response.json()
+                        error_data = json_codec.response_json(response)
                         error_message = error_data.get("message", error_message)
                     except:
                         pass
@@ -1014,5 +1271,12 @@ class ModTranslatorApp(tk.Tk):
         threading.Thread(target=test_api_thread, daemon=True).start()
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Factorio Mod Translator")
+    parser.add_argument('--profile', action='store_true', help="Profile mỗi job dịch (cProfile + tracemalloc)")
+    args = parser.parse_args()
+
     app = ModTranslatorApp()
+    if args.profile:
+        app.profile_var.set(True)
     app.mainloop()
@@ -1,11 +1,18 @@
 """
 Network utilities với retry mechanism và error handling cải tiến
 """
+import threading
 import time
 import requests
+import urllib.parse
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
 from typing import List, Optional, Dict, Any
 import logging
 
+from instrumentation import span
+import json_codec
+import metrics
+
 
 class APIError(Exception):
     """Custom exception cho API errors"""
@@ -18,10 +25,12 @@ class APIError(Exception):
 class NetworkUtils:
     """Utility class cho network operations với retry mechanism"""
     
-    def __init__(self, max_retries: int = 3, retry_delay: float = 1.0, timeout: int = 30):
+    def __init__(self, max_retries: int = 3, retry_delay: float = 1.0, timeout: int = 30,
+                 provider: str = "http"):
         self.max_retries = max_retries
         self.retry_delay = retry_delay  
         self.timeout = timeout
+        self.provider = provider  # Label cho metrics
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Factorio-Mod-Translator/2.0'
@@ -47,19 +56,28 @@ class NetworkUtils:
         last_exception = None
         for attempt in range(self.max_retries + 1):
             try:
-                response = self.session.request(method, url, **kwargs)
+                started = time.perf_counter()
+                with span("http") as stage:
+                    response = self.session.request(method, url, **kwargs)
+                    stage.add_bytes(len(response.content))
+                metrics.REQUEST_LATENCY.observe(time.perf_counter() - started, provider=self.provider)
+                metrics.REQUESTS.inc(provider=self.provider, status=response.status_code)
                 
                 # Kiểm tra rate limiting
                 if response.status_code == 429:
                     retry_after = int(response.headers.get('Retry-After', self.retry_delay))
                     if attempt < self.max_retries:
                         logging.warning(f"Rate limited. Waiting {retry_after}s before retry {attempt + 1}")
-                        time.sleep(retry_after)
+                        metrics.RETRIES.inc(provider=self.provider, reason="429")
+                        metrics.LIMITER_WAIT.observe(retry_after, provider=self.provider)
+                        with span("limiter_wait"):
+                            time.sleep(retry_after)
                         continue
                         
                 # Các status code có thể retry
                 if response.status_code in [500, 502, 503, 504] and attempt < self.max_retries:
                     logging.warning(f"Server error {response.status_code}. Retrying in {self.retry_delay}s")
+                    metrics.RETRIES.inc(provider=self.provider, reason="server_error")
                     time.sleep(self.retry_delay * (2 ** attempt))  # Exponential backoff
                     continue
                     
@@ -71,6 +89,7 @@ class NetworkUtils:
                 last_exception = e
                 if attempt < self.max_retries:
                     logging.warning(f"Network error: {e}. Retrying in {self.retry_delay}s")
+                    metrics.RETRIES.inc(provider=self.provider, reason="network")
                     time.sleep(self.retry_delay * (2 ** attempt))
                     continue
                     
@@ -81,15 +100,29 @@ class NetworkUtils:
             raise APIError(f"Request failed with status {response.status_code}", response.status_code)
 
 
+class QuotaExceededError(APIError):
+    """Exception khi DeepL character quota không đủ cho request"""
+    pass
+
+
 class DeepLAPI:
     """Optimized DeepL API client với batch processing và error handling"""
     
-    def __init__(self, api_key: str, endpoint: str = "api-free.deepl.com", max_batch_size: int = 50):
+    # Giới hạn của DeepL /v2/translate: tối đa 50 texts và 128 KiB mỗi request
+    MAX_TEXTS_PER_REQUEST = 50
+    MAX_REQUEST_BYTES = 128 * 1024
+    
+    def __init__(self, api_key: str, endpoint: str = "api-free.deepl.com", max_batch_size: int = 50,
+                 max_batch_bytes: int = 120 * 1024, max_concurrency: int = 4):
         self.api_key = api_key
         self.endpoint = endpoint
-        self.max_batch_size = max_batch_size
-        self.network = NetworkUtils()
+        self.max_batch_size = min(max_batch_size, self.MAX_TEXTS_PER_REQUEST)
+        # Chừa lại khoảng trống cho auth_key, target_lang và URL encoding
+        self.max_batch_bytes = min(max_batch_bytes, self.MAX_REQUEST_BYTES)
+        self.max_concurrency = max(1, max_concurrency)
+        self.network = NetworkUtils(provider="deepl")
         self.base_url = f"https://{endpoint}/v2"
+        self.quota_exhausted = False
         
     def test_api_key(self) -> Dict[str, Any]:
         """
@@ -109,11 +142,11 @@ class DeepLAPI:
             )
             
             if response.status_code == 200:
-                return response.json()
+                return json_codec.response_json(response)
             else:
                 error_data = {}
                 try:
-                    error_data = response.json()
+                    error_data = json_codec.response_json(response)
                 except:
                     pass
                 raise APIError(
@@ -127,17 +160,76 @@ class DeepLAPI:
                 raise
             raise APIError(f"Failed to test API key: {str(e)}")
     
+    def get_remaining_characters(self) -> Optional[int]:
+        """
+        Lấy số ký tự còn lại trong quota từ /usage
+        
+        Returns:
+            Số ký tự còn lại, hoặc None nếu không xác định được (không giới hạn / lỗi mạng)
+        """
+        try:
+            usage = self.test_api_key()
+        except APIError as e:
+            logging.warning(f"Could not read DeepL usage, skipping quota check: {e}")
+            return None
+            
+        character_limit = usage.get('character_limit', 0)
+        if not character_limit:
+            return None
+        return max(0, character_limit - usage.get('character_count', 0))
+    
+    def pack_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Gom texts thành các batch theo kích thước request thay vì số lượng cố định
+        
+        Args:
+            texts: List of texts to pack
+            
+        Returns:
+            List of batches, mỗi batch là list các index trong texts
+        """
+        batches = []
+        current = []
+        current_bytes = 0
+        
+        for i, text in enumerate(texts):
+            # "text=" + nội dung, URL encoding có thể làm tăng kích thước tới 3 lần
+            text_bytes = len(urllib.parse.quote_plus(text)) + 6
+            
+            if current and (len(current) >= self.max_batch_size or
+                            current_bytes + text_bytes > self.max_batch_bytes):
+                batches.append(current)
+                current = []
+                current_bytes = 0
+                
+            current.append(i)
+            current_bytes += text_bytes
+            
+        if current:
+            batches.append(current)
+            
+        return batches
+    
     def translate_texts_batch(self, texts: List[str], target_lang: str, 
                             glossary_id: Optional[str] = None,
-                            progress_callback: Optional[callable] = None) -> List[str]:
+                            progress_callback: Optional[callable] = None,
+                            check_quota: bool = True,
+                            source_lang: Optional[str] = None) -> List[str]:
         """
-        Dịch danh sách texts với batch processing
+        Dịch danh sách texts với batch processing song song
+        
+        Các batch được gom theo kích thước request và gửi đồng thời (tối đa
+        max_concurrency). Nếu quota còn lại không đủ, chỉ các batch nằm trong
+        quota được gửi, phần còn lại giữ nguyên text gốc. Khi DeepL báo hết quota
+        (456) giữa chừng, các batch chưa gửi bị hủy và cũng giữ nguyên text gốc.
         
         Args:
             texts: List of texts to translate
             target_lang: Target language code
             glossary_id: Optional glossary ID
             progress_callback: Optional callback function for progress updates
+            check_quota: Kiểm tra quota qua /usage trước khi bắt đầu
+            source_lang: Source language code (bắt buộc khi dùng glossary)
             
         Returns:
             List of translated texts
@@ -148,31 +240,75 @@ class DeepLAPI:
         if not texts:
             return []
             
-        all_translations = []
-        total_batches = (len(texts) + self.max_batch_size - 1) // self.max_batch_size
+        batches = self.pack_batches(texts)
+        total_batches = len(batches)
+        
+        # Chỉ gửi các batch nằm trong quota còn lại
+        self.quota_exhausted = False
+        remaining = self.get_remaining_characters() if check_quota else None
+        if remaining is not None:
+            allowed = []
+            for batch in batches:
+                batch_chars = sum(len(texts[i]) for i in batch)
+                if batch_chars > remaining:
+                    self.quota_exhausted = True
+                    break
+                remaining -= batch_chars
+                allowed.append(batch)
+            if self.quota_exhausted:
+                logging.warning(
+                    f"DeepL quota insufficient: sending {len(allowed)}/{total_batches} batches, "
+                    f"remaining texts are kept untranslated"
+                )
+            batches = allowed
+        sent_batches = len(batches)
+        
+        all_translations = list(texts)
+        completed = 0
+        translated_count = 0
+        
+        quota_hit = threading.Event()
         
-        for batch_idx in range(total_batches):
-            start_idx = batch_idx * self.max_batch_size
-            end_idx = min(start_idx + self.max_batch_size, len(texts))
-            batch_texts = texts[start_idx:end_idx]
+        def send(batch_texts):
+            # Batch đã được worker nhận trước khi kịp hủy: không gửi khi đã hết quota
+            if quota_hit.is_set():
+                raise CancelledError()
+            return self._translate_batch(batch_texts, target_lang, glossary_id, source_lang)
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {executor.submit(send, [texts[i] for i in batch]): batch for batch in batches}
             
-            try:
-                translations = self._translate_batch(batch_texts, target_lang, glossary_id)
-                all_translations.extend(translations)
-                
+            for future in as_completed(futures):
+                batch = futures[future]
+                completed += 1
+                try:
+                    translations = future.result()
+                    for i, translation in zip(batch, translations):
+                        all_translations[i] = translation
+                    translated_count += len(batch)
+                except CancelledError:
+                    pass  # Batch bị hủy sau khi hết quota: giữ nguyên original texts
+                except QuotaExceededError as e:
+                    # DeepL trả về 456 khi hết quota giữa chừng: dừng gửi các batch còn lại
+                    if not quota_hit.is_set():
+                        logging.error(f"DeepL quota exceeded: {e}")
+                    quota_hit.set()
+                    self.quota_exhausted = True
+                    for pending in futures:
+                        pending.cancel()
+                except Exception as e:
+                    logging.error(f"Failed to translate batch {completed}/{sent_batches}: {e}")
+                    # Fallback: giữ nguyên original texts
+                    
                 # Progress callback
                 if progress_callback:
-                    progress_callback(batch_idx + 1, total_batches, len(all_translations))
-                    
-            except Exception as e:
-                logging.error(f"Failed to translate batch {batch_idx + 1}/{total_batches}: {e}")
-                # Fallback: add original texts
-                all_translations.extend(batch_texts)
+                    progress_callback(completed, sent_batches, translated_count)
                 
         return all_translations
     
     def _translate_batch(self, texts: List[str], target_lang: str, 
-                        glossary_id: Optional[str] = None) -> List[str]:
+                        glossary_id: Optional[str] = None,
+                        source_lang: Optional[str] = None) -> List[str]:
         """
         Dịch một batch texts
         
@@ -180,6 +316,7 @@ class DeepLAPI:
             texts: List of texts to translate  
             target_lang: Target language code
             glossary_id: Optional glossary ID
+            source_lang: Optional source language code
             
         Returns:
             List of translated texts
@@ -196,7 +333,12 @@ class DeepLAPI:
         
         if glossary_id:
             data["glossary_id"] = glossary_id
+            # DeepL yêu cầu source_lang khi dùng glossary
+            data["source_lang"] = source_lang or "EN"
+        elif source_lang:
+            data["source_lang"] = source_lang
             
+        metrics.CHUNK_SIZE.observe(len(texts), provider="deepl")
         try:
             response = self.network.make_request_with_retry(
                 'POST',
@@ -205,7 +347,7 @@ class DeepLAPI:
             )
             
             if response.status_code == 200:
-                response_data = response.json()
+                response_data = json_codec.response_json(response)
                 translations = [item["text"] for item in response_data.get("translations", [])]
                 
                 if len(translations) != len(texts):
@@ -215,9 +357,15 @@ class DeepLAPI:
             else:
                 error_data = {}
                 try:
-                    error_data = response.json()
+                    error_data = json_codec.response_json(response)
                 except:
                     pass
+                if response.status_code == 456:
+                    raise QuotaExceededError(
+                        error_data.get("message", "Quota exceeded"),
+                        response.status_code,
+                        error_data
+                    )
                 raise APIError(
                     error_data.get("message", f"Translation failed with status {response.status_code}"),
                     response.status_code,
@@ -229,6 +377,107 @@ class DeepLAPI:
                 raise
             raise APIError(f"Failed to translate batch: {str(e)}")
     
+    def create_glossary(self, name: str, source_lang: str, target_lang: str,
+                        entries: Dict[str, str]) -> str:
+        """
+        Tạo glossary mới trên DeepL
+        
+        Args:
+            name: Tên glossary
+            source_lang: Source language code
+            target_lang: Target language code
+            entries: Dict source term -> target term
+            
+        Returns:
+            glossary_id của glossary vừa tạo
+            
+        Raises:
+            APIError: If glossary creation fails
+        """
+        tsv = "\n".join(f"{source}\t{target}" for source, target in entries.items())
+        try:
+            response = self.network.make_request_with_retry(
+                'POST',
+                f"{self.base_url}/glossaries",
+                data={
+                    "auth_key": self.api_key,
+                    "name": name,
+                    "source_lang": source_lang,
+                    "target_lang": target_lang,
+                    "entries": tsv,
+                    "entries_format": "tsv"
+                }
+            )
+            
+            if response.status_code in (200, 201):
+                return json_codec.response_json(response)["glossary_id"]
+            
+            error_data = {}
+            try:
+                error_data = json_codec.response_json(response)
+            except:
+                pass
+            raise APIError(
+                error_data.get("message", f"Glossary creation failed with status {response.status_code}"),
+                response.status_code,
+                error_data
+            )
+        except Exception as e:
+            if isinstance(e, APIError):
+                raise
+            raise APIError(f"Failed to create glossary: {str(e)}")
+    
+    def glossary_exists(self, glossary_id: str) -> bool:
+        """
+        Kiểm tra glossary còn tồn tại trên DeepL không
+        
+        Args:
+            glossary_id: Glossary ID
+            
+        Returns:
+            True nếu glossary còn tồn tại, False chỉ khi DeepL trả về 404
+
+        Raises:
+            APIError: If the check fails for any other reason (mạng, 403, 5xx...)
+        """
+        try:
+            response = self.network.make_request_with_retry(
+                'GET',
+                f"{self.base_url}/glossaries/{glossary_id}",
+                params={"auth_key": self.api_key}
+            )
+        except Exception as e:
+            if isinstance(e, APIError):
+                raise
+            raise APIError(f"Failed to check glossary {glossary_id}: {str(e)}")
+
+        if response.status_code == 200:
+            return True
+        if response.status_code == 404:
+            return False
+        raise APIError(f"Glossary check failed with status {response.status_code}", response.status_code)
+    
+    def delete_glossary(self, glossary_id: str) -> bool:
+        """
+        Xóa glossary trên DeepL
+        
+        Args:
+            glossary_id: Glossary ID
+            
+        Returns:
+            True nếu xóa thành công
+        """
+        try:
+            response = self.network.make_request_with_retry(
+                'DELETE',
+                f"{self.base_url}/glossaries/{glossary_id}",
+                params={"auth_key": self.api_key}
+            )
+            return response.status_code in (200, 204)
+        except Exception as e:
+            logging.warning(f"Failed to delete glossary {glossary_id}: {e}")
+            return False
+    
     def get_supported_languages(self) -> Dict[str, List[Dict]]:
         """
         Lấy danh sách ngôn ngữ được hỗ trợ
@@ -244,7 +493,7 @@ class DeepLAPI:
             )
             
             if response.status_code == 200:
-                return {"languages": response.json()}
+                return {"languages": json_codec.response_json(response)}
             else:
                 logging.warning(f"Failed to get supported languages: {response.status_code}")
                 return {"languages": []}
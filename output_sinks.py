@@ -0,0 +1,214 @@
+"""
+Đích ghi kết quả dịch: thư mục, file zip đang mở hoặc memory
+
+Pipeline ghi mỗi mod vừa dịch xong thẳng vào sink (từng đoạn text của
+``ModResult.lines``), nên language pack/template mới được nén ngay trong lúc
+dịch thay vì ghi ra ``temp_translations/``, copy vào cây template đã giải nén
+rồi nén lại lần nữa.
+
+``ZipSink`` ghi vào file ``.tmp`` và chỉ rename thành file zip cuối khi
+``close()`` thành công, nên không bao giờ để lại zip ghi dở.
+"""
+import os
+import shutil
+import threading
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Optional, Set, Union
+
+from instrumentation import span
+import metrics
+
+
+class OutputSink:
+    """Interface chung: ghi file theo đường dẫn tương đối (dùng '/')"""
+
+    def write_text(self, name: str, chunks: Iterable[str]) -> int:
+        """
+        Ghi file text UTF-8 từ các đoạn liên tiếp
+
+        Returns:
+            Số byte đã ghi
+        """
+        raise NotImplementedError
+
+    def write_bytes(self, name: str, data: Union[bytes, BinaryIO]) -> int:
+        """Ghi file nhị phân từ bytes hoặc file object (copy theo stream)"""
+        raise NotImplementedError
+
+    def has(self, name: str) -> bool:
+        raise NotImplementedError
+
+    def subdir(self, prefix: str) -> 'OutputSink':
+        """Sink ghi vào thư mục con ``prefix`` của sink này"""
+        return PrefixedSink(self, prefix)
+
+    def close(self):
+        pass
+
+    def abort(self):
+        """Hủy kết quả (khi job lỗi)"""
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class PrefixedSink(OutputSink):
+    """View của một sink với tiền tố đường dẫn"""
+
+    def __init__(self, parent: OutputSink, prefix: str):
+        self.parent = parent
+        self.prefix = prefix.strip('/')
+
+    def _name(self, name: str) -> str:
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def write_text(self, name, chunks):
+        return self.parent.write_text(self._name(name), chunks)
+
+    def write_bytes(self, name, data):
+        return self.parent.write_bytes(self._name(name), data)
+
+    def has(self, name):
+        return self.parent.has(self._name(name))
+
+    def close(self):
+        pass  # Sink cha do người tạo ra nó đóng
+
+    def abort(self):
+        pass
+
+
+class DirectorySink(OutputSink):
+    """Ghi file vào một thư mục trên disk"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def path(self, name: str) -> Path:
+        return self.root / name
+
+    def write_text(self, name, chunks):
+        path = self.path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with span("write") as stage, open(path, 'w', encoding='utf-8') as f:
+            f.writelines(chunks)
+            size = f.tell()
+            stage.add_bytes(size)
+        return size
+
+    def write_bytes(self, name, data):
+        path = self.path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with span("write") as stage, open(path, 'wb') as f:
+            if isinstance(data, (bytes, bytearray)):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f)
+            size = f.tell()
+            stage.add_bytes(size)
+        return size
+
+    def has(self, name):
+        return self.path(name).exists()
+
+
+class ZipSink(OutputSink):
+    """Ghi file thẳng vào một zip đang mở, rename từ file tạm khi đóng"""
+
+    def __init__(self, zip_path: Union[str, Path], compression: int = zipfile.ZIP_DEFLATED,
+                 compresslevel: Optional[int] = 6):
+        self.zip_path = Path(zip_path)
+        self.zip_path.parent.mkdir(parents=True, exist_ok=True)
+        self.temp_path = self.zip_path.with_name(self.zip_path.name + '.tmp')
+        self.zipf = zipfile.ZipFile(self.temp_path, 'w', compression, compresslevel=compresslevel)
+        self.names: Set[str] = set()
+        # ZipFile chỉ cho phép một write handle tại một thời điểm
+        self.lock = threading.Lock()
+
+    def _open(self, name: str):
+        if name in self.names:
+            raise ValueError(f"{name} already written to {self.zip_path.name}")
+        self.names.add(name)
+        return self.zipf.open(name, 'w', force_zip64=True)
+
+    def write_text(self, name, chunks):
+        with self.lock, span("zip_write") as stage, self._open(name) as handle:
+            size = 0
+            for chunk in chunks:
+                data = chunk.encode('utf-8')
+                handle.write(data)
+                size += len(data)
+            stage.add_bytes(size)
+        metrics.ZIP_BYTES.inc(size)
+        return size
+
+    def write_bytes(self, name, data):
+        with self.lock, span("zip_write") as stage, self._open(name) as handle:
+            if isinstance(data, (bytes, bytearray)):
+                handle.write(data)
+                size = len(data)
+            else:
+                size = 0
+                for block in iter(lambda: data.read(1024 * 1024), b''):
+                    handle.write(block)
+                    size += len(block)
+            stage.add_bytes(size)
+        metrics.ZIP_BYTES.inc(size)
+        return size
+
+    def has(self, name):
+        return name in self.names
+
+    def close(self):
+        """Đóng zip và thay file đích bằng file vừa ghi"""
+        with self.lock:
+            if self.zipf is None:
+                return
+            self.zipf.close()
+            self.zipf = None
+            os.replace(self.temp_path, self.zip_path)
+
+    def abort(self):
+        with self.lock:
+            if self.zipf is None:
+                return
+            self.zipf.close()
+            self.zipf = None
+            self.temp_path.unlink(missing_ok=True)
+
+
+class MemorySink(OutputSink):
+    """Giữ file trong memory (test, preview, upload trực tiếp)"""
+
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+        self.lock = threading.Lock()
+
+    def write_text(self, name, chunks):
+        return self.write_bytes(name, ''.join(chunks).encode('utf-8'))
+
+    def write_bytes(self, name, data):
+        if not isinstance(data, (bytes, bytearray)):
+            data = data.read()
+        with self.lock:
+            self.files[name] = bytes(data)
+        return len(data)
+
+    def has(self, name):
+        return name in self.files
+
+    def text(self, name: str) -> str:
+        return self.files[name].decode('utf-8')
+
+
+def as_sink(output: Union[str, Path, OutputSink]) -> OutputSink:
+    """Thư mục hoặc sink có sẵn -> OutputSink"""
+    return output if isinstance(output, OutputSink) else DirectorySink(output)
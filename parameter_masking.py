@@ -0,0 +1,71 @@
+"""
+Mask số, số La Mã và tham số Factorio thành slot trước khi tra cache/dịch
+
+Các chuỗi cùng họ như ``Tier 1`` ... ``Tier 5``, ``Mk2``, ``x10`` hay
+``Increases speed by __1__`` có chung một template (``Tier __S0__``), nên chỉ
+cần một cache entry và một lần dịch; giá trị cụ thể được ghép lại sau khi dịch.
+"""
+import re
+from typing import List, Optional, Tuple
+
+# Slot cùng kiểu với tham số Factorio và placeholder thuật ngữ (__T0__)
+SLOT_PLACEHOLDER = "__S{}__"
+SLOT_PATTERN = re.compile(r'_\s*_\s*S\s*(\d+)\s*_\s*_', re.IGNORECASE)
+
+# Số La Mã nhiều ký tự đứng riêng sau khoảng trắng (Tier IV, Mk II)
+ROMAN_NUMERALS = ('VIII', 'XIII', 'III', 'VII', 'XII', 'XIV', 'II', 'IV', 'VI', 'IX', 'XI', 'XV')
+
+# Số La Mã một ký tự chỉ được mask ở vị trí hậu tố cấp: ngay sau một từ và ở cuối
+# câu/mệnh đề (Assembler V), không phải phím hay nhãn như "Press X to jump".
+# Bỏ "I" vì trùng đại từ tiếng Anh
+SINGLE_ROMAN_NUMERALS = ('V', 'X')
+
+MASK_PATTERN = re.compile(
+    r'\[[^\]]*\]'                                           # rich text [item=iron-plate]
+    r'|__[^_\s]+(?:__[^_\s]+)*__'                           # tham số __1__, __ITEM__iron-plate__, __T0__
+    r'|\d+(?:[.,]\d+)*'                                     # số nguyên/thập phân
+    r'|(?<=\s)(?:' + '|'.join(ROMAN_NUMERALS) + r')(?=$|[\s.,:;!?)])'
+    r'|(?<=\w\s)(?:' + '|'.join(SINGLE_ROMAN_NUMERALS) + r')(?=$|[.,:;!?)])'
+)
+
+
+def mask_slots(text: str) -> Tuple[str, List[str]]:
+    """
+    Thay số và tham số trong text bằng slot ``__S<n>__``
+
+    Returns:
+        Tuple of (template, giá trị của từng slot theo thứ tự)
+    """
+    values: List[str] = []
+
+    def substitute(match):
+        values.append(match.group(0))
+        return SLOT_PLACEHOLDER.format(len(values) - 1)
+
+    template = MASK_PATTERN.sub(substitute, text)
+    return template, values
+
+
+def unmask_slots(translated: str, values: List[str]) -> Optional[str]:
+    """
+    Ghép giá trị cụ thể vào bản dịch của template
+
+    Returns:
+        Text đã khôi phục, hoặc None nếu provider làm mất/nhân đôi slot
+    """
+    if not values:
+        return translated
+
+    found = []
+
+    def substitute(match):
+        index = int(match.group(1))
+        if index >= len(values):
+            return match.group(0)
+        found.append(index)
+        return values[index]
+
+    restored = SLOT_PATTERN.sub(substitute, translated)
+    if sorted(found) != list(range(len(values))):
+        return None
+    return restored
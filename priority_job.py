@@ -0,0 +1,160 @@
+"""
+Job dịch theo mức ưu tiên với xuất bản pack tạm định kỳ
+
+Thay vì dịch hết mod này rồi mới sang mod khác, job dịch theo tầng trên toàn
+bộ mod: tầng 0 là các section người chơi nhìn thấy nhiều nhất (tên mod, item,
+entity, technology...), tầng 1 là phần còn lại, tầng 2 là mô tả và câu dài.
+Cứ mỗi ``publish_interval`` giây (và ngay khi xong tầng 0) job gọi
+``publish_fn`` với kết quả hiện tại, các string chưa dịch giữ bản tiếng Anh,
+nên pack tạm luôn hợp lệ và dùng được trước khi cả job kết thúc.
+"""
+import logging
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from instrumentation import mod_context
+from translation_pipeline import ModResult, ParsedMod, TranslationPipeline
+
+# Section hiển thị nhiều nhất trong game
+PRIORITY_SECTIONS = ('mod-name', 'item-name', 'entity-name', 'technology-name', 'recipe-name',
+                     'fluid-name', 'equipment-name', 'item-group-name', 'tile-name')
+
+# Câu dài hơn ngưỡng này được xếp vào tầng cuối như mô tả
+LONG_TEXT_LENGTH = 120
+
+TIER_NAMES = ('names', 'other strings', 'descriptions')
+
+
+def entry_tier(section: str, value: str) -> int:
+    """Tầng ưu tiên của một entry: 0 = tên hiển thị, 1 = còn lại, 2 = mô tả/câu dài"""
+    if section in PRIORITY_SECTIONS:
+        return 0
+    if section.endswith('-description') or len(value) > LONG_TEXT_LENGTH:
+        return 2
+    return 1
+
+
+def entry_sections(parsed: ParsedMod) -> List[str]:
+    """Section của từng entry, cùng thứ tự với ``parsed.values``"""
+    sections = []
+    for table in parsed.file_entries:
+        sections.extend(table.entry_sections())
+    return sections
+
+
+class PriorityTranslationJob:
+    """Dịch nhiều mod theo tầng ưu tiên, xuất bản kết quả tạm theo chu kỳ"""
+
+    def __init__(self, pipeline: TranslationPipeline, translate_fn: Callable[[List[str]], List[str]],
+                 cache_lookup: Optional[Callable[[str], Optional[str]]] = None,
+                 invalidate_fn: Optional[Callable[[str], Any]] = None,
+                 publish_fn: Optional[Callable[[List[ModResult], bool], Any]] = None,
+                 publish_interval: float = 600):
+        """
+        Args:
+            pipeline: TranslationPipeline (parse, terminology, reconstruct)
+            translate_fn: Hàm dịch một list texts
+            cache_lookup: Optional cache lookup cho terminology pass
+            invalidate_fn: Optional hàm đánh dấu bản dịch cache bị sai
+            publish_fn: Hàm nhận (kết quả hiện tại, final) để ghi pack tạm/cuối
+            publish_interval: Chu kỳ xuất bản pack tạm (giây)
+        """
+        self.pipeline = pipeline
+        self.translate_fn = translate_fn
+        self.cache_lookup = cache_lookup
+        self.invalidate_fn = invalidate_fn
+        self.publish_fn = publish_fn
+        self.publish_interval = publish_interval
+        self.last_publish = time.monotonic()
+        self.publish_count = 0
+        # List of ModResult (mod không dịch được) hoặc (parsed, values, translations, tiers)
+        self.jobs: List[Union[ModResult, Tuple[ParsedMod, List[str], List[str], List[int]]]] = []
+
+    def prepare(self, mod_paths: List[str], parse_fn: Optional[Callable[[str], Optional[ParsedMod]]] = None):
+        """Parse các mod và phân tầng từng entry"""
+        parse_fn = parse_fn or self.pipeline.parse_mod
+        for mod_path in mod_paths:
+            with mod_context(Path(mod_path).stem):
+                try:
+                    parsed = parse_fn(mod_path)
+                except Exception as e:
+                    logging.error(f"Failed to parse {mod_path}: {e}")
+                    parsed = None
+            if parsed is None:
+                self.jobs.append(ModResult(Path(mod_path).stem, ModResult.INVALID))
+            elif not parsed.file_entries and not parsed.skipped_files:
+                self.jobs.append(ModResult(parsed.name, ModResult.SKIPPED))
+            elif not parsed.values:
+                self.jobs.append(ModResult(parsed.name, ModResult.NO_LANG))
+            else:
+                values = parsed.values
+                tiers = [entry_tier(section, value) for section, value in zip(entry_sections(parsed), values)]
+                self.jobs.append((parsed, values, list(values), tiers))
+
+    def results(self) -> List[ModResult]:
+        """Kết quả hiện tại theo thứ tự mod, string chưa dịch giữ bản gốc"""
+        results = []
+        for job in self.jobs:
+            if isinstance(job, ModResult):
+                results.append(job)
+            else:
+                parsed, values, translations, _ = job
+                results.append(ModResult(parsed.name, ModResult.TRANSLATED,
+                                         self.pipeline.reconstruct(parsed, translations), len(values)))
+        return results
+
+    def publish(self, final: bool = False):
+        self.last_publish = time.monotonic()
+        if not self.publish_fn:
+            return
+        translated = [result for result in self.results() if result.status == ModResult.TRANSLATED]
+        if not translated:
+            return
+        try:
+            self.publish_fn(translated, final)
+            self.publish_count += 1
+        except Exception as e:
+            if final:
+                raise
+            logging.warning(f"Could not publish interim pack: {e}")
+
+    def run(self, mod_paths: List[str],
+            parse_fn: Optional[Callable[[str], Optional[ParsedMod]]] = None) -> List[ModResult]:
+        """
+        Dịch toàn bộ mod theo tầng ưu tiên
+
+        Returns:
+            List of ModResult theo thứ tự mod_paths
+        """
+        self.prepare(mod_paths, parse_fn)
+        for tier, tier_name in enumerate(TIER_NAMES):
+            tier_total = 0
+            for job in self.jobs:
+                if isinstance(job, ModResult):
+                    continue
+                parsed, values, translations, tiers = job
+                indices = [i for i, entry in enumerate(tiers) if entry == tier]
+                if not indices:
+                    continue
+                tier_total += len(indices)
+                with mod_context(parsed.name):
+                    try:
+                        translated = self.pipeline.translate_values(
+                            [values[i] for i in indices], self.translate_fn, self.cache_lookup, self.invalidate_fn)
+                    except Exception as e:
+                        logging.error(f"Failed to translate {parsed.name} ({tier_name}): {e}")
+                        continue
+                for i, translation in zip(indices, translated):
+                    translations[i] = translation
+
+                if time.monotonic() - self.last_publish >= self.publish_interval:
+                    self.publish()
+
+            print(f"🏁 Priority tier {tier} ({tier_name}) done: {tier_total} strings")
+            # Tên hiển thị đã xong: xuất bản ngay thay vì chờ chu kỳ
+            if tier == 0 and tier_total:
+                self.publish()
+
+        self.publish(final=True)
+        return self.results()
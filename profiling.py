@@ -0,0 +1,166 @@
+"""
+Profiling mode cho các job dịch
+
+Bọc cả job trong cProfile (thread chạy job), tracemalloc (toàn process) và một
+sampling thread đọc stack của mọi thread để tạo collapsed stacks (định dạng
+``frame;frame;frame count`` dùng được với flamegraph.pl / speedscope).
+
+Output cho mỗi job trong ``output_dir``:
+    <job_id>.prof       - cProfile stats (mở bằng snakeviz, pstats)
+    <job_id>.collapsed  - collapsed stacks cho flame graph
+    <job_id>.txt        - top functions, top allocation sites và peak memory
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class StackSampler:
+    """Thread lấy mẫu stack của tất cả threads theo chu kỳ"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            # Bỏ số thứ tự (Thread-12) để gộp các worker cùng loại trong flame graph
+            stack.append(re.sub(r'-\d+', '', names.get(thread_id, 'thread')))
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=1)
+
+    def write_collapsed(self, path: Path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class JobProfiler:
+    """Profile một job: cProfile + tracemalloc + sampled stacks"""
+
+    def __init__(self, job_id: Optional[str] = None, output_dir: str = "logs/profiles",
+                 sample_interval: float = 0.005, top_n: int = 25, trace_frames: int = 10):
+        """
+        Args:
+            job_id: ID của job (mặc định theo thời gian)
+            output_dir: Thư mục lưu kết quả
+            sample_interval: Chu kỳ lấy mẫu stack (giây)
+            top_n: Số dòng trong các bảng top functions/allocations
+            trace_frames: Số frame tracemalloc giữ cho mỗi allocation
+        """
+        self.job_id = job_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.output_dir = Path(output_dir)
+        self.top_n = top_n
+        self.trace_frames = trace_frames
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(sample_interval)
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._owns_tracemalloc = False
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.peak_memory = 0
+
+    def start(self) -> 'JobProfiler':
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._owns_tracemalloc = True
+        tracemalloc.reset_peak()
+        self.sampler.start()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def stop(self) -> Dict[str, Path]:
+        """Dừng profiling và ghi kết quả, trả về dict loại -> path"""
+        self.profiler.disable()
+        self.elapsed = time.perf_counter() - self.started
+        self.sampler.stop()
+        self.snapshot = tracemalloc.take_snapshot()
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        return self.write()
+
+    def format_report(self) -> str:
+        """Top functions theo cumulative time, top allocation sites và peak memory"""
+        lines = [f"Profile {self.job_id} - {self.elapsed:.2f}s, "
+                 f"peak traced memory {self.peak_memory / (1024 * 1024):.1f} MB, "
+                 f"{sum(self.sampler.samples.values())} stack samples", ""]
+
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+        lines.append("Top functions (cumulative):")
+        lines.append(stream.getvalue().strip())
+        lines.append("")
+
+        if self.snapshot is not None:
+            snapshot = self.snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            lines.append("Top allocation sites (live at end of job):")
+            for stat in snapshot.statistics('lineno')[:self.top_n]:
+                frame = stat.traceback[0]
+                lines.append(f"{stat.size / 1024:>10.1f} KiB {stat.count:>8} blocks  "
+                             f"{frame.filename}:{frame.lineno}")
+        return '\n'.join(lines)
+
+    def write(self) -> Dict[str, Path]:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        paths = {
+            'prof': self.output_dir / f"{self.job_id}.prof",
+            'collapsed': self.output_dir / f"{self.job_id}.collapsed",
+            'report': self.output_dir / f"{self.job_id}.txt",
+        }
+        self.profiler.dump_stats(str(paths['prof']))
+        self.sampler.write_collapsed(paths['collapsed'])
+        with open(paths['report'], 'w', encoding='utf-8') as f:
+            f.write(self.format_report() + '\n')
+        return paths
+
+    def __enter__(self) -> 'JobProfiler':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        paths = self.stop()
+        print(f"🔬 Profile saved: {paths['prof']} ({self.peak_memory / (1024 * 1024):.1f} MB peak)")
+        return False
@@ -0,0 +1,119 @@
+"""
+Rate limiter sliding-window dùng chung giữa các translator và các process
+
+Mỗi request được ghi thành một dòng (provider, timestamp) trong một file SQLite
+nhỏ. Kiểm tra và ghi nằm trong cùng một transaction ``BEGIN IMMEDIATE`` nên
+chỉ một process được giữ write lock tại một thời điểm (chạy được cả trên
+Windows, không cần fcntl). Nhờ vậy giới hạn phút/giờ vẫn đúng khi GUI tạo
+translator mới cho từng mod, khi chạy nhiều job song song và sau khi khởi động lại.
+
+Trong một process, mọi translator dùng chung một limiter (một connection) cho
+mỗi budget qua ``shared_limiter``, nên tạo translator mới không mở thêm connection.
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from translation_cache import SQLITE_TIMEOUT
+
+
+class SharedRateLimiter:
+    """Sliding-window limiter lưu trong SQLite, một budget cho mỗi provider trên máy"""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS requests (provider TEXT NOT NULL, ts REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS requests_provider_ts ON requests (provider, ts)",
+    )
+
+    def __init__(self, db_path: str, provider: str):
+        """
+        Args:
+            db_path: File SQLite chứa state (tạo mới nếu chưa có)
+            provider: Tên budget (vd. google_safe)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.provider = provider
+        self.lock = threading.Lock()
+        # isolation_level=None: tự quản lý transaction bằng BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(str(self.db_path), timeout=SQLITE_TIMEOUT,
+                                    isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self.conn.execute(statement)
+
+    def close(self):
+        self.conn.close()
+
+    def try_acquire(self, limits: Sequence[Tuple[float, int]]) -> Tuple[float, List[int]]:
+        """
+        Lấy một slot nếu mọi window còn budget
+
+        Args:
+            limits: Các cặp (window giây, số request tối đa trong window)
+
+        Returns:
+            Tuple of (số giây cần chờ - 0 nếu đã lấy được slot, số request trong từng window)
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                longest = max(window for window, _ in limits)
+                self.conn.execute("DELETE FROM requests WHERE provider = ? AND ts <= ?",
+                                  (self.provider, now - longest))
+                counts = []
+                wait_time = 0.0
+                for window, limit in limits:
+                    count = self.conn.execute(
+                        "SELECT COUNT(*) FROM requests WHERE provider = ? AND ts > ?",
+                        (self.provider, now - window)).fetchone()[0]
+                    counts.append(count)
+                    if count >= limit:
+                        # Chờ tới khi request thứ (count - limit + 1) cũ nhất trượt ra khỏi window
+                        oldest = self.conn.execute(
+                            "SELECT ts FROM requests WHERE provider = ? AND ts > ? ORDER BY ts LIMIT 1 OFFSET ?",
+                            (self.provider, now - window, count - limit)).fetchone()[0]
+                        wait_time = max(wait_time, oldest + window - now)
+
+                if wait_time <= 0:
+                    self.conn.execute("INSERT INTO requests (provider, ts) VALUES (?, ?)", (self.provider, now))
+                    counts = [count + 1 for count in counts]
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return max(wait_time, 0.0), counts
+
+    def counts(self, windows: Sequence[float]) -> List[int]:
+        """Số request trong từng window (không lấy slot)"""
+        now = time.time()
+        with self.lock:
+            return [self.conn.execute("SELECT COUNT(*) FROM requests WHERE provider = ? AND ts > ?",
+                                      (self.provider, now - window)).fetchone()[0]
+                    for window in windows]
+
+
+_shared: Dict[Tuple[str, str], SharedRateLimiter] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_limiter(db_path: str, provider: str) -> SharedRateLimiter:
+    """Limiter dùng chung trong process cho budget ``provider`` trong ``db_path``"""
+    key = (str(Path(db_path).resolve()), provider)
+    with _shared_lock:
+        limiter = _shared.get(key)
+        if limiter is None:
+            limiter = _shared[key] = SharedRateLimiter(db_path, provider)
+        return limiter
+
+
+def close_shared():
+    """Đóng mọi limiter dùng chung (khi thoát chương trình/test)"""
+    with _shared_lock:
+        for limiter in _shared.values():
+            limiter.close()
+        _shared.clear()
@@ -0,0 +1,342 @@
+"""
+Terminology engine: dịch offline các thuật ngữ ngắn trước khi chia chunk
+
+Dùng automaton Aho-Corasick build từ glossary để:
+- Dịch trực tiếp các giá trị khớp chính xác (vd: ``iron-plate=Iron plate``)
+- Đánh dấu thuật ngữ trong câu dài bằng placeholder để provider giữ nguyên
+
+Giá trị ngắn dịch được từ cache cũng được thêm vào automaton, nên engine dùng
+lại cho cả job (``TranslationPipeline.terminology_engine``) bảo vệ các thuật
+ngữ đó trong câu dài của các mod sau.
+"""
+import logging
+import re
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from deepl_glossary import parse_glossary_file
+
+
+# Placeholder cho thuật ngữ được bảo vệ, cùng kiểu với tham số Factorio (__1__)
+TERM_PLACEHOLDER = "__T{}__"
+TERM_PLACEHOLDER_PATTERN = re.compile(r'_\s*_\s*T\s*(\d+)\s*_\s*_', re.IGNORECASE)
+
+# Vùng không được thay thế: rich text [item=...] và tham số __...__
+PROTECTED_MARKUP_PATTERN = re.compile(r'\[[^\]]*\]|__[^_\s]+(?:__[^_\s]+)*__')
+
+
+def normalize_term(text: str) -> str:
+    """Chuẩn hóa text để so khớp gần đúng: bỏ khoảng trắng thừa, không phân biệt hoa thường"""
+    return ' '.join(text.split()).casefold()
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char in "_-'"
+
+
+class AhoCorasick:
+    """Automaton Aho-Corasick tìm nhiều thuật ngữ trong một lần duyệt"""
+
+    def __init__(self, terms: Optional[List[str]] = None):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+        self.terms: List[str] = []
+        self.compiled = False
+        for term in terms or []:
+            self.add(term)
+
+    def add(self, term: str):
+        """Thêm thuật ngữ (đã chuẩn hóa) vào trie"""
+        if not term:
+            return
+        node = 0
+        for char in term:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = next_node
+        self.output[node].append(len(self.terms))
+        self.terms.append(term)
+        self.compiled = False
+
+    def compile(self):
+        """Tính failure links bằng BFS"""
+        queue = deque()
+        for next_node in self.goto[0].values():
+            self.fail[next_node] = 0
+            queue.append(next_node)
+
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self.goto[node].items():
+                queue.append(next_node)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_node] = self.goto[fallback].get(char, 0)
+                if self.fail[next_node] == next_node:
+                    self.fail[next_node] = 0
+                self.output[next_node] = self.output[next_node] + self.output[self.fail[next_node]]
+
+        self.compiled = True
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """
+        Tìm tất cả các lần xuất hiện thuật ngữ
+
+        Args:
+            text: Text đã chuẩn hóa (casefold)
+
+        Returns:
+            List of (start, end, term_index)
+        """
+        if not self.compiled:
+            self.compile()
+
+        matches = []
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for term_index in self.output[node]:
+                length = len(self.terms[term_index])
+                matches.append((i - length + 1, i + 1, term_index))
+        return matches
+
+
+class PretranslationResult:
+    """Kết quả pre-translation pass cho một danh sách texts"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.resolved: Dict[int, str] = {}
+        self.pending_indices: List[int] = []
+        self.pending_texts: List[str] = []
+        self.replacements: List[List[str]] = []
+
+    @property
+    def resolved_count(self) -> int:
+        return len(self.resolved)
+
+
+class TerminologyEngine:
+    """Dịch offline thuật ngữ từ glossary và cache trước khi gửi lên provider"""
+
+    def __init__(self, terms: Optional[Dict[str, str]] = None,
+                 cache_lookup: Optional[Callable[[str], Optional[str]]] = None,
+                 max_exact_words: int = 4, min_learned_words: int = 2):
+        """
+        Args:
+            terms: Dict source term -> target term
+            cache_lookup: Hàm tra cache cho text ngắn (None nếu không dùng cache)
+            max_exact_words: Số từ tối đa để coi một giá trị là thuật ngữ ngắn
+            min_learned_words: Số từ tối thiểu để giá trị dịch từ cache được bảo vệ
+                trong câu dài (từ đơn như "Speed" quá phổ biến, đổi nghĩa theo ngữ cảnh)
+        """
+        self.cache_lookup = cache_lookup
+        self.max_exact_words = max_exact_words
+        self.min_learned_words = min_learned_words
+        self.terms: Dict[str, str] = {}
+        self.automaton = AhoCorasick()
+        if terms:
+            self.add_terms(terms)
+
+    @classmethod
+    def from_glossary(cls, glossary_path: Optional[str],
+                      cache_lookup: Optional[Callable[[str], Optional[str]]] = None,
+                      **kwargs) -> 'TerminologyEngine':
+        """Tạo engine từ file glossary (có thể None) và cache lookup"""
+        terms = {}
+        if glossary_path:
+            try:
+                terms = parse_glossary_file(glossary_path)
+            except Exception as e:
+                logging.warning(f"Could not read glossary {glossary_path}: {e}")
+        return cls(terms, cache_lookup, **kwargs)
+
+    def add_terms(self, entries: Dict[str, str]):
+        """Thêm các cặp thuật ngữ vào engine"""
+        for source, target in entries.items():
+            key = normalize_term(source)
+            if key and target and key not in self.terms:
+                self.terms[key] = target
+                self.automaton.add(key)
+
+    def resolve_exact(self, text: str) -> Optional[str]:
+        """
+        Dịch offline một giá trị ngắn nếu khớp chính xác glossary hoặc cache
+
+        Args:
+            text: Source text
+
+        Returns:
+            Bản dịch, hoặc None nếu cần gửi lên provider
+        """
+        return self._resolve(text)[0]
+
+    def _resolve(self, text: str) -> Tuple[Optional[str], bool]:
+        """Như resolve_exact, kèm cờ bản dịch lấy từ cache (chưa có trong terms)"""
+        key = normalize_term(text)
+        if not key:
+            return None, False
+
+        translation = self.terms.get(key)
+        if translation:
+            return translation, False
+
+        if self.cache_lookup and len(key.split()) <= self.max_exact_words:
+            cached = self.cache_lookup(text)
+            # Bản dịch trùng source thường là fallback khi lỗi, không tin cậy
+            if cached and normalize_term(cached) != key:
+                return cached, True
+
+        return None, False
+
+    def find_terms(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Tìm các thuật ngữ được bảo vệ trong text dài
+
+        Chỉ nhận match trọn từ, không chồng lấn (ưu tiên match dài nhất bên trái)
+        và không nằm trong rich text ``[...]`` hoặc tham số ``__...__``.
+
+        Returns:
+            List of (start, end, target_term)
+        """
+        if not self.terms:
+            return []
+
+        folded = text.casefold()
+        # casefold có thể đổi độ dài (vd: ß -> ss), khi đó bỏ qua để giữ offset đúng
+        if len(folded) != len(text):
+            return []
+
+        markup = [(m.start(), m.end()) for m in PROTECTED_MARKUP_PATTERN.finditer(text)]
+        candidates = []
+        for start, end, term_index in self.automaton.find_all(folded):
+            if start > 0 and _is_word_char(folded[start - 1]):
+                continue
+            if end < len(folded) and _is_word_char(folded[end]):
+                continue
+            if any(m_start < end and start < m_end for m_start, m_end in markup):
+                continue
+            candidates.append((start, end, term_index))
+
+        candidates.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        selected = []
+        last_end = -1
+        for start, end, term_index in candidates:
+            if start >= last_end:
+                selected.append((start, end, self.terms[self.automaton.terms[term_index]]))
+                last_end = end
+        return selected
+
+    def protect(self, text: str) -> Tuple[str, List[str]]:
+        """
+        Thay thuật ngữ trong text bằng placeholder ``__T<n>__``
+
+        Returns:
+            Tuple of (masked_text, target_terms)
+        """
+        matches = self.find_terms(text)
+        if not matches:
+            return text, []
+
+        parts = []
+        replacements = []
+        position = 0
+        for start, end, target in matches:
+            parts.append(text[position:start])
+            parts.append(TERM_PLACEHOLDER.format(len(replacements)))
+            replacements.append(target)
+            position = end
+        parts.append(text[position:])
+        return ''.join(parts), replacements
+
+    @staticmethod
+    def restore(translated: str, replacements: List[str]) -> Optional[str]:
+        """
+        Thay placeholder trong bản dịch bằng thuật ngữ đích
+
+        Returns:
+            Text đã khôi phục, hoặc None nếu provider làm mất placeholder
+        """
+        if not replacements:
+            return translated
+
+        found = set()
+
+        def substitute(match):
+            index = int(match.group(1))
+            if index >= len(replacements):
+                return match.group(0)
+            found.add(index)
+            return replacements[index]
+
+        restored = TERM_PLACEHOLDER_PATTERN.sub(substitute, translated)
+        if len(found) != len(replacements):
+            return None
+        return restored
+
+    def pretranslate(self, texts: List[str]) -> PretranslationResult:
+        """
+        Pre-translation pass: dịch offline thuật ngữ ngắn, bảo vệ thuật ngữ trong câu dài
+
+        Args:
+            texts: Source texts
+
+        Returns:
+            PretranslationResult với các text đã dịch và các text cần gửi provider
+        """
+        result = PretranslationResult(len(texts))
+        learned = {}
+        for i, text in enumerate(texts):
+            translation, from_cache = self._resolve(text)
+            if translation is not None:
+                result.resolved[i] = translation
+                if from_cache and len(text.split()) >= self.min_learned_words:
+                    learned[text] = translation
+            else:
+                result.pending_indices.append(i)
+
+        # Thêm cả lô trước khi protect để automaton chỉ phải compile lại một lần
+        if learned:
+            self.add_terms(learned)
+        for i in result.pending_indices:
+            masked, replacements = self.protect(texts[i])
+            result.pending_texts.append(masked)
+            result.replacements.append(replacements)
+        return result
+
+    def merge(self, result: PretranslationResult, texts: List[str],
+              translated_pending: List[str]) -> Tuple[List[str], List[int]]:
+        """
+        Ghép kết quả offline và kết quả từ provider theo thứ tự ban đầu
+
+        Args:
+            result: Kết quả từ pretranslate()
+            texts: Source texts ban đầu
+            translated_pending: Bản dịch của result.pending_texts
+
+        Returns:
+            Tuple of (translations, failed_indices) - failed_indices là các
+            index bị mất placeholder, cần dịch lại bản gốc không mask
+        """
+        translations = list(texts)
+        failed = []
+        for i, translation in result.resolved.items():
+            translations[i] = translation
+
+        for i, translated, replacements in zip(result.pending_indices, translated_pending, result.replacements):
+            restored = self.restore(translated, replacements)
+            if restored is None:
+                failed.append(i)
+            else:
+                translations[i] = restored
+
+        return translations, failed
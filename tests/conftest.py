@@ -0,0 +1,5 @@
+"""Cho phép import các module ở thư mục gốc của repo khi chạy pytest"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
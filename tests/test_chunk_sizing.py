@@ -0,0 +1,110 @@
+"""Test kích thước chunk AIMD, lưu state và chia chunk theo kích thước thay đổi"""
+import json
+
+from chunk_sizing import CHUNK_STATE_FILE, AdaptiveChunkSizer, adaptive_chunks, is_truncated
+from google_translate_core import GoogleTranslateAPI
+
+
+def make_sizer(tmp_path, provider="google", **kwargs):
+    options = dict(initial=1000, minimum=500, maximum=2000, step=250, probe_after=3)
+    options.update(kwargs)
+    return AdaptiveChunkSizer(str(tmp_path), provider, **options)
+
+
+def test_grows_only_on_full_fast_chunks(tmp_path):
+    sizer = make_sizer(tmp_path)
+    sizer.record_success("vi", 1000, 0.5)
+    assert sizer.size("vi") == 1250
+    # Chunk gần rỗng không chứng minh được gì
+    sizer.record_success("vi", 100, 0.5)
+    assert sizer.size("vi") == 1250
+    # Latency cao: giảm nhẹ
+    sizer.record_success("vi", 1250, 5.0)
+    assert sizer.size("vi") == 1000
+    # Ngôn ngữ khác có state riêng
+    assert sizer.size("ja") == 1000
+
+
+def test_failure_halves_and_sets_ceiling(tmp_path):
+    sizer = make_sizer(tmp_path)
+    sizer.record_success("vi", 1000, 0.5)
+    sizer.record_failure("vi", 1250, "mismatch")
+    assert sizer.size("vi") == 625
+    assert sizer.states["vi"]["ceiling"] == 1000
+
+    sizer.record_success("vi", 625, 0.5)
+    sizer.record_success("vi", 875, 0.5)
+    assert sizer.size("vi") == 875
+    # Ở trần: chỉ nới trần sau probe_after request tốt liên tiếp
+    for _ in range(3):
+        sizer.record_success("vi", 875, 0.5)
+    assert sizer.states["vi"]["ceiling"] == 1250
+    sizer.record_success("vi", 875, 0.5)
+    assert sizer.size("vi") == 1125
+
+
+def test_network_error_does_not_set_ceiling(tmp_path):
+    sizer = make_sizer(tmp_path)
+    sizer.record_failure("vi", 1000, "error")
+    assert sizer.size("vi") == 500
+    assert sizer.states["vi"]["ceiling"] is None
+    sizer.record_failure("vi", 500, "error")
+    assert sizer.size("vi") == 500
+
+
+def test_state_is_persisted_per_provider(tmp_path):
+    google = make_sizer(tmp_path, "google")
+    safe = make_sizer(tmp_path, "google_safe")
+    google.record_failure("vi", 1000, "too_large")
+    safe.record_failure("ja", 1000, "error")
+
+    data = json.loads((tmp_path / CHUNK_STATE_FILE).read_text(encoding='utf-8'))
+    assert set(data) == {"google", "google_safe"}
+    assert make_sizer(tmp_path, "google").size("vi") == 500
+    assert make_sizer(tmp_path, "google").size("ja") == 1000
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_adaptive_chunks_reads_size_after_each_chunk():
+    sizes = iter([10, 4, 100])
+    texts = ["aaaa", "bbbb", "cc", "dd", "eeeeeeeeeeeeeee"]
+    chunks = list(adaptive_chunks(texts, lambda: next(sizes)))
+    assert chunks == [["aaaa", "bbbb"], ["cc"], ["dd", "eeeeeeeeeeeeeee"]]
+
+
+def test_oversized_text_is_sent_whole():
+    texts = ["ab", "word " * 20, "d"]
+    chunks = list(adaptive_chunks(texts, lambda: 5))
+    assert chunks == [["ab"], ["word " * 20], ["d"]]
+
+
+class EchoResponse:
+    status_code = 200
+
+    def __init__(self, text):
+        self.content = json.dumps([[[text.upper(), text]]]).encode('utf-8')
+
+
+class EchoSession:
+    def get(self, url, params=None, timeout=None):
+        return EchoResponse(params['q'])
+
+
+def test_translate_texts_returns_one_result_per_text(tmp_path):
+    api = GoogleTranslateAPI(cache_dir=str(tmp_path))
+    api.rate_limit_delay = api.chunk_delay = 0
+    api.session = EchoSession()
+    api.chunk_sizer = make_sizer(tmp_path, initial=500)
+
+    long_description = "Long description of the machine. " * 40
+    texts = ["Short name", long_description, "Another name"]
+    out = api.translate_texts(texts, "vi")
+    assert len(out) == len(texts)
+    assert out == [text.upper() for text in texts]
+    assert len(api.split_text_into_chunks(texts, 500)) == 3
+
+
+def test_is_truncated():
+    assert not is_truncated([["A\n", "a\n"], ["B", "b"]], "a\nb")
+    assert is_truncated([["A", "a" * 10]], "a" * 10 + "\n" + "b" * 10)
+    assert not is_truncated([["A"]], "a\nb")
@@ -0,0 +1,35 @@
+"""Test DeepLAPI.translate_texts_batch trên mock server: dừng gửi khi hết quota"""
+from mock_translate_server import MockServerConfig, MockTranslateServer
+from network_utils import DeepLAPI
+
+
+def make_api(server, **kwargs):
+    api = DeepLAPI('mock-key', endpoint='mock', **kwargs)
+    api.base_url = server.deepl_url
+    return api
+
+
+def test_batches_are_translated_in_order():
+    with MockTranslateServer(config=MockServerConfig(latency=0, jitter=0)) as server:
+        api = make_api(server, max_batch_size=3)
+        texts = [f"Text {i}" for i in range(10)]
+        assert api.translate_texts_batch(texts, 'VI', check_quota=False) == [f"[vi] {text}" for text in texts]
+        assert server.config.requests == 4
+
+
+def test_quota_exceeded_stops_remaining_batches():
+    config = MockServerConfig(latency=0.02, jitter=0, character_limit=100)
+    with MockTranslateServer(config=config) as server:
+        api = make_api(server, max_batch_size=1, max_concurrency=2)
+        texts = [f"Sentence number {i:03d}" for i in range(200)]
+        progress = []
+        results = api.translate_texts_batch(texts, 'VI', check_quota=False,
+                                            progress_callback=lambda done, total, _: progress.append(total))
+
+    assert api.quota_exhausted
+    translated = [result for result in results if result.startswith('[vi] ')]
+    assert 0 < len(translated) <= 5
+    # Batch không dịch được giữ nguyên text gốc, các batch còn lại không được gửi
+    assert all(result in (text, f"[vi] {text}") for text, result in zip(texts, results))
+    assert config.requests < 50
+    assert set(progress) == {200}
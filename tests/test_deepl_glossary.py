@@ -0,0 +1,72 @@
+"""Test DeepLGlossaryManager: chỉ tạo lại glossary khi DeepL báo 404"""
+import json
+
+import pytest
+import requests
+
+from deepl_glossary import DeepLGlossaryManager
+from network_utils import APIError, DeepLAPI
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.content = json.dumps(data or {}).encode('utf-8')
+
+
+class FakeNetwork:
+    """Trả lời GET glossary bằng ``check`` (status code hoặc exception), ghi lại các request"""
+
+    def __init__(self, check):
+        self.check = check
+        self.calls = []
+
+    def make_request_with_retry(self, method, url, **kwargs):
+        self.calls.append(method)
+        if method == 'GET':
+            if isinstance(self.check, Exception):
+                raise self.check
+            return FakeResponse(self.check)
+        if method == 'POST':
+            return FakeResponse(201, {"glossary_id": "new-id"})
+        return FakeResponse(204)
+
+
+def make_manager(tmp_path, check):
+    api = DeepLAPI('key', endpoint='mock')
+    api.network = FakeNetwork(check)
+    glossary = tmp_path / "glossary.txt"
+    glossary.write_text("Iron plate=Tấm sắt\n", encoding='utf-8')
+    manager = DeepLGlossaryManager(api, cache_dir=str(tmp_path / "cache"))
+    key = manager._cache_key('EN', 'VI')
+    content_hash = manager.hash_entries({"Iron plate": "Tấm sắt"}, 'EN', 'VI')
+    manager.glossaries[key] = {'hash': content_hash, 'glossary_id': 'cached-id'}
+    return manager, api.network, str(glossary)
+
+
+@pytest.mark.parametrize("status, expected", [(200, True), (404, False)])
+def test_glossary_exists_status(status, expected):
+    api = DeepLAPI('key', endpoint='mock')
+    api.network = FakeNetwork(status)
+    assert api.glossary_exists('id') is expected
+
+
+@pytest.mark.parametrize("check", [403, 503, requests.exceptions.ConnectionError("down")])
+def test_glossary_exists_raises_on_other_errors(check):
+    api = DeepLAPI('key', endpoint='mock')
+    api.network = FakeNetwork(check)
+    with pytest.raises(APIError):
+        api.glossary_exists('id')
+
+
+@pytest.mark.parametrize("check", [200, 503, APIError("Request failed")])
+def test_cached_glossary_is_kept_unless_deleted(tmp_path, check):
+    manager, network, glossary = make_manager(tmp_path, check)
+    assert manager.ensure_glossary(glossary, 'VI') == 'cached-id'
+    assert network.calls == ['GET']
+
+
+def test_deleted_glossary_is_recreated(tmp_path):
+    manager, network, glossary = make_manager(tmp_path, 404)
+    assert manager.ensure_glossary(glossary, 'VI') == 'new-id'
+    assert network.calls == ['GET', 'POST', 'DELETE']
@@ -0,0 +1,44 @@
+"""Test fuzzy translation memory: suy ra bản dịch, giới hạn index và dùng chung theo cache"""
+from fuzzy_memory import FuzzyTranslationMemory, shared_memory, substitute_tokens
+from translation_cache import TranslationCache
+
+
+def test_substitute_tokens():
+    assert substitute_tokens("Assembler Mk3", "Assembler Mk2", "Máy lắp ráp Mk2") == "Máy lắp ráp Mk3"
+    assert substitute_tokens("Speed __2__", "Speed __1__", "Tốc độ __1__") == "Tốc độ __2__"
+    # Token đổi không xuất hiện trong bản dịch: không suy ra được
+    assert substitute_tokens("Red belt", "Blue belt", "Băng chuyền xanh") is None
+
+
+def test_lookup_resolves_from_cache(tmp_path):
+    cache = TranslationCache(str(tmp_path))
+    cache.put("Electric mining drill Mk2", "Máy khoan điện Mk2", "vi")
+    memory = FuzzyTranslationMemory(cache)
+
+    match = memory.lookup("Electric mining drill Mk3", "vi")
+    assert match.resolved == "Máy khoan điện Mk3"
+    assert memory.lookup("Completely different text", "vi") is None
+
+
+def test_index_keeps_most_recently_used_entries(tmp_path):
+    cache = TranslationCache(str(tmp_path))
+    for i in range(10):
+        cache.put(f"Source sentence number {i}", f"Câu số {i}", "vi")
+    cache.save()
+    memory = FuzzyTranslationMemory(cache, max_entries=4)
+
+    index = memory.index("vi")
+    assert index.live == 4
+    for i in range(10, 20):
+        memory.add(f"Source sentence number {i}", f"Câu số {i}", "vi")
+        assert memory.indexes["vi"].live <= 5
+    assert "Source sentence number 19" in memory.indexes["vi"].ids
+    assert "Source sentence number 10" not in memory.indexes["vi"].ids
+
+
+def test_shared_memory_is_one_per_cache_file(tmp_path):
+    first = TranslationCache(str(tmp_path / "a"))
+    second = TranslationCache(str(tmp_path / "a"))
+    other = TranslationCache(str(tmp_path / "b"))
+    assert shared_memory(first) is shared_memory(second)
+    assert shared_memory(other) is not shared_memory(first)
@@ -0,0 +1,57 @@
+"""Test SafeGoogleTranslateAPI: chia đôi chunk sai số dòng và không cache bản đoán"""
+import json
+
+import pytest
+
+from google_translate_safe import SafeGoogleTranslateAPI
+from shared_rate_limiter import close_shared
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, text, source):
+        self.content = json.dumps([[[text, source]]]).encode('utf-8')
+
+
+class SplittingSession:
+    """Session giả: dòng chứa "broken" bị dịch thành hai dòng"""
+
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, params=None, timeout=None):
+        lines = params['q'].split('\n')
+        self.requests.append(len(lines))
+        translated = [line.upper().replace('BROKEN', 'BRO\nKEN') for line in lines]
+        return FakeResponse('\n'.join(translated), params['q'])
+
+
+@pytest.fixture
+def safe_api(tmp_path):
+    api = SafeGoogleTranslateAPI(cache_dir=str(tmp_path), fuzzy_matching=False)
+    api.min_delay = api.max_delay = api.current_delay = 0
+    api.session = SplittingSession()
+    yield api
+    close_shared()
+
+
+def test_line_count_mismatch_is_bisected(safe_api):
+    texts = ["Iron plate", "Copper cable", "Broken gear", "Steel chest"]
+    result = safe_api.translate_texts(texts, 'VI')
+
+    assert result == ["IRON PLATE", "COPPER CABLE", "Broken gear", "STEEL CHEST"]
+    assert safe_api.session.requests[0] == 4
+    assert len(safe_api.session.requests) > 1
+
+
+def test_unresolved_text_is_not_cached(safe_api):
+    safe_api.translate_texts(["Iron plate", "Broken gear"], 'VI')
+    assert safe_api.get_cached_translation("Iron plate", 'vi') == "IRON PLATE"
+    assert safe_api.get_cached_translation("Broken gear", 'vi') is None
+
+
+def test_masked_template_failure_keeps_every_original(safe_api):
+    texts = ["Broken tier 1", "Broken tier 2", "Solid tier 3"]
+    assert safe_api.translate_texts(texts, 'VI') == ["Broken tier 1", "Broken tier 2", "SOLID TIER 3"]
+    assert safe_api.get_cached_translation("Broken tier __S0__", 'vi') is None
@@ -0,0 +1,55 @@
+"""Test span instrumentation: trace JSON, bảng tổng hợp và no-op khi không có tracer"""
+import json
+import threading
+
+import instrumentation
+from instrumentation import mod_context, span, start_tracer, stop_tracer
+
+
+def run_span(stage, bytes_count):
+    with span(stage, bytes_count=bytes_count):
+        pass
+
+
+def test_span_is_noop_without_tracer():
+    stop_tracer()
+    with span("http") as stage:
+        stage.add_bytes(10)
+    assert instrumentation.get_tracer() is None
+
+
+def test_trace_output_groups_spans_by_mod_and_stage(tmp_path):
+    tracer = start_tracer("job1", str(tmp_path))
+    try:
+        with mod_context("mod-a"):
+            with span("zip_read", bytes_count=100):
+                pass
+            with span("http") as stage:
+                stage.add_bytes(20)
+            with span("parse"):
+                pass
+            # Span trên thread khác lấy mod hiện tại của job
+            worker = threading.Thread(target=run_span, args=("http", 5))
+            worker.start()
+            worker.join()
+        with span("zip_write", mod="mod-b"):
+            pass
+    finally:
+        assert stop_tracer() is tracer
+
+    trace_file = tracer.write()
+    assert trace_file == tmp_path / "job1.json"
+    trace = json.loads(trace_file.read_text(encoding='utf-8'))
+
+    assert trace['job_id'] == "job1"
+    events = [(event['cat'], event['name'], event['args']['bytes']) for event in trace['traceEvents']]
+    assert sorted(events) == [("mod-a", "http", 5), ("mod-a", "http", 20), ("mod-a", "parse", 0),
+                              ("mod-a", "zip_read", 100), ("mod-b", "zip_write", 0)]
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in trace['traceEvents'])
+    assert len({event['tid'] for event in trace['traceEvents']}) == 2
+    assert (trace['stages']['http']['calls'], trace['stages']['http']['bytes']) == (2, 25)
+    assert trace['mods']["mod-b|zip_write"]['calls'] == 1
+
+    summary = (tmp_path / "job1.txt").read_text(encoding='utf-8')
+    assert summary.startswith("Trace job1")
+    assert "zip_write" in summary and "mod-a" in summary
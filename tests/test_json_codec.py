@@ -0,0 +1,53 @@
+"""Test json_codec: BOM, round-trip trên mọi backend có sẵn và snapshot nhị phân"""
+import pytest
+
+import json_codec
+
+DATA = {"name": "Tấm sắt", "count": 3, "nested": [1.5, None, True], "big": 2 ** 70}
+
+BACKENDS = ['json'] + [name for name, module in (('orjson', json_codec.orjson), ('msgspec', json_codec.msgspec))
+                       if module is not None]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    monkeypatch.setattr(json_codec, 'BACKEND', request.param)
+    return request.param
+
+
+def test_loads_strips_utf8_bom(backend):
+    assert json_codec.loads(json_codec.UTF8_BOM + '{"a": "ố"}'.encode('utf-8')) == {"a": "ố"}
+    assert json_codec.loads('﻿[1, 2]') == [1, 2]
+
+
+def test_invalid_json_raises_value_error(backend):
+    with pytest.raises(ValueError):
+        json_codec.loads(b'{"a": ')
+
+
+def test_file_round_trip_keeps_non_ascii(backend, tmp_path):
+    path = tmp_path / "info.json"
+    json_codec.dump_file(path, DATA, indent=True)
+    raw = path.read_bytes()
+    assert "Tấm sắt".encode('utf-8') in raw and b'\n  ' in raw
+    assert json_codec.load_file(path) == DATA
+    assert json_codec.loads(json_codec.dumps(DATA)) == DATA
+
+
+def test_binary_snapshot_round_trip(backend):
+    snapshot = {"entries": {"abc": {"t": "Tấm sắt", "h": 2}}, "version": 2}
+    data = json_codec.dumps_binary(snapshot)
+    assert data[:1] in (json_codec.SNAPSHOT_MSGPACK, json_codec.SNAPSHOT_ZLIB_JSON)
+    assert json_codec.loads_binary(data) == snapshot
+
+
+def test_binary_snapshot_without_msgspec(monkeypatch):
+    monkeypatch.setattr(json_codec, 'msgspec', None)
+    data = json_codec.dumps_binary([1, "ố"])
+    assert data[:1] == json_codec.SNAPSHOT_ZLIB_JSON
+    assert json_codec.loads_binary(data) == [1, "ố"]
+
+    with pytest.raises(ValueError, match="msgspec"):
+        json_codec.loads_binary(json_codec.SNAPSHOT_MSGPACK + b'\x91\x01')
+    with pytest.raises(ValueError, match="Unknown snapshot format"):
+        json_codec.loads_binary(b'{}')
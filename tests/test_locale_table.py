@@ -0,0 +1,56 @@
+"""Test LocaleTable khớp với ModFileProcessor.parse_cfg_content và ghép lại file gốc"""
+import pytest
+
+from file_utils import ModFileProcessor
+from locale_table import LocaleTable
+
+CFG_CONTENT = (
+    "; comment=not an entry\n"
+    "[item-name]\n"
+    "iron-plate=Iron plate\n"
+    "  copper-cable =  Copper cable  \r\n"
+    "\n"
+    "[ entity-description ]\n"
+    "assembler=Crafts items = faster\n"
+    "empty=\n"
+    "no-equals line\n"
+    "unicode=Năng lượng ⚡ __1__"
+)
+
+
+@pytest.mark.parametrize("content", [CFG_CONTENT, CFG_CONTENT + "\n", "", "[only-section]\n"])
+def test_entries_match_parse_cfg_content(content):
+    expected, lines = ModFileProcessor().parse_cfg_content(content)
+    table = LocaleTable.parse("locale/en/test.cfg", content)
+
+    assert len(table) == len(expected)
+    assert [table.key(i) for i in range(len(table))] == [entry['key'] for entry in expected]
+    assert table.values == [entry['val'] for entry in expected]
+    # Offset dòng trỏ đúng vào dòng gốc của entry
+    for i, entry in enumerate(expected):
+        assert table.content[table.line_starts[i]:table.next_starts[i]] == lines[entry['index']]
+
+
+def test_entry_sections():
+    table = LocaleTable.parse("test.cfg", CFG_CONTENT)
+    assert table.entry_sections() == ['item-name', 'item-name', 'entity-description',
+                                      'entity-description', 'entity-description']
+
+
+def test_iter_output_replaces_values_only():
+    table = LocaleTable.parse("test.cfg", CFG_CONTENT)
+    translations = [f"T{i}" for i in range(len(table))]
+    output = ''.join(table.iter_output(translations))
+
+    expected_lines = CFG_CONTENT.splitlines(keepends=True)
+    expected, _ = ModFileProcessor().parse_cfg_content(CFG_CONTENT)
+    for entry, translation in zip(expected, translations):
+        expected_lines[entry['index']] = f"{entry['key']}={translation}\n"
+    assert output == ''.join(expected_lines)
+
+
+def test_iter_output_keeps_original_when_translation_missing():
+    content = "[a]\nx=1\ny=2\n"
+    table = LocaleTable.parse("test.cfg", content)
+    assert ''.join(table.iter_output([])) == content
+    assert ''.join(table.iter_output(["un"])) == "[a]\nx=un\ny=2\n"
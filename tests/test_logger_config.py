@@ -0,0 +1,89 @@
+"""Test logger_config: queue logging, JSON-lines, ContextLogger và LogSampler"""
+import atexit
+import json
+import logging
+
+import pytest
+
+from logger_config import LoggerManager, LogSampler
+
+
+@pytest.fixture
+def make_manager(tmp_path):
+    managers = []
+
+    def make(**kwargs):
+        manager = LoggerManager(f"TestApp{len(managers)}", str(tmp_path / "logs"), **kwargs)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.shutdown()
+        atexit.unregister(manager.shutdown)
+        for handler in manager.handlers:
+            handler.close()
+        manager.logger.handlers.clear()
+
+
+def test_queue_mode_writes_records_on_shutdown(make_manager):
+    manager = make_manager(use_queue=True, json_logs=False)
+    manager.get_logger("worker").error("Chunk %d failed", 7)
+    manager.shutdown()
+
+    assert manager.listener is None
+    assert "Chunk 7 failed" in manager.main_log_file.read_text(encoding='utf-8')
+    assert "Chunk 7 failed" in manager.error_log_file.read_text(encoding='utf-8')
+
+
+def test_json_lines_include_bound_context(make_manager):
+    manager = make_manager(use_queue=False, json_logs=True)
+    job_log = manager.bind("pipeline", job_id="job1", mod="mod-a")
+    job_log.bind(chunk=3).info("Chunk %d done", 3, extra={'context': {'mod': "mod-b"}})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        job_log.exception("Failed")
+    manager.shutdown()
+
+    assert manager.main_log_file.name == "app.jsonl"
+    first, second = [json.loads(line) for line in manager.main_log_file.read_text(encoding='utf-8').splitlines()]
+    assert first['msg'] == "Chunk 3 done"
+    assert first['logger'] == f"{manager.app_name}.pipeline"
+    assert (first['level'], first['job_id'], first['mod'], first['chunk']) == ('INFO', "job1", "mod-b", 3)
+    assert (second['level'], second['mod']) == ('ERROR', "mod-a")
+    assert 'chunk' not in second
+    assert "ValueError: boom" in second['exc']
+
+
+def test_context_logger_formats_lazily(make_manager):
+    class Expensive:
+        def __str__(self):
+            raise AssertionError("formatted a record that is never written")
+
+    manager = make_manager(use_queue=False, json_logs=True)
+    manager.logger.setLevel(logging.INFO)
+    manager.bind("pipeline", job_id="job1").debug("Payload %s", Expensive())
+    manager.shutdown()
+    assert manager.main_log_file.read_text(encoding='utf-8') == ""
+
+
+def test_sampler_reports_suppressed_messages(capsys):
+    sampler = LogSampler(interval=3600)
+    assert sampler.print("chunk", "Chunk 1")
+    assert not sampler.print("chunk", "Chunk 2")
+    assert not sampler.print("chunk", "Chunk 3")
+    assert sampler.print("other", "Other")
+    assert sampler.print("chunk", "Chunk 4", force=True)
+
+    assert capsys.readouterr().out.splitlines() == ["Chunk 1", "Other", "Chunk 4 (+2 similar messages)"]
+
+
+def test_sampler_skips_disabled_levels(caplog):
+    sampler = LogSampler(interval=0)
+    logger = logging.getLogger("TestSampler")
+    logger.setLevel(logging.INFO)
+    with caplog.at_level(logging.INFO, logger="TestSampler"):
+        assert not sampler.log(logger, logging.DEBUG, "chunk", "hidden")
+        assert sampler.log(logger, logging.INFO, "chunk", "shown")
+    assert [record.getMessage() for record in caplog.records] == ["shown"]
@@ -0,0 +1,71 @@
+"""Test thứ tự dịch của ModScheduler: dependency trước, vòng phụ thuộc được phá"""
+import json
+import zipfile
+from pathlib import Path
+
+from mod_scheduler import ModScheduler, parse_dependencies
+from translation_pipeline import TranslationPipeline
+
+
+def build_mod(directory, name, dependencies=(), values=()):
+    """Mod zip với info.json và một file locale/en"""
+    info = {"name": name, "version": "1.0.0", "dependencies": list(dependencies)}
+    cfg = "[item-name]\n" + "".join(f"{name}-{i}={value}\n" for i, value in enumerate(values))
+    zip_path = directory / f"{name}_1.0.0.zip"
+    with zipfile.ZipFile(zip_path, 'w') as zipf:
+        zipf.writestr(f"{name}/info.json", json.dumps(info))
+        zipf.writestr(f"{name}/locale/en/{name}.cfg", cfg)
+    return str(zip_path)
+
+
+def names(order):
+    return [Path(path).name.split('_')[0] for path in order]
+
+
+def test_parse_dependencies():
+    info = {"dependencies": ["base >= 2.0", "? flib >= 0.12", "(?) foo", "~ bar", "! broken-mod"]}
+    assert parse_dependencies(info) == ["base", "flib", "foo", "bar"]
+    assert parse_dependencies({}) == []
+
+
+def test_dependencies_are_translated_first(tmp_path):
+    app = build_mod(tmp_path, "app", ["base", "lib"], ["Application window"])
+    lib = build_mod(tmp_path, "lib", ["core"], ["Library screen"])
+    core = build_mod(tmp_path, "core", [], ["Core panel"])
+
+    order = ModScheduler(TranslationPipeline('vi')).schedule([app, lib, core])
+    assert names(order) == ["core", "lib", "app"]
+
+
+def test_shared_strings_break_ties(tmp_path):
+    alone = build_mod(tmp_path, "alone", [], ["Unique text here"])
+    first = build_mod(tmp_path, "first", [], ["Iron gear wheel", "Copper cable"])
+    second = build_mod(tmp_path, "second", [], ["Iron gear wheel", "Copper cable"])
+
+    scheduler = ModScheduler(TranslationPipeline('vi'))
+    assert names(scheduler.schedule([alone, first, second])) == ["first", "second", "alone"]
+    assert scheduler.shared_scores[alone] == 0
+
+
+def test_cycle_is_broken_and_every_mod_scheduled_once(tmp_path):
+    a = build_mod(tmp_path, "a", ["b"], ["Alpha text"])
+    b = build_mod(tmp_path, "b", ["a"], ["Beta text", "Shared text"])
+    c = build_mod(tmp_path, "c", ["a"], ["Gamma text", "Shared text"])
+    d = build_mod(tmp_path, "d", ["c"], ["Delta text"])
+
+    order = names(ModScheduler(TranslationPipeline('vi')).schedule([a, b, c, d]))
+    assert sorted(order) == ["a", "b", "c", "d"]
+    # Vòng a <-> b được phá bằng mod có điểm cao nhất (b), sau đó dependency vẫn được giữ
+    assert order == ["b", "a", "c", "d"]
+
+
+def test_mod_without_info_is_kept(tmp_path):
+    broken = tmp_path / "broken.zip"
+    with zipfile.ZipFile(broken, 'w') as zipf:
+        zipf.writestr("readme.txt", "no info.json")
+    ok = build_mod(tmp_path, "ok", [], ["Some text"])
+
+    scheduler = ModScheduler(TranslationPipeline('vi'))
+    order = scheduler.schedule([str(broken), ok])
+    assert sorted(order) == sorted([str(broken), ok])
+    assert scheduler.parse_mod(str(broken)) is None
@@ -0,0 +1,75 @@
+"""Test các output sink: zip ghi nguyên tử và kết quả pipeline giống nhau trên mọi sink"""
+import zipfile
+
+import pytest
+
+from benchmark_translation import build_synthetic_mods
+from output_sinks import DirectorySink, MemorySink, ZipSink
+from translation_pipeline import TranslationPipeline
+
+
+def test_zip_sink_renames_on_close(tmp_path):
+    zip_path = tmp_path / "out" / "pack.zip"
+    sink = ZipSink(zip_path)
+    sink.write_text("locale/vi/a.cfg", ["a=", "b\n"])
+    sink.subdir("nested").write_bytes("info.json", b"{}")
+    assert not zip_path.exists()
+
+    sink.close()
+    assert sorted(path.name for path in zip_path.parent.iterdir()) == ["pack.zip"]
+    with zipfile.ZipFile(zip_path) as zipf:
+        assert zipf.read("locale/vi/a.cfg") == b"a=b\n"
+        assert zipf.read("nested/info.json") == b"{}"
+
+
+def test_zip_sink_abort_leaves_no_partial_zip(tmp_path):
+    zip_path = tmp_path / "pack.zip"
+    with pytest.raises(RuntimeError):
+        with ZipSink(zip_path) as sink:
+            sink.write_text("a.cfg", ["a=b\n"])
+            raise RuntimeError("job failed")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_zip_sink_abort_keeps_previous_zip(tmp_path):
+    zip_path = tmp_path / "pack.zip"
+    with ZipSink(zip_path) as sink:
+        sink.write_text("a.cfg", ["old\n"])
+
+    sink = ZipSink(zip_path)
+    sink.write_text("a.cfg", ["new\n"])
+    sink.abort()
+    with zipfile.ZipFile(zip_path) as zipf:
+        assert zipf.read("a.cfg") == b"old\n"
+
+
+def test_zip_sink_rejects_duplicate_names(tmp_path):
+    with ZipSink(tmp_path / "pack.zip") as sink:
+        sink.write_text("a.cfg", ["a=b\n"])
+        assert sink.has("a.cfg")
+        with pytest.raises(ValueError):
+            sink.write_text("a.cfg", ["a=c\n"])
+
+
+def test_pipeline_output_is_identical_across_sinks(tmp_path):
+    mods_dir = tmp_path / "mods"
+    mods_dir.mkdir()
+    mod_paths = [str(path) for path in build_synthetic_mods(mods_dir, 2, 20, seed=1)]
+
+    def translate(texts):
+        return [text.upper() for text in texts]
+
+    directory = tmp_path / "dir"
+    TranslationPipeline('vi').run(mod_paths, translate, DirectorySink(directory))
+    memory = MemorySink()
+    TranslationPipeline('vi').run(mod_paths, translate, memory)
+    zip_path = tmp_path / "out.zip"
+    with ZipSink(zip_path) as sink:
+        TranslationPipeline('vi').run(mod_paths, translate, sink)
+
+    from_directory = {path.relative_to(directory).as_posix(): path.read_bytes()
+                      for path in directory.rglob('*') if path.is_file()}
+    with zipfile.ZipFile(zip_path) as zipf:
+        from_zip = {name: zipf.read(name) for name in zipf.namelist()}
+    assert from_directory
+    assert from_directory == memory.files == from_zip
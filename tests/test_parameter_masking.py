@@ -0,0 +1,39 @@
+"""Test mask/unmask slot cho số, số La Mã và tham số Factorio"""
+import pytest
+
+from parameter_masking import mask_slots, unmask_slots
+
+
+@pytest.mark.parametrize("text", [
+    "Tier 3",
+    "Increases speed by __1__ (x10)",
+    "Requires [item=iron-plate] and 2.5 __ITEM__iron-plate__",
+    "Assembler Mk II",
+    "Assembler V",
+])
+def test_round_trip(text):
+    template, values = mask_slots(text)
+    assert values
+    assert unmask_slots(template, values) == text
+
+
+def test_tiered_strings_share_one_template():
+    assert mask_slots("Tier 1")[0] == mask_slots("Tier 5")[0] == "Tier __S0__"
+    assert mask_slots("Engine IV")[0] == mask_slots("Engine V.")[0].rstrip('.')
+
+
+@pytest.mark.parametrize("text", ["Press X to jump", "Ctrl + X", "I think so", "X marks the spot"])
+def test_single_letter_words_are_not_masked(text):
+    assert mask_slots(text) == (text, [])
+
+
+def test_unmask_tolerates_spaced_slots():
+    template, values = mask_slots("Tier 4")
+    assert unmask_slots("Cấp _ _S0_ _", values) == "Cấp 4"
+
+
+def test_unmask_rejects_lost_or_duplicated_slots():
+    values = ["1", "2"]
+    assert unmask_slots("__S0__ only", values) is None
+    assert unmask_slots("__S0__ __S0__", values) is None
+    assert unmask_slots("plain text", []) == "plain text"
@@ -0,0 +1,84 @@
+"""Test job dịch theo tầng ưu tiên: thứ tự tầng trên mọi mod và xuất bản pack tạm"""
+import pytest
+
+from benchmark_translation import build_mod_zip
+from priority_job import PriorityTranslationJob, entry_tier
+from translation_pipeline import ModResult, TranslationPipeline
+
+CFG = """[item-name]
+{name}-plate=Iron plate from {name}
+[gui]
+{name}-button=Open the machine menu
+[item-description]
+{name}-plate=This plate is used for the research of steel technology
+"""
+
+
+def make_mods(tmp_path):
+    paths = []
+    for name in ("alpha", "beta"):
+        path = tmp_path / f"{name}.zip"
+        build_mod_zip(path, name, CFG.format(name=name))
+        paths.append(str(path))
+    return paths
+
+
+def test_entry_tier():
+    assert entry_tier('item-name', "Iron plate") == 0
+    assert entry_tier('gui', "Open") == 1
+    assert entry_tier('gui', "x" * 121) == 2
+    assert entry_tier('technology-description', "Short") == 2
+
+
+def test_tiers_run_across_mods_and_publish_after_names(tmp_path):
+    calls = []
+    published = []
+
+    def translate(texts):
+        calls.append(texts)
+        return [f"[vi] {text}" for text in texts]
+
+    def publish(results, final):
+        published.append((final, {result.name: ''.join(result.lines) for result in results}))
+
+    job = PriorityTranslationJob(TranslationPipeline('VI'), translate, publish_fn=publish, publish_interval=3600)
+    results = job.run(make_mods(tmp_path) + [str(tmp_path / "missing.zip")])
+
+    description = "This plate is used for the research of steel technology"
+    assert calls == [["Iron plate from alpha"], ["Iron plate from beta"],
+                     ["Open the machine menu"], ["Open the machine menu"],
+                     [description], [description]]
+    assert [(result.name, result.status) for result in results] == [
+        ("alpha", ModResult.TRANSLATED), ("beta", ModResult.TRANSLATED), ("missing", ModResult.INVALID)]
+
+    # Pack tạm sau tầng 0: tên đã dịch, phần còn lại giữ tiếng Anh
+    assert [final for final, _ in published] == [False, True]
+    interim = published[0][1]
+    assert set(interim) == {"alpha", "beta"}
+    assert "alpha-plate=[vi] Iron plate from alpha" in interim["alpha"]
+    assert "alpha-button=Open the machine menu" in interim["alpha"]
+    final = published[1][1]
+    assert "beta-button=[vi] Open the machine menu" in final["beta"]
+    assert "beta-plate=[vi] This plate" in final["beta"]
+    assert job.publish_count == 2
+
+
+def test_interim_publish_failure_does_not_stop_job(tmp_path):
+    published = []
+
+    def publish(results, final):
+        if not final:
+            raise OSError("disk full")
+        published.append(final)
+
+    job = PriorityTranslationJob(TranslationPipeline('VI'), lambda texts: [f"[vi] {text}" for text in texts],
+                                 publish_fn=publish, publish_interval=0)
+    results = job.run(make_mods(tmp_path))
+
+    assert published == [True]
+    assert all("[vi] Open the machine menu" in ''.join(result.lines) for result in results)
+
+    job = PriorityTranslationJob(TranslationPipeline('VI'), lambda texts: texts,
+                                 publish_fn=lambda results, final: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        job.run(make_mods(tmp_path))
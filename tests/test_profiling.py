@@ -0,0 +1,46 @@
+"""Test JobProfiler: các file .prof/.collapsed/.txt của một job"""
+import pstats
+import threading
+import time
+import tracemalloc
+
+from profiling import JobProfiler
+
+
+def busy_translate(seconds):
+    deadline = time.perf_counter() + seconds
+    chunks = []
+    while time.perf_counter() < deadline:
+        chunks.append("x" * 1024)
+    return len(chunks)
+
+
+def test_profile_writes_stats_stacks_and_report(tmp_path, capsys):
+    assert not tracemalloc.is_tracing()
+    with JobProfiler("job1", str(tmp_path), sample_interval=0.001) as profiler:
+        worker = threading.Thread(target=busy_translate, args=(0.1,), name="translate-7")
+        worker.start()
+        busy_translate(0.05)
+        worker.join()
+    assert not tracemalloc.is_tracing()
+    assert "🔬 Profile saved" in capsys.readouterr().out
+
+    paths = {path.name for path in tmp_path.iterdir()}
+    assert paths == {"job1.prof", "job1.collapsed", "job1.txt"}
+
+    stats = pstats.Stats(str(tmp_path / "job1.prof"))
+    assert any(func[2] == 'busy_translate' for func in stats.stats)
+
+    stacks = (tmp_path / "job1.collapsed").read_text(encoding='utf-8').splitlines()
+    assert stacks
+    for line in stacks:
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+    # Số thứ tự của thread bị bỏ để gộp worker cùng loại
+    assert any(line.startswith("translate;") and "busy_translate (test_profiling.py" in line for line in stacks)
+
+    report = (tmp_path / "job1.txt").read_text(encoding='utf-8')
+    assert report.startswith("Profile job1")
+    assert "Top functions (cumulative):" in report
+    assert "Top allocation sites" in report
+    assert profiler.peak_memory > 0
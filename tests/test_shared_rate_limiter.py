@@ -0,0 +1,63 @@
+"""Test SharedRateLimiter: sliding window dùng chung qua nhiều instance/process"""
+import pytest
+
+from google_translate_safe import SafeGoogleTranslateAPI
+from shared_rate_limiter import SharedRateLimiter, close_shared, shared_limiter
+
+
+@pytest.fixture(autouse=True)
+def reset_shared():
+    yield
+    close_shared()
+
+
+def test_limit_is_enforced(tmp_path):
+    limiter = SharedRateLimiter(tmp_path / "limits.db", "google_safe")
+    for expected in (1, 2, 3):
+        wait, counts = limiter.try_acquire([(60, 3)])
+        assert wait == 0
+        assert counts == [expected]
+
+    wait, counts = limiter.try_acquire([(60, 3)])
+    assert 0 < wait <= 60
+    assert counts == [3]
+    limiter.close()
+
+
+def test_tightest_window_decides(tmp_path):
+    limiter = SharedRateLimiter(tmp_path / "limits.db", "google_safe")
+    assert limiter.try_acquire([(60, 5), (3600, 1)])[0] == 0
+    wait, counts = limiter.try_acquire([(60, 5), (3600, 1)])
+    assert wait > 60
+    assert counts == [1, 1]
+    limiter.close()
+
+
+def test_budget_is_shared_across_instances(tmp_path):
+    db_path = tmp_path / "limits.db"
+    first = SharedRateLimiter(db_path, "google_safe")
+    second = SharedRateLimiter(db_path, "google_safe")
+    other = SharedRateLimiter(db_path, "other_provider")
+
+    assert first.try_acquire([(60, 2)])[0] == 0
+    assert second.try_acquire([(60, 2)])[0] == 0
+    assert first.try_acquire([(60, 2)])[0] > 0
+    # Budget khác tên không bị ảnh hưởng
+    assert other.try_acquire([(60, 2)]) == (0.0, [1])
+    assert second.counts((60, 3600)) == [2, 2]
+    for limiter in (first, second, other):
+        limiter.close()
+
+
+def test_shared_limiter_reuses_one_connection(tmp_path):
+    db_path = tmp_path / "limits.db"
+    limiter = shared_limiter(db_path, "google_safe")
+    assert shared_limiter(str(db_path), "google_safe") is limiter
+    assert shared_limiter(db_path, "other_provider") is not limiter
+
+
+def test_safe_translators_share_one_budget(tmp_path):
+    first = SafeGoogleTranslateAPI(cache_dir=str(tmp_path), fuzzy_matching=False)
+    second = SafeGoogleTranslateAPI(cache_dir=str(tmp_path), fuzzy_matching=False)
+    assert first.rate_limiter is second.rate_limiter
+    assert first.rate_limiter.provider == "google_safe"
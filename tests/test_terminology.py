@@ -0,0 +1,42 @@
+"""Test terminology pass: glossary, thuật ngữ học từ cache và engine dùng chung cho job"""
+import terminology
+from terminology import TerminologyEngine
+from translation_pipeline import TranslationPipeline
+
+
+def test_glossary_terms_are_resolved_and_protected():
+    engine = TerminologyEngine({"Iron plate": "Tấm sắt"})
+    result = engine.pretranslate(["iron  plate", "Smelt iron plate into [item=steel-plate]"])
+
+    assert result.resolved == {0: "Tấm sắt"}
+    assert result.pending_texts == ["Smelt __T0__ into [item=steel-plate]"]
+    assert engine.restore("Nấu __T0__", result.replacements[0]) == "Nấu Tấm sắt"
+    assert engine.restore("Nấu", result.replacements[0]) is None
+
+
+def test_cached_terms_are_protected_in_longer_strings():
+    cache = {"Copper cable": "Dây đồng", "Speed": "Tốc độ"}
+    engine = TerminologyEngine(cache_lookup=cache.get)
+    result = engine.pretranslate(["Copper cable", "Speed", "Connects poles with copper cable at high speed"])
+
+    assert result.resolved == {0: "Dây đồng", 1: "Tốc độ"}
+    # Từ đơn không được học: quá phổ biến để thay cố định trong câu
+    assert result.pending_texts == ["Connects poles with __T0__ at high speed"]
+    assert result.replacements == [["Dây đồng"]]
+
+
+def test_pipeline_builds_engine_once_per_job(tmp_path, monkeypatch):
+    glossary = tmp_path / "glossary.txt"
+    glossary.write_text("Iron plate=Tấm sắt\n", encoding='utf-8')
+    reads = []
+    parse = terminology.parse_glossary_file
+    monkeypatch.setattr(terminology, "parse_glossary_file", lambda path: reads.append(path) or parse(path))
+
+    pipeline = TranslationPipeline('vi', str(glossary))
+    first = pipeline.translate_values(["Iron plate", "Gear"], lambda texts: [t.upper() for t in texts])
+    second = pipeline.translate_values(["Iron plate"], lambda texts: texts,
+                                       cache_lookup=lambda text: None)
+
+    assert first == ["Tấm sắt", "GEAR"]
+    assert second == ["Tấm sắt"]
+    assert len(reads) == 1
@@ -0,0 +1,108 @@
+"""Test TranslationCache: hot LRU, SQLite store, migrate JSON cũ và read_only"""
+import json
+import time
+
+from translation_cache import LEGACY_META_KEY, TranslationCache
+
+
+def test_hit_and_miss(tmp_path):
+    cache = TranslationCache(str(tmp_path))
+    cache.load()
+    assert cache.get("Iron plate", "vi") is None
+
+    cache.put("Iron plate", "Tấm sắt", "vi", provider="google")
+    assert cache.get("Iron plate", "vi") == "Tấm sắt"
+    # Khác target language là một entry khác
+    assert cache.get("Iron plate", "ja") is None
+    assert cache.get_many(["Iron plate", "Copper plate"], "vi") == ["Tấm sắt", None]
+
+
+def test_entries_survive_reopen(tmp_path):
+    cache = TranslationCache(str(tmp_path))
+    cache.put("Iron plate", "Tấm sắt", "vi")
+    cache.save()
+    cache.store.close()
+
+    reopened = TranslationCache(str(tmp_path))
+    assert reopened.load() == 1
+    assert reopened.get("Iron plate", "vi") == "Tấm sắt"
+
+
+def test_hot_tier_evicts_least_recently_used(tmp_path):
+    cache = TranslationCache(str(tmp_path), max_hot_entries=2)
+    cache.put("a", "A", "vi")
+    cache.put("b", "B", "vi")
+    cache.get("a", "vi")
+    cache.put("c", "C", "vi")
+
+    assert cache.evicted == 1
+    hot_values = [translation for translation, _ in cache.hot.values()]
+    assert hot_values == ["A", "C"]
+    # Entry bị đẩy khỏi tầng nóng vẫn còn trong store
+    assert cache.get("b", "vi") == "B"
+
+
+def test_expired_and_bad_entries_are_not_returned(tmp_path):
+    cache = TranslationCache(str(tmp_path), ttl_days=1)
+    cache.put_many([("old", "cũ")], "vi", created=time.time() - 2 * 86400)
+    assert cache.get("old", "vi") is None
+
+    cache.put("wrong", "sai", "vi")
+    cache.save()
+    assert cache.mark_bad("wrong", "vi")
+    assert cache.get("wrong", "vi") is None
+    assert cache.compact()['bad'] == 1
+
+
+def test_legacy_json_is_imported_once_and_kept(tmp_path):
+    legacy = tmp_path / "translation_cache.json"
+    key = TranslationCache.make_key("Iron plate", "vi")
+    legacy.write_text(json.dumps({key: "Tấm sắt"}), encoding='utf-8')
+
+    cache = TranslationCache(str(tmp_path))
+    assert cache.load() == 1
+    assert legacy.exists()
+    assert cache.get("Iron plate", "vi") == "Tấm sắt"
+    assert cache.store.get_meta(LEGACY_META_KEY) is not None
+
+    # Lần load sau không import lại và không ghi đè bản dịch mới hơn
+    cache.put("Iron plate", "Tấm thép", "vi")
+    cache.save()
+    cache.store.close()
+    reopened = TranslationCache(str(tmp_path))
+    assert reopened.load() == 1
+    assert reopened.get("Iron plate", "vi") == "Tấm thép"
+
+
+def test_read_only_cache_writes_nothing(tmp_path):
+    cache_dir = tmp_path / "cache"
+    legacy_dir = tmp_path / "legacy"
+    legacy_dir.mkdir()
+    key = TranslationCache.make_key("Iron plate", "vi")
+    (legacy_dir / "translation_cache.json").write_text(json.dumps({key: "Tấm sắt"}), encoding='utf-8')
+
+    cache = TranslationCache(str(cache_dir), read_only=True)
+    assert cache.load() == 0
+    cache.put("Copper plate", "Tấm đồng", "vi")
+    cache.save()
+    assert not cache_dir.exists()
+
+    # File JSON chưa import chỉ được nạp vào memory
+    legacy_cache = TranslationCache(str(legacy_dir), read_only=True)
+    assert legacy_cache.load() == 1
+    assert legacy_cache.get("Iron plate", "vi") == "Tấm sắt"
+    assert sorted(path.name for path in legacy_dir.iterdir()) == ["translation_cache.json"]
+
+
+def test_iter_pairs_is_read_only(tmp_path):
+    cache = TranslationCache(str(tmp_path))
+    cache.put("Iron plate", "Tấm sắt", "vi")
+    cache.save()
+    cache.get("Iron plate", "vi")
+    cache.put("Copper plate", "Tấm đồng", "vi")
+
+    pairs = {(source, translation) for source, translation, *_ in cache.iter_pairs("vi")}
+    assert pairs == {("Iron plate", "Tấm sắt"), ("Copper plate", "Tấm đồng")}
+    # Không flush hit/entry đang chờ xuống store
+    assert cache.pending and cache.pending_hits
+    assert list(cache.iter_pairs("ja")) == []
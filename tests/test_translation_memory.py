@@ -0,0 +1,70 @@
+"""Test import/export translation memory: round-trip JSONL/TMX và độ ưu tiên khi merge"""
+import json
+import zipfile
+
+import pytest
+
+from translation_cache import CacheEntry, TranslationCache
+from translation_memory import TranslationMemoryImporter, export_jsonl, export_tmx, parse_cfg_keys
+
+PAIRS = [("Iron plate", "Tấm sắt"), ("Fast <belt> & splitter", "Băng chuyền \"nhanh\" & bộ chia")]
+
+
+def make_cache(path, pairs=PAIRS):
+    cache = TranslationCache(str(path))
+    cache.load()
+    for source, translation in pairs:
+        cache.put(source, translation, 'vi', provider='google')
+    cache.save()
+    return cache
+
+
+@pytest.mark.parametrize("exporter, suffix", [(export_jsonl, '.jsonl'), (export_tmx, '.tmx')])
+def test_export_import_round_trip(tmp_path, exporter, suffix):
+    tm_file = tmp_path / f"tm_vi{suffix}"
+    assert exporter(make_cache(tmp_path / "source"), str(tm_file), 'vi') == len(PAIRS)
+
+    target = TranslationCache(str(tmp_path / "target"))
+    counts = TranslationMemoryImporter(target, 'vi').collect([str(tm_file)])
+    assert counts['files'] == counts['imported'] == len(PAIRS)
+    for source, translation in PAIRS:
+        assert target.get(source, 'vi') == translation
+    assert sorted(pair[:2] for pair in target.iter_pairs('vi')) == sorted(PAIRS)
+
+
+def test_import_does_not_overwrite_existing_translations(tmp_path):
+    cache = make_cache(tmp_path / "cache", [("Iron plate", "Tấm sắt (đã review)")])
+    # Entry cũ không có text gốc (migrate từ JSON cũ)
+    legacy_key = TranslationCache.make_key("Steel plate", 'vi')
+    cache.store.add_missing([(legacy_key, CacheEntry("Tấm thép"))])
+    cache.store.commit()
+
+    tm_file = tmp_path / "old.jsonl"
+    records = [("Iron plate", "Tấm sắt cũ"), ("Steel plate", "Thép cũ"), ("Gear", "Bánh răng")]
+    tm_file.write_text(''.join(json.dumps({'source': s, 'target': t, 'target_lang': 'vi'}) + '\n'
+                               for s, t in records), encoding='utf-8')
+    TranslationMemoryImporter(cache, 'vi').collect([str(tm_file)])
+
+    assert cache.get("Iron plate", 'vi') == "Tấm sắt (đã review)"
+    assert cache.get("Steel plate", 'vi') == "Tấm thép"
+    assert cache.get("Gear", 'vi') == "Bánh răng"
+    # Entry cũ được bổ sung text gốc để fuzzy TM/export dùng được
+    assert ("Steel plate", "Tấm thép") in {pair[:2] for pair in cache.iter_pairs('vi')}
+
+
+def test_import_pairs_mod_locales(tmp_path):
+    mod = tmp_path / "mod_1.0.0.zip"
+    with zipfile.ZipFile(mod, 'w') as zipf:
+        zipf.writestr("mod/info.json", json.dumps({"name": "mod"}))
+        zipf.writestr("mod/locale/en/mod.cfg", "[item-name]\nplate=Iron plate\nsame=Keep\n")
+        zipf.writestr("mod/locale/vi/mod.cfg", "[item-name]\nplate=Tấm sắt\nsame=Keep\n")
+    cache = TranslationCache(str(tmp_path / "cache"))
+    counts = TranslationMemoryImporter(cache, 'vi').collect([str(mod)])
+
+    assert counts['mods'] == 1
+    assert cache.get("Iron plate", 'vi') == "Tấm sắt"
+    assert cache.get("Keep", 'vi') is None
+
+
+def test_parse_cfg_keys():
+    assert parse_cfg_keys("top=1\n[a]\n; c=x\nk = v \n") == {".top": "1", "a.k": "v"}
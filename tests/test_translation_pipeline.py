@@ -0,0 +1,49 @@
+"""Test job nhiều ngôn ngữ: parse mỗi mod một lần, giữ thứ tự mod, lỗi không lan sang ngôn ngữ khác"""
+import time
+
+from benchmark_translation import build_synthetic_mods
+from translation_pipeline import LanguageStream, ModResult, TranslationPipeline
+
+
+def prefix_translator(lang, delay=0.0, failing=()):
+    def translate(texts):
+        if failing and set(texts) & failing:
+            raise RuntimeError(f"{lang} provider failed")
+        time.sleep(delay)
+        return [f"[{lang}] {text}" for text in texts]
+    return translate
+
+
+def test_run_languages_keeps_order_and_isolates_failures(tmp_path):
+    mods = [str(path) for path in build_synthetic_mods(tmp_path, 3, 20, seed=3)]
+    mod_paths = [mods[0], str(tmp_path / "missing.zip"), mods[1], mods[2]]
+    pipeline = TranslationPipeline('VI')
+    parsed_paths = []
+
+    def parse_once(mod_path):
+        parsed_paths.append(mod_path)
+        return pipeline.parse_mod(mod_path)
+
+    # Provider ja lỗi ở mod thứ hai và chậm hơn vi
+    failing = set(pipeline.parse_mod(mods[1]).values)
+    streams = [
+        LanguageStream('VI', prefix_translator('vi'), output_dir=str(tmp_path / "vi")),
+        LanguageStream('JA', prefix_translator('ja', delay=0.02, failing=failing), output_dir=str(tmp_path / "ja")),
+    ]
+    results = pipeline.run_languages(mod_paths, streams, parse_fn=parse_once)
+
+    assert parsed_paths == mod_paths
+    names = ["bench-synthetic-0", "missing", "bench-synthetic-1", "bench-synthetic-2"]
+    for lang in ('VI', 'JA'):
+        assert [result.name for result in results[lang]] == names
+    assert [result.status for result in results['VI']] == [ModResult.TRANSLATED, ModResult.INVALID,
+                                                           ModResult.TRANSLATED, ModResult.TRANSLATED]
+    assert [result.status for result in results['JA']] == [ModResult.TRANSLATED, ModResult.INVALID,
+                                                           ModResult.INVALID, ModResult.TRANSLATED]
+
+    assert sorted(path.name for path in (tmp_path / "vi").iterdir()) == [
+        "bench-synthetic-0.cfg", "bench-synthetic-1.cfg", "bench-synthetic-2.cfg"]
+    assert sorted(path.name for path in (tmp_path / "ja").iterdir()) == [
+        "bench-synthetic-0.cfg", "bench-synthetic-2.cfg"]
+    assert "[ja] " in (tmp_path / "ja" / "bench-synthetic-2.cfg").read_text(encoding='utf-8')
+    assert "[ja] " not in (tmp_path / "vi" / "bench-synthetic-2.cfg").read_text(encoding='utf-8')
@@ -0,0 +1,72 @@
+"""Test dry-run planner: số request khớp với chunk packer của từng provider"""
+import math
+
+from benchmark_translation import build_synthetic_mods
+from network_utils import DeepLAPI
+from translation_cache import TranslationCache
+from translation_planner import JobPlanner
+
+
+def make_planner(tmp_path, deepl_remaining=1_000_000):
+    # deepl_remaining đặt sẵn để không gọi /usage
+    return JobPlanner('VI', cache_dir=str(tmp_path / "cache"), latency=0.5, deepl_remaining=deepl_remaining,
+                      deepl_api=DeepLAPI('', max_batch_size=7))
+
+
+def count_safe_requests(planner, plans):
+    """Safe Google chỉ gửi các chunk còn ít nhất một text chưa có trong cache"""
+    size = planner.safe.chunk_sizer.size('vi')
+    return sum(1 for plan in plans for chunk in planner.safe.split_text_into_chunks(plan.pending_texts, size)
+               if set(chunk) & set(plan.uncached_texts))
+
+
+def test_request_counts_match_provider_packers(tmp_path):
+    mods = build_synthetic_mods(tmp_path, 3, 40, seed=1)
+    planner = make_planner(tmp_path, deepl_remaining=100)
+    result = planner.plan([str(mod) for mod in mods] + [str(tmp_path / "missing.zip")])
+    plans = result['mods']
+    safe, fast, deepl = result['providers']
+
+    assert len(plans) == 3 and len(result['invalid']) == 1
+    assert all(plan.pending_texts for plan in plans)
+    characters = sum(len(text) for plan in plans for text in plan.pending_texts)
+
+    fast_size = planner.fast.chunk_sizer.size('vi')
+    assert fast.requests == sum(len(planner.fast.split_text_into_chunks(plan.pending_texts, fast_size))
+                                for plan in plans)
+    assert safe.requests == count_safe_requests(planner, plans)
+    assert safe.characters == sum(len(text) for plan in plans for text in plan.uncached_texts)
+    assert deepl.requests == sum(len(planner.deepl.pack_batches(plan.pending_texts)) for plan in plans)
+    assert deepl.requests >= sum(math.ceil(len(plan.pending_texts) / 7) for plan in plans)
+    assert fast.characters == deepl.characters == characters
+    assert deepl.quota_note.startswith("exceeds quota")
+
+    report = JobPlanner.format_report(result)
+    assert "Invalid mods (no info.json): 1" in report
+    assert "Safe Google" in report and "DeepL" in report
+
+
+def test_cached_mod_needs_no_safe_requests(tmp_path):
+    mods = [str(mod) for mod in build_synthetic_mods(tmp_path, 2, 40, seed=5)]
+    before = make_planner(tmp_path).plan(mods)
+
+    # Cache toàn bộ mod đầu tiên rồi plan lại với cache chỉ đọc
+    cache = TranslationCache(str(tmp_path / "cache"))
+    cache.load()
+    for text in before['mods'][0].pending_texts:
+        cache.put(text, f"[vi] {text}", 'vi')
+    cache.save()
+    planner = make_planner(tmp_path)
+    after = planner.plan(mods)
+
+    cached_plan, other_plan = after['mods']
+    assert cached_plan.cached == len(cached_plan.pending_texts)
+    assert cached_plan.uncached_texts == []
+    assert other_plan.uncached_texts
+
+    assert after['providers'][0].requests == count_safe_requests(planner, [other_plan])
+    assert after['providers'][0].requests < before['providers'][0].requests
+    assert after['providers'][0].characters == sum(len(text) for text in other_plan.uncached_texts)
+    # Fast Google và DeepL không dùng cache: vẫn gửi mọi text còn lại sau terminology pass
+    pending_characters = sum(len(text) for plan in after['mods'] for text in plan.pending_texts)
+    assert [p.characters for p in after['providers'][1:]] == [pending_characters] * 2
@@ -0,0 +1,145 @@
+"""Test failover của TranslationRouter và xử lý response sai số dòng của Google"""
+import json
+
+import pytest
+
+from google_translate_core import GoogleTranslateAPI, LineCountMismatch
+from google_translate_safe import SafeGoogleTranslateAPI
+from shared_rate_limiter import close_shared
+from translation_cache import TranslationCache
+from translation_router import (CAPACITY_TTL, GoogleProvider, LocalStubProvider, SafeGoogleProvider,
+                                TranslationProvider, TranslationRouter)
+
+
+class FakeProvider(TranslationProvider):
+    """Provider giả: dịch bằng hàm cho trước, đếm số lần gọi"""
+
+    def __init__(self, name, translate_fn):
+        self.name = name
+        self.translate_fn = translate_fn
+        self.calls = 0
+
+    def translate(self, texts, target_lang, source_lang='en'):
+        self.calls += 1
+        return self.translate_fn(texts)
+
+
+def test_wrong_line_count_fails_over_to_next_provider():
+    broken = FakeProvider("broken", lambda texts: texts[:-1])
+    good = FakeProvider("good", lambda texts: [text.upper() for text in texts])
+    router = TranslationRouter([broken, good], default_latency=0.01)
+
+    texts = [f"item {i}" for i in range(5)]
+    assert router.translate_texts(texts, "vi") == [text.upper() for text in texts]
+    assert good.calls >= 1
+    assert router.stats["broken"].errors >= 1
+
+
+def test_local_stub_is_added_once():
+    good = FakeProvider("good", lambda texts: texts)
+    router = TranslationRouter([good])
+    router.translate_texts(["a"], "vi")
+    router.translate_texts(["b"], "vi")
+
+    stubs = [p for p in router.providers if isinstance(p, LocalStubProvider)]
+    assert len(stubs) == 1
+    assert set(router.stats) == {"good", "local-stub"}
+
+
+def test_results_are_written_to_shared_cache(tmp_path):
+    cache = TranslationCache(str(tmp_path))
+    good = FakeProvider("good", lambda texts: [text.upper() for text in texts])
+    router = TranslationRouter([good], cache=cache)
+    router.translate_texts(["Iron plate", "Copper cable"], "VI")
+
+    assert not cache.pending
+    assert cache.get("Iron plate", "vi") == "IRON PLATE"
+    assert cache.get("Copper cable", "vi") == "COPPER CABLE"
+
+
+def test_fallback_results_are_not_cached(tmp_path):
+    cache = TranslationCache(str(tmp_path))
+    broken = FakeProvider("broken", lambda texts: [])
+    router = TranslationRouter([broken], cache=cache, max_attempts_per_provider=1)
+    assert router.translate_texts(["Iron plate"], "VI") == ["Iron plate"]
+    assert cache.get("Iron plate", "vi") is None
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, text):
+        self.content = json.dumps([[[text, "source"]]]).encode('utf-8')
+
+
+class MergingSession:
+    """Session giả: gộp hai dòng đầu khi nhận nhiều hơn hai dòng"""
+
+    def __init__(self):
+        self.requests = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.requests += 1
+        lines = [line.upper() for line in params['q'].split('\n')]
+        if len(lines) > 2:
+            lines = [lines[0] + ' ' + lines[1]] + lines[2:]
+        return FakeResponse('\n'.join(lines))
+
+
+@pytest.fixture
+def google_api(tmp_path):
+    api = GoogleTranslateAPI(cache_dir=str(tmp_path))
+    api.rate_limit_delay = 0
+    api.session = MergingSession()
+    return api
+
+
+def test_google_line_count_mismatch_raises(google_api):
+    with pytest.raises(LineCountMismatch):
+        google_api.request_chunk(["a", "b", "c"], "vi")
+
+
+def test_google_mismatched_chunk_is_split(google_api):
+    texts = ["a", "b", "c", "d", "e"]
+    assert google_api.translate_chunk(texts, "vi") == ["A", "B", "C", "D", "E"]
+    assert google_api.session.requests > 1
+
+
+def test_fast_google_counts_against_safe_budget(tmp_path, google_api):
+    safe = SafeGoogleTranslateAPI(cache_dir=str(tmp_path / "cache"), fuzzy_matching=False)
+    try:
+        provider = GoogleProvider(google_api, budget=safe)
+        assert provider.translate(["a", "b"], "VI") == ["A", "B"]
+        assert safe.rate_limiter.counts((60,)) == [1]
+
+        safe.max_requests_per_minute = 1
+        provider.refresh_capacity()
+        assert not provider.has_capacity(10)
+    finally:
+        close_shared()
+
+
+def test_capacity_is_read_once_per_ttl(tmp_path):
+    safe = SafeGoogleTranslateAPI(cache_dir=str(tmp_path), fuzzy_matching=False)
+    reads = []
+    counts = safe.rate_limiter.counts
+
+    def counting(windows):
+        reads.append(windows)
+        return counts(windows)
+
+    safe.rate_limiter.counts = counting
+    try:
+        provider = SafeGoogleProvider(safe)
+        for _ in range(100):
+            assert provider.has_capacity(10)
+        assert reads == []
+
+        provider.refresh_capacity()
+        provider.refresh_capacity()
+        assert len(reads) == 1
+        provider.capacity.checked_at -= CAPACITY_TTL
+        provider.refresh_capacity()
+        assert len(reads) == 2
+    finally:
+        close_shared()
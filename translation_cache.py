@@ -0,0 +1,619 @@
+#!/usr/bin/env python3
+"""
+Translation cache hai tầng: hot LRU trong memory + SQLite store trên disk
+
+- Tầng nóng: OrderedDict giới hạn ``max_hot_entries``, key là số nguyên 64-bit
+  (blake2b) thay vì chuỗi hex 32 ký tự, nên RSS của job không phụ thuộc kích
+  thước cache trên disk.
+- Tầng lưu trữ: SQLite (``translation_cache.db``) giữ key md5 như định dạng cũ,
+  kèm metadata provider, thời điểm tạo/dùng, số lần hit và quality flag.
+  Miss được tra theo lô cho cả chunk (``get_many``).
+
+Nhiều process (ví dụ một job VI và một job JA chạy song song) có thể dùng chung
+một cache: SQLite ở chế độ WAL, chờ lock thay vì báo lỗi, và ``save()`` merge
+entry mới vào store (bản mới hơn thắng, số hit được cộng dồn) trong một
+transaction thay vì ghi đè cả file.
+
+Entry quá ``ttl_days`` hoặc bị đánh dấu sai (quality "bad") được coi là miss và
+bị xóa khi compact. File ``translation_cache.json`` cũ (cả định dạng phẳng
+``{md5: translation}`` lẫn version 2) được import tự động sang SQLite: file được
+giữ nguyên (nó nằm trong git), checksum của lần import được ghi vào bảng ``meta``
+trong cùng transaction nên import chỉ chạy lại khi file đổi hoặc lần trước chưa
+commit xong. Chế độ ``read_only`` (dry-run) không ghi gì xuống disk: file cũ
+chưa import chỉ được nạp vào memory.
+Lệnh ``snapshot``/``restore`` ghi/đọc toàn bộ store dạng nhị phân (xem json_codec)
+để chuyển cache giữa các máy.
+"""
+import argparse
+import hashlib
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import json_codec
+from instrumentation import span
+
+QUALITY_OK = 'ok'
+QUALITY_BAD = 'bad'
+
+# Số tham số tối đa mỗi câu SELECT ... IN (...)
+SQLITE_BATCH = 500
+
+# Thời gian chờ lock khi process khác đang ghi (giây)
+SQLITE_TIMEOUT = 30.0
+
+# Key trong bảng meta: checksum của file JSON cũ đã import
+LEGACY_META_KEY = 'legacy_json_md5'
+
+# Cột của mỗi entry trong snapshot nhị phân (thứ tự = tham số CacheEntry sau key)
+SNAPSHOT_VERSION = 1
+SNAPSHOT_COLUMNS = ('key', 'translation', 'provider', 'created', 'hits', 'quality',
+                    'source', 'source_lang', 'target_lang')
+
+
+class CacheEntry:
+    """Một bản dịch trong cache kèm metadata"""
+
+    __slots__ = ('translation', 'provider', 'created', 'hits', 'quality', 'source', 'source_lang', 'target_lang')
+
+    def __init__(self, translation: str, provider: str = 'unknown', created: Optional[float] = None,
+                 hits: int = 0, quality: str = QUALITY_OK, source: Optional[str] = None,
+                 source_lang: Optional[str] = None, target_lang: Optional[str] = None):
+        self.translation = translation
+        self.provider = provider
+        self.created = created if created is not None else time.time()
+        self.hits = hits
+        self.quality = quality
+        # Text gốc và cặp ngôn ngữ (None với entry migrate từ JSON cũ) - cần cho export TM
+        self.source = source
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> 'CacheEntry':
+        return cls(data['t'], data.get('p', 'unknown'), data.get('c'), data.get('h', 0),
+                   data.get('q', QUALITY_OK))
+
+
+class SqliteCacheStore:
+    """Tầng lưu trữ SQLite, key md5 hex"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            translation TEXT NOT NULL,
+            provider TEXT NOT NULL DEFAULT 'unknown',
+            created REAL NOT NULL,
+            used REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            quality TEXT NOT NULL DEFAULT 'ok',
+            source TEXT,
+            source_lang TEXT,
+            target_lang TEXT
+        )
+    """
+
+    META_SCHEMA = "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+
+    # Cột thêm sau version đầu của store, được ALTER TABLE khi mở DB cũ
+    ADDED_COLUMNS = ('source', 'source_lang', 'target_lang')
+
+    def __init__(self, db_path: Path, read_only: bool = False):
+        """
+        Args:
+            db_path: File SQLite
+            read_only: Mở chỉ đọc (không tạo/sửa schema); DB chưa tồn tại thì dùng store rỗng trong memory
+        """
+        self.db_path = db_path
+        self.read_only = read_only
+        if read_only and Path(db_path).exists():
+            self.conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True,
+                                        timeout=SQLITE_TIMEOUT, check_same_thread=False)
+            self.columns = {row[1] for row in self.conn.execute("PRAGMA table_info(entries)")}
+            return
+
+        self.conn = sqlite3.connect(':memory:' if read_only else str(db_path), timeout=SQLITE_TIMEOUT,
+                                    check_same_thread=False)
+        # WAL: reader không chặn writer, commit là atomic kể cả khi process bị kill giữa chừng
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(self.SCHEMA)
+        self.conn.execute(self.META_SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(entries)")}
+        for column in self.ADDED_COLUMNS:
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE entries ADD COLUMN {column} TEXT")
+        self.columns = columns | set(self.ADDED_COLUMNS)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get_meta(self, key: str) -> Optional[str]:
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.OperationalError:
+            return None     # DB cũ mở chỉ đọc, chưa có bảng meta
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[str, float, str]]:
+        """Trả về dict key -> (translation, created, quality) cho các key tồn tại"""
+        found = {}
+        for start in range(0, len(keys), SQLITE_BATCH):
+            batch = keys[start:start + SQLITE_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, translation, created, quality FROM entries WHERE key IN ({placeholders})", batch)
+            for key, translation, created, quality in rows:
+                found[key] = (translation, created, quality)
+        return found
+
+    def put_many(self, entries: Iterable[Tuple[str, CacheEntry]]):
+        """Merge entries vào store: bản dịch mới hơn thắng, hits được cộng dồn"""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT INTO entries (key, translation, provider, created, used, hits, quality, "
+            "source, source_lang, target_lang) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "translation = CASE WHEN excluded.created >= entries.created "
+            "THEN excluded.translation ELSE entries.translation END, "
+            "provider = CASE WHEN excluded.created >= entries.created "
+            "THEN excluded.provider ELSE entries.provider END, "
+            "quality = CASE WHEN excluded.created >= entries.created "
+            "THEN excluded.quality ELSE entries.quality END, "
+            "created = MAX(entries.created, excluded.created), "
+            "used = MAX(entries.used, excluded.used), "
+            "hits = entries.hits + excluded.hits, "
+            "source = COALESCE(excluded.source, entries.source), "
+            "source_lang = COALESCE(excluded.source_lang, entries.source_lang), "
+            "target_lang = COALESCE(excluded.target_lang, entries.target_lang)",
+            [(key, entry.translation, entry.provider, entry.created, now, entry.hits, entry.quality,
+              entry.source, entry.source_lang, entry.target_lang)
+             for key, entry in entries])
+
+    def add_missing(self, entries: Iterable[Tuple[str, CacheEntry]]):
+        """
+        Chỉ thêm các key chưa có trong store (dữ liệu seed như file JSON cũ hay TM import
+        không ghi đè bản dịch đã có); key đã có chỉ được bổ sung text gốc nếu còn thiếu
+        """
+        self.conn.executemany(
+            "INSERT INTO entries (key, translation, provider, created, used, hits, quality, "
+            "source, source_lang, target_lang) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "source = COALESCE(entries.source, excluded.source), "
+            "source_lang = COALESCE(entries.source_lang, excluded.source_lang), "
+            "target_lang = COALESCE(entries.target_lang, excluded.target_lang)",
+            [(key, entry.translation, entry.provider, entry.created, entry.created, entry.hits, entry.quality,
+              entry.source, entry.source_lang, entry.target_lang)
+             for key, entry in entries])
+
+    def iter_pairs(self, target_lang: Optional[str] = None,
+                   limit: Optional[int] = None) -> Iterator[Tuple[str, str, str, str, str]]:
+        """
+        Duyệt (source, translation, source_lang, target_lang, provider) của các entry có text gốc
+
+        Args:
+            target_lang: Chỉ lấy entry của ngôn ngữ này
+            limit: Chỉ lấy N entry dùng gần nhất (mặc định: tất cả, theo thứ tự ngôn ngữ/source)
+        """
+        if 'source' not in self.columns:
+            return iter(())     # DB cũ mở chỉ đọc: chưa có cột source
+        query = ("SELECT source, translation, source_lang, target_lang, provider FROM entries "
+                 "WHERE source IS NOT NULL AND quality = ?")
+        params: List[object] = [QUALITY_OK]
+        if target_lang:
+            query += " AND target_lang = ?"
+            params.append(target_lang)
+        if limit is not None:
+            params.append(limit)
+            return self.conn.execute(query + " ORDER BY used DESC LIMIT ?", params)
+        return self.conn.execute(query + " ORDER BY target_lang, source", params)
+
+    def add_hits(self, hits: Dict[str, int]):
+        now = time.time()
+        self.conn.executemany("UPDATE entries SET hits = hits + ?, used = ? WHERE key = ?",
+                              [(count, now, key) for key, count in hits.items()])
+
+    def set_quality(self, key: str, quality: str) -> bool:
+        cursor = self.conn.execute("UPDATE entries SET quality = ? WHERE key = ?", (quality, key))
+        return cursor.rowcount > 0
+
+    def commit(self):
+        self.conn.commit()
+
+
+class TranslationCache:
+    """Cache bản dịch hai tầng: hot LRU (key 64-bit) trước SQLite store (key md5)"""
+
+    def __init__(self, cache_dir: str = "translation_cache", max_hot_entries: int = 20000,
+                 ttl_days: Optional[float] = 365, db_name: str = "translation_cache.db",
+                 legacy_filename: str = "translation_cache.json", read_only: bool = False):
+        """
+        Args:
+            cache_dir: Thư mục chứa cache
+            max_hot_entries: Số entry tối đa giữ trong memory (LRU)
+            ttl_days: Tuổi tối đa của entry (None = không hết hạn)
+            db_name: Tên file SQLite
+            legacy_filename: File JSON cũ cần migrate
+            read_only: Không ghi gì xuống disk (dry-run): không migrate, save() chỉ giữ entry trong memory
+        """
+        self.cache_dir = Path(cache_dir)
+        self.read_only = read_only
+        if not read_only:
+            self.cache_dir.mkdir(exist_ok=True)
+        self.db_path = self.cache_dir / db_name
+        self.legacy_file = self.cache_dir / legacy_filename
+        self.max_hot_entries = max_hot_entries
+        self.ttl_seconds = ttl_days * 86400 if ttl_days else None
+        self.lock = threading.RLock()
+
+        # hot key -> (translation, md5 digest)
+        self.hot: "OrderedDict[int, Tuple[str, bytes]]" = OrderedDict()
+        self.pending: Dict[str, CacheEntry] = {}   # Entry mới chưa ghi xuống store
+        self.pending_hits: Dict[str, int] = {}
+        self.dirty = 0          # Số thay đổi chưa ghi xuống disk
+        self.evicted = 0
+        self.store: Optional[SqliteCacheStore] = None
+
+    @staticmethod
+    def _combined(text: str, target_lang: str, source_lang: str) -> bytes:
+        return f"{source_lang}->{target_lang}:{text}".encode('utf-8')
+
+    @staticmethod
+    def make_key(text: str, target_lang: str, source_lang: str = 'en') -> str:
+        """Cache key md5 của store (giữ nguyên định dạng cũ để dùng lại cache hiện có)"""
+        return hashlib.md5(TranslationCache._combined(text, target_lang, source_lang)).hexdigest()
+
+    @staticmethod
+    def make_hot_key(text: str, target_lang: str, source_lang: str = 'en') -> int:
+        """Key 64-bit cho tầng nóng"""
+        digest = hashlib.blake2b(TranslationCache._combined(text, target_lang, source_lang), digest_size=8)
+        return int.from_bytes(digest.digest(), 'little')
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self._store().count() + len(self.pending)
+
+    def _store(self) -> SqliteCacheStore:
+        if self.store is None:
+            self.store = SqliteCacheStore(self.db_path, self.read_only)
+        return self.store
+
+    def _is_usable(self, created: float, quality: str, now: float) -> bool:
+        if quality == QUALITY_BAD:
+            return False
+        return self.ttl_seconds is None or now - created <= self.ttl_seconds
+
+    def _remember(self, hot_key: int, translation: str, digest: bytes):
+        self.hot[hot_key] = (translation, digest)
+        self.hot.move_to_end(hot_key)
+        while len(self.hot) > self.max_hot_entries:
+            self.hot.popitem(last=False)
+            self.evicted += 1
+
+    def _record_hit(self, key: str):
+        self.pending_hits[key] = self.pending_hits.get(key, 0) + 1
+
+    def load(self) -> int:
+        """
+        Mở store và migrate file JSON cũ nếu có
+
+        Returns:
+            Số entry trong store
+        """
+        with self.lock:
+            store = self._store()
+            if self.legacy_file.exists():
+                self._migrate_legacy(store)
+            return store.count() + len(self.pending)
+
+    def _legacy_entries(self, data: bytes) -> List[Tuple[str, CacheEntry]]:
+        """Entry của file JSON cũ (định dạng phẳng hoặc version 2)"""
+        data = json_codec.loads(data)
+        if isinstance(data, dict) and 'entries' in data and 'version' in data:
+            return [(key, CacheEntry.from_dict(value)) for key, value in data['entries'].items()]
+        created = self.legacy_file.stat().st_mtime
+        return [(key, CacheEntry(translation, 'legacy', created)) for key, translation in data.items()]
+
+    def _migrate_legacy(self, store: SqliteCacheStore):
+        """
+        Import translation_cache.json vào SQLite, file cũ được giữ nguyên
+
+        Checksum file được ghi vào bảng meta cùng transaction với các entry, nên
+        process chết giữa chừng thì lần sau import lại, còn file không đổi thì bỏ qua.
+        Key đã có trong store không bị ghi đè.
+        """
+        try:
+            data = self.legacy_file.read_bytes()
+        except FileNotFoundError:
+            return
+        checksum = hashlib.md5(data).hexdigest()
+        if store.get_meta(LEGACY_META_KEY) == checksum:
+            return
+
+        entries = self._legacy_entries(data)
+        if store.read_only:
+            # Dry-run: chỉ nạp vào memory, không ghi store
+            for key, entry in entries:
+                self.pending.setdefault(key, entry)
+            return
+
+        if store.conn.in_transaction:
+            store.commit()
+        # BEGIN IMMEDIATE: chỉ một process import khi nhiều job khởi động cùng lúc
+        store.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if store.get_meta(LEGACY_META_KEY) == checksum:
+                store.conn.rollback()
+                return
+            store.add_missing(entries)
+            store.set_meta(LEGACY_META_KEY, checksum)
+            store.commit()
+        except Exception:
+            store.conn.rollback()
+            raise
+        print(f"📦 Imported {len(entries)} cached translations from {self.legacy_file.name} to {self.db_path.name}")
+
+    def save(self):
+        """Merge entry mới và số lần hit vào store trong một transaction (bỏ qua khi read_only)"""
+        if self.read_only:
+            return
+        with self.lock, span("cache_save"):
+            store = self._store()
+            if self.pending:
+                store.put_many(self.pending.items())
+            if self.pending_hits:
+                store.add_hits(self.pending_hits)
+            store.commit()
+            self.pending.clear()
+            self.pending_hits.clear()
+            self.dirty = 0
+
+    def get(self, text: str, target_lang: str, source_lang: str = 'en') -> Optional[str]:
+        """Lấy bản dịch, None nếu không có, hết hạn hoặc bị đánh dấu sai"""
+        return self.get_many([text], target_lang, source_lang)[0]
+
+    def get_many(self, texts: List[str], target_lang: str, source_lang: str = 'en') -> List[Optional[str]]:
+        """
+        Tra cache cho cả chunk: tầng nóng trước, các miss được tra store trong một lần
+
+        Returns:
+            List bản dịch (None nếu miss) theo thứ tự texts
+        """
+        results: List[Optional[str]] = [None] * len(texts)
+        misses: Dict[str, List[Tuple[int, int, bytes]]] = {}
+        with self.lock:
+            for i, text in enumerate(texts):
+                hot_key = self.make_hot_key(text, target_lang, source_lang)
+                hot_entry = self.hot.get(hot_key)
+                if hot_entry is not None:
+                    self.hot.move_to_end(hot_key)
+                    self._record_hit(hot_entry[1].hex())
+                    results[i] = hot_entry[0]
+                    continue
+                digest = hashlib.md5(self._combined(text, target_lang, source_lang)).digest()
+                misses.setdefault(digest.hex(), []).append((i, hot_key, digest))
+
+            if not misses:
+                return results
+
+            now = time.time()
+            found = {}
+            for key in misses:
+                entry = self.pending.get(key)
+                if entry is not None:
+                    found[key] = (entry.translation, entry.created, entry.quality)
+            remaining = [key for key in misses if key not in found]
+            if remaining:
+                found.update(self._store().get_many(remaining))
+
+            for key, (translation, created, quality) in found.items():
+                if not self._is_usable(created, quality, now):
+                    continue
+                for i, hot_key, digest in misses[key]:
+                    results[i] = translation
+                    self._record_hit(key)
+                    self._remember(hot_key, translation, digest)
+        return results
+
+    def put(self, text: str, translation: str, target_lang: str, source_lang: str = 'en',
+            provider: str = 'unknown'):
+        """Thêm/ghi đè bản dịch"""
+        digest = hashlib.md5(self._combined(text, target_lang, source_lang)).digest()
+        with self.lock:
+            self.pending[digest.hex()] = CacheEntry(translation, provider, source=text,
+                                                    source_lang=source_lang, target_lang=target_lang)
+            self._remember(self.make_hot_key(text, target_lang, source_lang), translation, digest)
+            self.dirty += 1
+
+    def put_many(self, pairs: Iterable[Tuple[str, str]], target_lang: str, source_lang: str = 'en',
+                 provider: str = 'unknown', created: Optional[float] = None, overwrite: bool = True) -> int:
+        """
+        Ghi một lô cặp (text, translation) thẳng xuống store trong một transaction,
+        không đi qua tầng nóng (dùng cho import translation memory)
+
+        Args:
+            overwrite: False = độ ưu tiên thấp nhất, không thay bản dịch đã có trong store
+
+        Returns:
+            Số cặp đã ghi
+        """
+        entries = {}
+        for text, translation in pairs:
+            entries[self.make_key(text, target_lang, source_lang)] = CacheEntry(
+                translation, provider, created, source=text, source_lang=source_lang, target_lang=target_lang)
+        with self.lock, span("cache_save"):
+            store = self._store()
+            if overwrite:
+                store.put_many(entries.items())
+            else:
+                store.add_missing(entries.items())
+            store.commit()
+            # Bản trong tầng nóng có thể đã cũ hơn bản vừa import
+            self.hot.clear()
+        return len(entries)
+
+    def iter_pairs(self, target_lang: Optional[str] = None,
+                   limit: Optional[int] = None) -> Iterator[Tuple[str, str, str, str, str]]:
+        """
+        Duyệt (source, translation, source_lang, target_lang, provider) của các entry có text gốc
+
+        Chỉ đọc: entry chưa ghi xuống store được trả về trước, số hit và thời điểm
+        dùng đang chờ không bị flush (việc đó để cho ``save()``), nên dry-run hay
+        fuzzy TM không làm đổi thứ tự LRU mà ``compact --max-entries`` dựa vào.
+
+        Args:
+            target_lang: Chỉ lấy entry của ngôn ngữ này
+            limit: Chỉ lấy thêm tối đa N entry dùng gần nhất từ store
+        """
+        with self.lock:
+            pending = [entry for entry in self.pending.values()
+                       if entry.source is not None and (not target_lang or entry.target_lang == target_lang)]
+            # Bản trong pending mới hơn store (kể cả khi vừa bị đánh dấu sai)
+            shadowed = {(entry.source, entry.source_lang, entry.target_lang) for entry in pending}
+            rows = self._store().iter_pairs(target_lang, limit)
+        for entry in pending:
+            if entry.quality == QUALITY_OK:
+                yield entry.source, entry.translation, entry.source_lang, entry.target_lang, entry.provider
+        for row in rows:
+            if (row[0], row[2], row[3]) not in shadowed:
+                yield row
+
+    def mark_bad(self, text: str, target_lang: str, source_lang: str = 'en') -> bool:
+        """Đánh dấu bản dịch sai: không dùng nữa và bị xóa khi compact"""
+        key = self.make_key(text, target_lang, source_lang)
+        with self.lock:
+            self.hot.pop(self.make_hot_key(text, target_lang, source_lang), None)
+            entry = self.pending.get(key)
+            if entry is not None:
+                entry.quality = QUALITY_BAD
+                return True
+            if self.read_only:
+                return False
+            updated = self._store().set_quality(key, QUALITY_BAD)
+            self._store().commit()
+            return updated
+
+    def export_snapshot(self, path: str) -> int:
+        """
+        Ghi toàn bộ store ra snapshot nhị phân (msgpack hoặc JSON nén, xem json_codec)
+
+        Returns:
+            Số entry đã ghi
+        """
+        self.save()
+        with self.lock:
+            rows = self._store().conn.execute(f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM entries").fetchall()
+        data = {'version': SNAPSHOT_VERSION, 'columns': SNAPSHOT_COLUMNS, 'entries': [list(row) for row in rows]}
+        Path(path).write_bytes(json_codec.dumps_binary(data))
+        return len(rows)
+
+    def import_snapshot(self, path: str) -> int:
+        """
+        Merge snapshot vào store (cùng quy tắc với save: bản mới hơn thắng)
+
+        Returns:
+            Số entry đã đọc
+        """
+        data = json_codec.loads_binary(Path(path).read_bytes())
+        if data.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {data.get('version')}")
+        entries = [(row[0], CacheEntry(*row[1:])) for row in data['entries']]
+        with self.lock:
+            store = self._store()
+            store.put_many(entries)
+            store.commit()
+            self.hot.clear()
+        return len(entries)
+
+    def compact(self, max_entries: Optional[int] = None) -> Dict[str, int]:
+        """
+        Xóa entry hết hạn, entry bị đánh dấu sai và entry ít dùng nhất vượt max_entries,
+        rồi VACUUM file SQLite
+
+        Returns:
+            Dict số entry bị xóa theo lý do và số entry còn lại
+        """
+        self.save()
+        with self.lock:
+            conn = self._store().conn
+            removed = {'bad': conn.execute("DELETE FROM entries WHERE quality = ?", (QUALITY_BAD,)).rowcount}
+            removed['expired'] = 0
+            if self.ttl_seconds is not None:
+                cutoff = time.time() - self.ttl_seconds
+                removed['expired'] = conn.execute("DELETE FROM entries WHERE created < ?", (cutoff,)).rowcount
+            removed['over_cap'] = 0
+            if max_entries is not None:
+                removed['over_cap'] = conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (max_entries,)).rowcount
+            conn.commit()
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.hot.clear()
+            removed['remaining'] = self._store().count()
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        """Thống kê entry theo provider/quality"""
+        self.save()
+        with self.lock:
+            conn = self._store().conn
+            providers = dict(conn.execute("SELECT provider, COUNT(*) FROM entries GROUP BY provider"))
+            bad = conn.execute("SELECT COUNT(*) FROM entries WHERE quality = ?", (QUALITY_BAD,)).fetchone()[0]
+            oldest = conn.execute("SELECT MIN(created) FROM entries").fetchone()[0]
+            total = self._store().count()
+        return {'entries': total, 'bad': bad, 'providers': providers, 'hot': len(self.hot),
+                'oldest_days': round(max(0.0, time.time() - oldest) / 86400, 1) if oldest else 0}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Quản lý translation cache")
+    parser.add_argument('command', choices=['compact', 'stats', 'snapshot', 'restore'])
+    parser.add_argument('--cache-dir', default='translation_cache')
+    parser.add_argument('--snapshot', default='translation_cache.snapshot',
+                        help="File snapshot nhị phân cho lệnh snapshot/restore")
+    parser.add_argument('--ttl-days', type=float, default=365, help="Tuổi tối đa của entry (0 = không hết hạn)")
+    parser.add_argument('--max-entries', type=int, help="Giữ tối đa N entry dùng gần nhất khi compact")
+    args = parser.parse_args(argv)
+
+    cache = TranslationCache(args.cache_dir, ttl_days=args.ttl_days or None)
+    cache.load()
+
+    if args.command == 'compact':
+        before = cache.db_path.stat().st_size
+        removed = cache.compact(args.max_entries)
+        after = cache.db_path.stat().st_size
+        total = removed['remaining'] + removed['expired'] + removed['bad'] + removed['over_cap']
+        print(f"🧹 Compacted {cache.db_path}: {total} -> "
+              f"{removed['remaining']} entries ({removed['expired']} expired, {removed['bad']} bad, "
+              f"{removed['over_cap']} over size cap), {before / 1024:.0f} KiB -> {after / 1024:.0f} KiB")
+    elif args.command == 'snapshot':
+        count = cache.export_snapshot(args.snapshot)
+        size = Path(args.snapshot).stat().st_size
+        print(f"💾 Wrote {count} entries to {args.snapshot} ({size / 1024:.0f} KiB, {json_codec.BACKEND})")
+    elif args.command == 'restore':
+        count = cache.import_snapshot(args.snapshot)
+        print(f"📦 Merged {count} entries from {args.snapshot}")
+    else:
+        stats = cache.stats()
+        print(f"📦 {stats['entries']} entries, {stats['bad']} flagged bad, oldest {stats['oldest_days']} days")
+        for provider, count in sorted(stats['providers'].items(), key=lambda item: -item[1]):
+            print(f"  • {provider}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Import/export translation memory cho translation cache
+
+Import: ghép từng key của ``locale/en/*.cfg`` với ``locale/<lang>/*.cfg`` theo
+``[section] key`` rồi nạp cả lô cặp (English, bản dịch) vào cache. Nguồn có thể là:
+    - mod zip/thư mục có sẵn cả locale/en lẫn locale/<lang>
+    - language pack (zip hoặc thư mục như ``Code mau/...``) chứa
+      ``locale/<lang>/<mod_name>.cfg``; phần English lấy từ mod zip cùng tên
+      được truyền trong cùng lệnh
+    - file ``.jsonl`` / ``.tmx`` đã export từ máy khác
+
+Export: ghi các entry có text gốc ra JSONL hoặc TMX 1.4.
+
+Bản dịch import có độ ưu tiên thấp nhất: TM cũ không ghi đè bản dịch máy hay
+bản đã review đang có trong cache, chỉ lấp các key còn thiếu.
+
+Ví dụ:
+    python translation_memory.py import --lang vi mods/*.zip "Code mau/Auto_Translate_Mod_Langue_Vietnamese_1.0.1"
+    python translation_memory.py export --format tmx tm_vi.tmx --lang vi
+"""
+import argparse
+import re
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+import json_codec
+from file_utils import ModFileProcessor
+from translation_cache import TranslationCache
+
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+
+def parse_cfg_keys(content: str) -> Dict[str, str]:
+    """
+    Parse nội dung .cfg thành dict ``section.key`` -> value
+
+    Key nằm ngoài section nào dùng section rỗng (``.key``).
+    """
+    values = {}
+    section = ''
+    for line in content.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('[') and stripped.endswith(']'):
+            section = stripped[1:-1].strip()
+        elif '=' in stripped and not stripped.startswith((';', '#')):
+            key, value = stripped.split('=', 1)
+            values[f"{section}.{key.strip()}"] = value.strip()
+    return values
+
+
+def pair_values(english: Dict[str, str], translated: Dict[str, str]) -> List[Tuple[str, str]]:
+    """Ghép theo key, bỏ cặp rỗng hoặc chưa được dịch (giống hệt bản gốc)"""
+    pairs = []
+    for key, source in english.items():
+        target = translated.get(key)
+        if source and target and target != source:
+            pairs.append((source, target))
+    return pairs
+
+
+class LocaleSource:
+    """Đọc các file locale/<lang>/*.cfg từ một mod zip hoặc thư mục"""
+
+    def __init__(self, path: str, processor: ModFileProcessor):
+        self.path = Path(path)
+        self.processor = processor
+        if self.path.is_dir():
+            self.names = [p.relative_to(self.path).as_posix() for p in self.path.rglob('*.cfg')]
+        else:
+            with processor.zip_handler.open_zip(str(self.path)) as zipf:
+                self.names = zipf.namelist()
+
+    def locale_files(self, lang: str) -> List[str]:
+        pattern = re.compile(rf"(^|/)locale/{re.escape(lang)}/[^/]+\.cfg$")
+        return [name for name in self.names if pattern.search(name)]
+
+    def read(self, name: str) -> str:
+        if self.path.is_dir():
+            return (self.path / name).read_text(encoding='utf-8-sig', errors='replace')
+        return self.processor.zip_handler.read_text_from_zip(str(self.path), name)
+
+    def read_keys(self, lang: str) -> Dict[str, str]:
+        """Gộp tất cả locale/<lang>/*.cfg thành một dict section.key -> value"""
+        values = {}
+        for name in self.locale_files(lang):
+            values.update(parse_cfg_keys(self.read(name)))
+        return values
+
+    def mod_name(self) -> Optional[str]:
+        if self.path.is_dir():
+            info_file = self.path / 'info.json'
+            if info_file.exists():
+                return json_codec.load_file(info_file).get('name')
+            return None
+        info = self.processor.find_mod_info(str(self.path))
+        return info.get('name') if info else None
+
+
+class TranslationMemoryImporter:
+    """Gom các cặp English -> bản dịch từ mod/pack/TM file và nạp vào cache theo lô"""
+
+    def __init__(self, cache: TranslationCache, lang: str, cache_lang: Optional[str] = None):
+        """
+        Args:
+            cache: TranslationCache đích
+            lang: Thư mục locale của bản dịch (vi, ja, zh-CN...)
+            cache_lang: Language code dùng trong cache key (mặc định suy ra từ lang)
+        """
+        self.cache = cache
+        self.lang = lang
+        self.cache_lang = cache_lang or lang.split('-')[0].lower()
+        self.processor = ModFileProcessor()
+
+    def collect(self, paths: List[str]) -> Dict[str, int]:
+        """
+        Đọc tất cả nguồn và ghi các cặp vào cache trong một transaction
+
+        Returns:
+            Dict số cặp theo nguồn ('mods', 'packs', 'files') và 'imported'
+        """
+        pairs: List[Tuple[str, str]] = []
+        counts = {'mods': 0, 'packs': 0, 'files': 0}
+        english_by_mod: Dict[str, Dict[str, str]] = {}
+        packs: List[LocaleSource] = []
+
+        for path in paths:
+            suffix = Path(path).suffix.lower()
+            if suffix == '.jsonl':
+                file_pairs = list(self.read_jsonl(path))
+                counts['files'] += len(file_pairs)
+                pairs.extend(file_pairs)
+                continue
+            if suffix == '.tmx':
+                file_pairs = list(self.read_tmx(path))
+                counts['files'] += len(file_pairs)
+                pairs.extend(file_pairs)
+                continue
+
+            try:
+                source = LocaleSource(path, self.processor)
+            except Exception as e:
+                print(f"⚠️ Skipping {path}: {e}")
+                continue
+
+            english = source.read_keys('en')
+            if english:
+                name = source.mod_name() or Path(path).stem
+                english_by_mod[name] = english
+                mod_pairs = pair_values(english, source.read_keys(self.lang))
+                counts['mods'] += len(mod_pairs)
+                pairs.extend(mod_pairs)
+            elif source.locale_files(self.lang):
+                packs.append(source)
+
+        # Language pack: mỗi locale/<lang>/<mod_name>.cfg ghép với English của mod cùng tên
+        for pack in packs:
+            for name in pack.locale_files(self.lang):
+                english = english_by_mod.get(Path(name).stem)
+                if english is None:
+                    continue
+                pack_pairs = pair_values(english, parse_cfg_keys(pack.read(name)))
+                counts['packs'] += len(pack_pairs)
+                pairs.extend(pack_pairs)
+
+        counts['imported'] = self.cache.put_many(pairs, self.cache_lang, provider='tm_import', overwrite=False)
+        return counts
+
+    def read_jsonl(self, path: str) -> Iterator[Tuple[str, str]]:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json_codec.loads(line)
+                if record.get('target_lang', self.cache_lang) == self.cache_lang:
+                    yield record['source'], record['target']
+
+    def read_tmx(self, path: str) -> Iterator[Tuple[str, str]]:
+        for _, element in ET.iterparse(path):
+            if element.tag != 'tu':
+                continue
+            segments = {}
+            for tuv in element.iter('tuv'):
+                seg = tuv.find('seg')
+                lang = (tuv.get(XML_LANG) or tuv.get('lang') or '').split('-')[0].lower()
+                if seg is not None:
+                    segments[lang] = ''.join(seg.itertext())
+            if segments.get('en') and segments.get(self.cache_lang):
+                yield segments['en'], segments[self.cache_lang]
+            element.clear()
+
+
+def export_jsonl(cache: TranslationCache, output_path: str, target_lang: Optional[str] = None) -> int:
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for source, translation, source_lang, lang, provider in cache.iter_pairs(target_lang):
+            f.write(json_codec.dumps({'source': source, 'target': translation, 'source_lang': source_lang,
+                                      'target_lang': lang, 'provider': provider}) + '\n')
+            count += 1
+    return count
+
+
+def export_tmx(cache: TranslationCache, output_path: str, target_lang: Optional[str] = None) -> int:
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<tmx version="1.4">\n')
+        f.write('  <header creationtool="Auto_Translate_Mod_Langue" creationtoolversion="1.0" '
+                'datatype="plaintext" segtype="sentence" adminlang="en" srclang="en" o-tmf="sqlite"/>\n')
+        f.write('  <body>\n')
+        for source, translation, source_lang, lang, provider in cache.iter_pairs(target_lang):
+            f.write(f'    <tu creationid={quoteattr(provider)}>\n'
+                    f'      <tuv xml:lang={quoteattr(source_lang)}><seg>{escape(source)}</seg></tuv>\n'
+                    f'      <tuv xml:lang={quoteattr(lang)}><seg>{escape(translation)}</seg></tuv>\n'
+                    f'    </tu>\n')
+            count += 1
+        f.write('  </body>\n</tmx>\n')
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import/export translation memory cho translation cache")
+    parser.add_argument('--cache-dir', default='translation_cache')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Nạp bản dịch có sẵn từ mod zip, language pack, .jsonl, .tmx")
+    import_parser.add_argument('paths', nargs='+')
+    import_parser.add_argument('--lang', required=True, help="Thư mục locale của bản dịch (vi, ja...)")
+    import_parser.add_argument('--cache-lang', help="Language code trong cache key (mặc định theo --lang)")
+
+    export_parser = subparsers.add_parser('export', help="Ghi translation memory ra file")
+    export_parser.add_argument('output')
+    export_parser.add_argument('--format', choices=['jsonl', 'tmx'], help="Mặc định theo đuôi file")
+    export_parser.add_argument('--lang', help="Chỉ export một target language")
+    args = parser.parse_args(argv)
+
+    cache = TranslationCache(args.cache_dir)
+    cache.load()
+
+    if args.command == 'import':
+        importer = TranslationMemoryImporter(cache, args.lang, args.cache_lang)
+        counts = importer.collect(args.paths)
+        print(f"📥 Imported {counts['imported']} translations into {cache.db_path} "
+              f"({counts['mods']} from mods, {counts['packs']} from language packs, {counts['files']} from TM files)")
+    else:
+        fmt = args.format or ('tmx' if args.output.lower().endswith('.tmx') else 'jsonl')
+        exporter = export_tmx if fmt == 'tmx' else export_jsonl
+        count = exporter(cache, args.output, args.lang)
+        print(f"📤 Exported {count} translations to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
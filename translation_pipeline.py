@@ -0,0 +1,384 @@
+"""
+Translation pipeline không phụ thuộc GUI
+
+Các bước xử lý một mod: đọc zip -> parse locale/en/*.cfg -> lọc nội dung
+tiếng Anh -> pre-translate thuật ngữ -> dịch -> ghép lại file .cfg.
+Dùng chung cho GUI, benchmark và các công cụ dòng lệnh.
+
+Job nhiều ngôn ngữ (``run_languages``) parse mỗi mod một lần rồi đưa kết quả
+cho một luồng dịch riêng cho mỗi target language chạy song song.
+"""
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from file_utils import ModFileProcessor
+from instrumentation import mod_context, span
+from locale_table import LocaleTable
+from output_sinks import OutputSink, as_sink
+import metrics
+from terminology import TerminologyEngine
+
+
+# Các từ tiếng Anh thông dụng trong Factorio
+ENGLISH_INDICATORS = [
+    'the', 'and', 'for', 'with', 'from', 'this', 'that', 'can', 'will', 'are', 'is',
+    'iron', 'copper', 'steel', 'plate', 'gear', 'wire', 'engine', 'motor', 'belt',
+    'inserter', 'assembling', 'machine', 'furnace', 'drill', 'mining', 'electric',
+    'steam', 'boiler', 'generator', 'solar', 'panel', 'accumulator', 'lab',
+    'science', 'pack', 'research', 'technology', 'recipe', 'item', 'entity'
+]
+
+# Các ký tự ngôn ngữ khác
+NON_ENGLISH_CHARS = ['č', 'ř', 'ě', 'š', 'ž', 'ä', 'ö', 'ü', 'ß', 'à', 'â', 'ç', 'è', 'é', 'ê', 'ë', 'ñ']
+
+
+def is_english_content(values: List[str]) -> bool:
+    """
+    Kiểm tra nội dung có thực sự là tiếng Anh không
+    Sử dụng thuật toán đơn giản: kiểm tra các từ thông dụng tiếng Anh
+
+    Args:
+        values: Các value của file locale
+    """
+    if not values:
+        return False
+
+    english_score = 0
+    non_english_score = 0
+
+    for value in values:
+        value = value.strip().lower()
+        if len(value) < 2:
+            continue
+
+        # Kiểm tra các từ tiếng Anh
+        for indicator in ENGLISH_INDICATORS:
+            if indicator in value:
+                english_score += 1
+                break
+
+        # Kiểm tra các ký tự không phải tiếng Anh
+        for char in NON_ENGLISH_CHARS:
+            if char in value:
+                non_english_score += 2
+                break
+
+    english_ratio = english_score / max(len(values), 1)
+    non_english_ratio = non_english_score / max(len(values), 1)
+
+    # Ít nhất 30% các entry có từ tiếng Anh và không quá 20% các entry có ký tự không phải tiếng Anh
+    return english_ratio >= 0.3 and non_english_ratio <= 0.2
+
+
+class ParsedMod:
+    """Nội dung locale tiếng Anh đã parse của một mod"""
+
+    def __init__(self, name: str, path: str, info: Dict[str, Any]):
+        self.name = name
+        self.path = path
+        self.info = info
+        # Một LocaleTable cho mỗi file locale/en/*.cfg được giữ lại
+        self.file_entries: List[LocaleTable] = []
+        self.skipped_files: List[str] = []
+
+    @property
+    def values(self) -> List[str]:
+        return [value for table in self.file_entries for value in table.values]
+
+
+class ModResult:
+    """Kết quả xử lý một mod"""
+
+    TRANSLATED = 'translated'
+    SKIPPED = 'skipped'        # Không có locale/en/*.cfg
+    NO_LANG = 'no_lang'        # Có file nhưng không có nội dung tiếng Anh
+    INVALID = 'invalid'        # Không có info.json
+
+    def __init__(self, name: str, status: str, lines: Optional[List[str]] = None,
+                 entry_count: int = 0):
+        self.name = name
+        self.status = status
+        self.lines = lines or []
+        self.entry_count = entry_count
+
+
+class LanguageStream:
+    """Một target language trong job nhiều ngôn ngữ, với translator (và limiter) riêng"""
+
+    def __init__(self, target_lang: str, translate_fn: Callable[[List[str]], List[str]],
+                 output_dir: Optional[Union[str, OutputSink]] = None, glossary_path: Optional[str] = None,
+                 cache_lookup: Optional[Callable[[str], Optional[str]]] = None,
+                 invalidate_fn: Optional[Callable[[str], Any]] = None):
+        """
+        Args:
+            target_lang: Target language code (VI, JA, etc.)
+            translate_fn: Hàm dịch một list texts sang target_lang
+            output_dir: Thư mục hoặc OutputSink để ghi <mod_name>.cfg (None = không ghi)
+            glossary_path: Glossary của ngôn ngữ này cho terminology pass
+            cache_lookup: Optional cache lookup cho terminology pass
+            invalidate_fn: Optional hàm đánh dấu bản dịch cache bị sai
+        """
+        self.target_lang = target_lang
+        self.translate_fn = translate_fn
+        self.output_dir = output_dir
+        self.glossary_path = glossary_path
+        self.cache_lookup = cache_lookup
+        self.invalidate_fn = invalidate_fn
+
+
+class TranslationPipeline:
+    """Pipeline dịch locale cho từng mod"""
+
+    def __init__(self, target_lang: str, glossary_path: Optional[str] = None,
+                 english_only: bool = True):
+        """
+        Args:
+            target_lang: Target language code (VI, JA, etc.)
+            glossary_path: Optional glossary file cho terminology pass
+            english_only: Bỏ qua file không phải tiếng Anh (is_english_content)
+        """
+        self.target_lang = target_lang
+        self.glossary_path = glossary_path
+        self.english_only = english_only
+        self.processor = ModFileProcessor()
+        # TerminologyEngine của job (pipeline dịch một target language): glossary
+        # chỉ được đọc và automaton chỉ được build một lần cho mọi mod
+        self.engine: Optional[TerminologyEngine] = None
+        self.engine_lock = threading.Lock()
+
+    def terminology_engine(self, cache_lookup: Optional[Callable[[str], Optional[str]]] = None) -> TerminologyEngine:
+        """
+        Engine dùng chung cho mọi mod của job, gắn cache lookup của lần gọi hiện tại
+
+        Thuật ngữ học từ cache ở mod trước vẫn được giữ (cùng target language).
+        """
+        with self.engine_lock:
+            if self.engine is None:
+                self.engine = TerminologyEngine.from_glossary(self.glossary_path)
+            self.engine.cache_lookup = cache_lookup
+            return self.engine
+
+    def parse_mod(self, mod_path: str) -> Optional[ParsedMod]:
+        """
+        Đọc info.json và parse các file locale/en/*.cfg của mod
+
+        Args:
+            mod_path: Path to mod zip file
+
+        Returns:
+            ParsedMod, hoặc None nếu zip không có info.json
+        """
+        info = self.processor.find_mod_info(mod_path)
+        if info is None:
+            return None
+
+        parsed = ParsedMod(info.get("name", "unknown_mod"), mod_path, info)
+        for locale_file, _ in self.processor.find_locale_files(mod_path):
+            table = self.processor.read_locale_table(mod_path, locale_file)
+
+            # Lọc chỉ nội dung tiếng Anh thực sự
+            if not self.english_only or is_english_content(table.values):
+                parsed.file_entries.append(table)
+                print(f"    ✅ Processed {len(table)} English entries from {os.path.basename(locale_file)}")
+            else:
+                parsed.skipped_files.append(locale_file)
+                print(f"    ⚪ Skipped {os.path.basename(locale_file)} - not English content")
+
+        return parsed
+
+    def translate_values(self, values: List[str], translate_fn: Callable[[List[str]], List[str]],
+                         cache_lookup: Optional[Callable[[str], Optional[str]]] = None,
+                         invalidate_fn: Optional[Callable[[str], Any]] = None) -> List[str]:
+        """
+        Dịch offline thuật ngữ từ glossary/cache trước khi chia chunk,
+        chỉ gửi phần còn lại cho translate_fn
+
+        Args:
+            values: Source texts
+            translate_fn: Hàm dịch một list texts
+            cache_lookup: Optional cache lookup cho terminology pass
+            invalidate_fn: Optional hàm đánh dấu bản dịch cache bị sai (mất placeholder)
+
+        Returns:
+            List of translated strings
+        """
+        with span("terminology"):
+            engine = self.terminology_engine(cache_lookup)
+            pretranslated = engine.pretranslate(values)
+        print(f"    📖 Terminology: {pretranslated.resolved_count}/{len(values)} entries resolved offline")
+
+        translated_pending = translate_fn(pretranslated.pending_texts) if pretranslated.pending_texts else []
+        translations, failed = engine.merge(pretranslated, values, translated_pending)
+
+        # Provider làm mất placeholder: dịch lại bản gốc không mask
+        if failed:
+            print(f"    🔁 Retranslating {len(failed)} entries without term placeholders")
+            if invalidate_fn:
+                masked_texts = dict(zip(pretranslated.pending_indices, pretranslated.pending_texts))
+                for i in failed:
+                    invalidate_fn(masked_texts[i])
+            for i, translation in zip(failed, translate_fn([values[i] for i in failed])):
+                translations[i] = translation
+
+        metrics.record_strings(len(values))
+        return translations
+
+    @staticmethod
+    def reconstruct(parsed: ParsedMod, translated_values: List[str]) -> List[str]:
+        """
+        Ghép các bản dịch vào nội dung gốc, gộp thành một file cfg cho mod
+
+        Returns:
+            Các đoạn text liên tiếp của file (dùng với writelines/join), đoạn không
+            đổi giữa hai entry là slice của buffer nguồn thay vì từng dòng riêng
+        """
+        with span("reconstruct"):
+            merged = []
+            offset = 0
+            for table in parsed.file_entries:
+                merged.extend(table.iter_output(translated_values[offset:offset + len(table)]))
+                offset += len(table)
+        return merged
+
+    def process_mod(self, mod_path: str, translate_fn: Callable[[List[str]], List[str]],
+                    cache_lookup: Optional[Callable[[str], Optional[str]]] = None) -> ModResult:
+        """
+        Chạy toàn bộ pipeline cho một mod
+
+        Args:
+            mod_path: Path to mod zip file
+            translate_fn: Hàm dịch một list texts
+            cache_lookup: Optional cache lookup cho terminology pass
+
+        Returns:
+            ModResult
+        """
+        parsed = self.parse_mod(mod_path)
+        if parsed is None:
+            return ModResult(Path(mod_path).stem, ModResult.INVALID)
+        return self.translate_parsed(parsed, translate_fn, cache_lookup)
+
+    def translate_parsed(self, parsed: ParsedMod, translate_fn: Callable[[List[str]], List[str]],
+                         cache_lookup: Optional[Callable[[str], Optional[str]]] = None,
+                         invalidate_fn: Optional[Callable[[str], Any]] = None) -> ModResult:
+        """Dịch và ghép lại một mod đã parse"""
+        if not parsed.file_entries and not parsed.skipped_files:
+            print(f"Warning: {parsed.name} has no English locale *.cfg files, skipping...")
+            return ModResult(parsed.name, ModResult.SKIPPED)
+
+        values = parsed.values
+        if not values:
+            return ModResult(parsed.name, ModResult.NO_LANG)
+
+        translated_values = self.translate_values(values, translate_fn, cache_lookup, invalidate_fn)
+        return ModResult(parsed.name, ModResult.TRANSLATED,
+                         self.reconstruct(parsed, translated_values), len(values))
+
+    def write_mod_cfg(self, result: ModResult, output: Union[str, OutputSink]) -> str:
+        """
+        Ghi file cfg đã dịch thành <mod_name>.cfg
+
+        Args:
+            result: Kết quả dịch của mod
+            output: Thư mục hoặc OutputSink (zip đang mở, memory...)
+
+        Returns:
+            Tên file đã ghi trong sink
+        """
+        name = f"{result.name}.cfg"
+        as_sink(output).write_text(name, result.lines)
+        return name
+
+    def run(self, mod_paths: List[str], translate_fn: Callable[[List[str]], List[str]],
+            output_dir: Optional[Union[str, OutputSink]] = None,
+            cache_lookup: Optional[Callable[[str], Optional[str]]] = None) -> List[ModResult]:
+        """
+        Chạy pipeline cho nhiều mod, ghi kết quả vào output_dir (thư mục hoặc
+        OutputSink) ngay khi từng mod dịch xong
+
+        Returns:
+            List of ModResult theo thứ tự mod_paths
+        """
+        results = []
+        metrics.start_job()
+        for mod_path in mod_paths:
+            with mod_context(Path(mod_path).stem):
+                try:
+                    result = self.process_mod(mod_path, translate_fn, cache_lookup)
+                except Exception as e:
+                    logging.error(f"Failed to translate {mod_path}: {e}")
+                    result = ModResult(Path(mod_path).stem, ModResult.INVALID)
+
+                if output_dir and result.status == ModResult.TRANSLATED:
+                    self.write_mod_cfg(result, output_dir)
+            results.append(result)
+        return results
+
+    def run_languages(self, mod_paths: List[str], streams: List[LanguageStream],
+                      parse_fn: Optional[Callable[[str], Optional[ParsedMod]]] = None) -> Dict[str, List[ModResult]]:
+        """
+        Chạy một job cho nhiều target language: đọc zip, parse và lọc English
+        mỗi mod đúng một lần, rồi dịch song song mỗi ngôn ngữ trên một thread riêng
+
+        Thread parse chạy trước các luồng dịch (mỗi luồng có queue riêng) nên
+        ngôn ngữ chậm không chặn ngôn ngữ nhanh.
+
+        Args:
+            mod_paths: Các mod zip theo thứ tự dịch
+            streams: Một LanguageStream cho mỗi target language
+            parse_fn: Optional hàm parse thay cho parse_mod (vd. ModScheduler.parse_mod đã parse sẵn)
+
+        Returns:
+            Dict target_lang -> List of ModResult theo thứ tự mod_paths
+        """
+        parse_fn = parse_fn or self.parse_mod
+        results: Dict[str, List[ModResult]] = {stream.target_lang: [] for stream in streams}
+        queues: Dict[str, "queue.Queue"] = {stream.target_lang: queue.Queue() for stream in streams}
+        metrics.start_job()
+
+        def worker(stream: LanguageStream):
+            pipeline = TranslationPipeline(stream.target_lang, stream.glossary_path, self.english_only)
+            while True:
+                item = queues[stream.target_lang].get()
+                if item is None:
+                    break
+                if isinstance(item, ModResult):
+                    results[stream.target_lang].append(item)
+                    continue
+                with mod_context(item.name):
+                    try:
+                        result = pipeline.translate_parsed(item, stream.translate_fn, stream.cache_lookup,
+                                                           stream.invalidate_fn)
+                    except Exception as e:
+                        logging.error(f"Failed to translate {item.path} to {stream.target_lang}: {e}")
+                        result = ModResult(item.name, ModResult.INVALID)
+                    if stream.output_dir and result.status == ModResult.TRANSLATED:
+                        pipeline.write_mod_cfg(result, stream.output_dir)
+                results[stream.target_lang].append(result)
+
+        threads = [threading.Thread(target=worker, args=(stream,), name=f"lang-{stream.target_lang}", daemon=True)
+                   for stream in streams]
+        for thread in threads:
+            thread.start()
+
+        for mod_path in mod_paths:
+            with mod_context(Path(mod_path).stem):
+                try:
+                    item = parse_fn(mod_path)
+                except Exception as e:
+                    logging.error(f"Failed to parse {mod_path}: {e}")
+                    item = None
+            if item is None:
+                item = ModResult(Path(mod_path).stem, ModResult.INVALID)
+            for stream_queue in queues.values():
+                stream_queue.put(item)
+
+        for stream_queue in queues.values():
+            stream_queue.put(None)
+        for thread in threads:
+            thread.join()
+        return results
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Dry-run planner: ước lượng chi phí một job dịch trước khi chạy
+
+Chỉ dùng dữ liệu local: parse các mod, chạy terminology pass, tra cache dịch
+và chạy đúng chunk packer của từng provider để tính số request, số ký tự,
+quota DeepL sẽ dùng và thời gian ước lượng theo rate limiter đã cấu hình.
+Cache được mở chỉ đọc: dry-run không migrate, không ghi hit/LRU và không mở
+rate_limits.db. Quota DeepL đọc từ /usage khi có API key.
+"""
+import argparse
+import contextlib
+import io
+import math
+import sys
+from typing import Dict, List, Optional
+
+from google_translate_core import GoogleTranslateAPI
+from google_translate_safe import SafeGoogleTranslateAPI
+from network_utils import DeepLAPI
+from parameter_masking import mask_slots
+from translation_pipeline import TranslationPipeline
+
+
+class ModPlan:
+    """Số liệu dry-run của một mod"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.strings = 0
+        self.characters = 0
+        self.terminology_resolved = 0
+        self.cached = 0
+        self.pending_texts: List[str] = []      # Texts cần gửi provider (đã mask thuật ngữ)
+        self.uncached_texts: List[str] = []     # Phần chưa có trong cache
+
+
+class ProviderEstimate:
+    """Ước lượng cho một provider"""
+
+    def __init__(self, name: str, requests: int, characters: int, seconds: float,
+                 quota_note: str = ''):
+        self.name = name
+        self.requests = requests
+        self.characters = characters
+        self.seconds = seconds
+        self.quota_note = quota_note
+
+
+def format_duration(seconds: float) -> str:
+    """Định dạng thời gian dạng 1h 05m / 3m 20s / 12s"""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class JobPlanner:
+    """Ước lượng requests/ký tự/thời gian cho một job dịch mà không gọi API"""
+
+    def __init__(self, target_lang: str, glossary_path: Optional[str] = None,
+                 english_only: bool = True, cache_dir: str = "translation_cache",
+                 latency: float = 0.6, deepl_concurrency: int = 4,
+                 deepl_remaining: Optional[int] = None, deepl_api: Optional[DeepLAPI] = None):
+        """
+        Args:
+            target_lang: Target language code (VI, JA, etc.)
+            glossary_path: Optional glossary file cho terminology pass
+            english_only: Bỏ qua file không phải tiếng Anh
+            cache_dir: Thư mục translation cache
+            latency: Latency giả định cho mỗi request (giây)
+            deepl_concurrency: Số batch DeepL gửi đồng thời
+            deepl_remaining: Số ký tự DeepL còn lại (None = đọc từ deepl_api nếu có, ngược lại không rõ)
+            deepl_api: Optional DeepL client có API key để lấy quota còn lại từ /usage
+        """
+        self.pipeline = TranslationPipeline(target_lang, glossary_path, english_only)
+        self.latency = latency
+        self.deepl_concurrency = max(1, deepl_concurrency)
+        if deepl_remaining is None and deepl_api is not None:
+            deepl_remaining = deepl_api.get_remaining_characters()
+        self.deepl_remaining = deepl_remaining
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.safe = SafeGoogleTranslateAPI(cache_dir, read_only=True)
+        self.fast = GoogleTranslateAPI(cache_dir)
+        self.deepl = deepl_api or DeepLAPI('', max_concurrency=self.deepl_concurrency)
+        self.target_code = self.safe.get_language_code(target_lang)
+
+    def plan_mod(self, mod_path: str) -> Optional[ModPlan]:
+        """Parse một mod và phân loại strings: thuật ngữ offline / cache / cần dịch"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            parsed = self.pipeline.parse_mod(mod_path)
+        if parsed is None:
+            return None
+
+        plan = ModPlan(parsed.name)
+        values = parsed.values
+        plan.strings = len(values)
+        plan.characters = sum(len(value) for value in values)
+        if not values:
+            return plan
+
+        cache_lookup = lambda text: self.safe.get_cached_translation(text, self.target_code)
+        engine = self.pipeline.terminology_engine(cache_lookup)
+        pretranslated = engine.pretranslate(values)
+        plan.terminology_resolved = pretranslated.resolved_count
+        plan.pending_texts = pretranslated.pending_texts
+
+        cached = self.safe.cache.get_many(plan.pending_texts, self.target_code)
+        # Giống Safe Google: text chưa có được tra theo template đã mask số/tham số
+        templates = [mask_slots(text)[0] for text in plan.pending_texts]
+        cached_templates = self.safe.cache.get_many(templates, self.target_code)
+        queued_templates = set()
+        for text, template, translation, template_translation in zip(plan.pending_texts, templates, cached,
+                                                                     cached_templates):
+            if translation is None:
+                translation = template_translation
+            if translation is None and self.safe.fuzzy:
+                # Câu chỉ khác bản đã cache ở vài token được fuzzy TM dịch offline
+                match = self.safe.fuzzy.lookup(template, self.target_code)
+                translation = match.resolved if match else None
+            if translation is None and template in queued_templates:
+                translation = template      # Dùng chung bản dịch của template đã được tính
+            if translation is not None:
+                plan.cached += 1
+            else:
+                queued_templates.add(template)
+                plan.uncached_texts.append(text)
+        return plan
+
+    def estimate_safe_google(self, plans: List[ModPlan]) -> ProviderEstimate:
+        """Safe Google: chunk theo chunk size đã học, chunk nào còn text chưa cache mới tốn request"""
+        requests_count = 0
+        characters = 0
+        safe_chunk_size = self.safe.chunk_sizer.size(self.target_code)
+        for plan in plans:
+            pending = set(plan.uncached_texts)
+            for chunk in self.safe.split_text_into_chunks(plan.pending_texts, safe_chunk_size):
+                uncached = [text for text in chunk if text in pending]
+                if uncached:
+                    requests_count += 1
+                    characters += sum(len(text) for text in uncached)
+
+        # Mỗi request bị giới hạn bởi adaptive delay (min_delay, jitter trung bình 1.0) và RPM
+        per_request = max(self.safe.min_delay + self.latency, 60.0 / self.safe.max_requests_per_minute)
+        seconds = requests_count * per_request
+        # Vượt giới hạn giờ: mỗi block max_requests_per_hour chiếm trọn một giờ
+        hour_blocks = max(0, requests_count - 1) // self.safe.max_requests_per_hour
+        if hour_blocks:
+            remaining = requests_count - hour_blocks * self.safe.max_requests_per_hour
+            seconds = max(seconds, hour_blocks * 3600 + remaining * per_request)
+        note = f"{hour_blocks} hourly limit wait(s)" if hour_blocks else ''
+        return ProviderEstimate("Safe Google", requests_count, characters, seconds, note)
+
+    def estimate_fast_google(self, plans: List[ModPlan]) -> ProviderEstimate:
+        """Fast Google: không có cache, dịch toàn bộ pending texts"""
+        requests_count = 0
+        characters = 0
+        seconds = 0.0
+        fast_chunk_size = self.fast.chunk_sizer.size(self.target_code)
+        for plan in plans:
+            chunks = self.fast.split_text_into_chunks(plan.pending_texts, fast_chunk_size)
+            requests_count += len(chunks)
+            characters += sum(len(text) for text in plan.pending_texts)
+            seconds += len(chunks) * (self.fast.rate_limit_delay + 0.05 + self.latency)
+            seconds += max(0, len(chunks) - 1) * self.fast.chunk_delay
+        return ProviderEstimate("Google (Fast)", requests_count, characters, seconds)
+
+    def estimate_deepl(self, plans: List[ModPlan]) -> ProviderEstimate:
+        """DeepL: pack theo request size, gửi song song max_concurrency batch"""
+        requests_count = 0
+        characters = 0
+        seconds = 0.0
+        for plan in plans:
+            batches = self.deepl.pack_batches(plan.pending_texts)
+            requests_count += len(batches)
+            characters += sum(len(text) for text in plan.pending_texts)
+            seconds += math.ceil(len(batches) / self.deepl_concurrency) * self.latency
+
+        if self.deepl_remaining is None:
+            note = "quota unknown"
+        elif characters > self.deepl_remaining:
+            note = f"exceeds quota by {characters - self.deepl_remaining:,} chars"
+        else:
+            note = f"{characters / max(self.deepl_remaining, 1):.1%} of remaining quota"
+        return ProviderEstimate("DeepL", requests_count, characters, seconds, note)
+
+    def plan(self, mod_paths: List[str]) -> Dict[str, object]:
+        """
+        Dry-run toàn bộ job
+
+        Returns:
+            Dict với 'mods' (List[ModPlan]), 'invalid' (List[str]) và 'providers' (List[ProviderEstimate])
+        """
+        plans = []
+        invalid = []
+        for mod_path in mod_paths:
+            try:
+                plan = self.plan_mod(mod_path)
+            except Exception as e:
+                print(f"⚠️ Could not plan {mod_path}: {e}")
+                plan = None
+            if plan is None:
+                invalid.append(mod_path)
+            else:
+                plans.append(plan)
+
+        providers = [self.estimate_safe_google(plans), self.estimate_fast_google(plans),
+                     self.estimate_deepl(plans)]
+        return {'mods': plans, 'invalid': invalid, 'providers': providers}
+
+    @staticmethod
+    def format_report(result: Dict[str, object]) -> str:
+        """Bảng tổng hợp dry-run"""
+        plans: List[ModPlan] = result['mods']
+        lines = [f"{'mod':<32}{'strings':>9}{'chars':>10}{'terms':>7}{'cached':>8}{'to send':>9}"]
+        for plan in plans:
+            lines.append(f"{plan.name[:31]:<32}{plan.strings:>9}{plan.characters:>10,}"
+                         f"{plan.terminology_resolved:>7}{plan.cached:>8}{len(plan.uncached_texts):>9}")
+
+        total_strings = sum(plan.strings for plan in plans)
+        total_send = sum(len(plan.uncached_texts) for plan in plans)
+        lines.append(f"{'TOTAL':<32}{total_strings:>9}{sum(p.characters for p in plans):>10,}"
+                     f"{sum(p.terminology_resolved for p in plans):>7}{sum(p.cached for p in plans):>8}"
+                     f"{total_send:>9}")
+        if result['invalid']:
+            lines.append(f"Invalid mods (no info.json): {len(result['invalid'])}")
+
+        lines.append("")
+        lines.append(f"{'provider':<16}{'requests':>10}{'chars':>12}{'est. time':>12}  notes")
+        for estimate in result['providers']:
+            lines.append(f"{estimate.name:<16}{estimate.requests:>10}{estimate.characters:>12,}"
+                         f"{format_duration(estimate.seconds):>12}  {estimate.quota_note}")
+        return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Dry-run: ước lượng requests, ký tự và thời gian của một job dịch")
+    parser.add_argument('mods', nargs='+', help="Các file mod .zip")
+    parser.add_argument('--lang', default='VI', help="Target language")
+    parser.add_argument('--glossary', help="Glossary file cho terminology pass")
+    parser.add_argument('--cache-dir', default='translation_cache')
+    parser.add_argument('--latency', type=float, default=0.6, help="Latency giả định mỗi request (giây)")
+    parser.add_argument('--deepl-concurrency', type=int, default=4)
+    parser.add_argument('--deepl-remaining', type=int, help="Số ký tự DeepL còn lại")
+    parser.add_argument('--deepl-key', help="DeepL API key để đọc quota còn lại từ /usage")
+    parser.add_argument('--deepl-endpoint', default='api.deepl.com')
+    parser.add_argument('--all-languages', action='store_true', help="Không lọc nội dung tiếng Anh")
+    args = parser.parse_args(argv)
+
+    deepl_api = (DeepLAPI(args.deepl_key, args.deepl_endpoint, max_concurrency=args.deepl_concurrency)
+                 if args.deepl_key else None)
+    planner = JobPlanner(args.lang, args.glossary, not args.all_languages, args.cache_dir,
+                         args.latency, args.deepl_concurrency, args.deepl_remaining, deepl_api)
+    print(JobPlanner.format_report(planner.plan(args.mods)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,578 @@
+"""
+Multi-provider translation router
+
+Chia job thành các work unit và phân phối cho tất cả provider đang có
+capacity (Google, Safe Google, DeepL, local stub) dựa trên latency, error
+rate và quota thực tế. Unit lỗi được chuyển sang provider khác (failover),
+unit bị treo quá lâu được gửi song song cho provider rảnh (hedging).
+
+Bản dịch của mọi provider (trừ fallback) được ghi vào translation cache dùng
+chung, nên công việc failover/hedge không phải trả lại ở lần chạy sau.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from google_translate_core import GoogleTranslateAPI
+from google_translate_safe import SafeGoogleTranslateAPI
+from network_utils import DeepLAPI, QuotaExceededError
+from translation_cache import TranslationCache
+
+# Số giây tối đa giữa hai lần đọc budget request từ rate_limits.db
+CAPACITY_TTL = 1.0
+
+
+class ProviderError(Exception):
+    """Exception khi provider không dịch được một work unit"""
+    pass
+
+
+class TranslationProvider:
+    """Interface chung cho các translation backend"""
+
+    name = "provider"
+    # Chi phí tương đối cho mỗi ký tự (0 = miễn phí)
+    cost_per_char = 0.0
+    # Số request song song tối đa
+    max_concurrency = 1
+    # Kích thước tối đa một lần gọi translate()
+    max_batch_bytes = 3000
+    max_batch_items = 100
+    # Provider dự phòng chỉ dùng khi mọi provider khác không dùng được
+    fallback_only = False
+    # Provider tự ghi kết quả vào translation cache (router không ghi lại)
+    caches_results = False
+    # Target language của job hiện tại (router gán trước khi chạy)
+    target_lang: Optional[str] = None
+
+    def translate(self, texts: List[str], target_lang: str, source_lang: str = 'en') -> List[str]:
+        """
+        Dịch texts, raise exception nếu thất bại
+
+        Returns:
+            List bản dịch cùng độ dài với texts
+        """
+        raise NotImplementedError
+
+    def has_capacity(self, char_count: int) -> bool:
+        """Provider còn quota cho char_count ký tự mà không phải chờ không (gọi khi router giữ lock)"""
+        return True
+
+    def refresh_capacity(self):
+        """Đọc lại quota/budget từ nguồn chậm (router gọi ngoài lock, trước mỗi lượt chọn việc)"""
+        pass
+
+
+def adaptive_batch_bytes(provider: TranslationProvider) -> int:
+    """Batch size theo chunk size AIMD mà API đã học cho target language của job"""
+    api = provider.api
+    if not provider.target_lang:
+        return api.max_chunk_size
+    return api.chunk_sizer.size(api.get_language_code(provider.target_lang))
+
+
+class RequestBudget:
+    """Snapshot budget Google chung (rate_limits.db), đọc lại tối đa mỗi ``ttl`` giây"""
+
+    def __init__(self, api: SafeGoogleTranslateAPI, ttl: float = CAPACITY_TTL):
+        self.api = api
+        self.ttl = ttl
+        self.available = True
+        self.checked_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """Đếm request trong window phút/giờ nếu snapshot đã cũ (không gọi khi giữ lock router)"""
+        with self.lock:
+            now = time.monotonic()
+            if self.checked_at is not None and now - self.checked_at < self.ttl:
+                return
+            # Đọc budget chung, vì process/translator khác cũng có thể đang dùng nó
+            api = self.api
+            per_minute, per_hour = api.rate_limiter.counts((60, 3600))
+            self.available = per_minute < api.max_requests_per_minute and per_hour < api.max_requests_per_hour
+            self.checked_at = now
+
+
+class GoogleProvider(TranslationProvider):
+    """Adapter cho GoogleTranslateAPI (fast)"""
+
+    name = "google"
+    max_concurrency = 2
+    max_batch_bytes = property(adaptive_batch_bytes)
+
+    def __init__(self, api: Optional[GoogleTranslateAPI] = None,
+                 budget: Optional[SafeGoogleTranslateAPI] = None):
+        """
+        Args:
+            api: GoogleTranslateAPI (mặc định tạo mới)
+            budget: Safe translator có rate limiter chung; cùng endpoint Google nên
+                mỗi request của provider này cũng được tính vào budget đó
+        """
+        self.api = api or GoogleTranslateAPI()
+        self.budget = budget
+        self.capacity = RequestBudget(budget) if budget is not None else None
+
+    def translate(self, texts, target_lang, source_lang='en'):
+        target_lang = self.api.get_language_code(target_lang)
+        source_lang = self.api.get_language_code(source_lang)
+        if self.budget is not None:
+            with self.budget.lock:
+                self.budget.check_rate_limits()
+        return self.api.request_chunk(texts, target_lang, source_lang)
+
+    def has_capacity(self, char_count):
+        return self.capacity is None or self.capacity.available
+
+    def refresh_capacity(self):
+        if self.capacity is not None:
+            self.capacity.refresh()
+
+
+class SafeGoogleProvider(TranslationProvider):
+    """Adapter cho SafeGoogleTranslateAPI (cache + rate limit)"""
+
+    name = "safe-google"
+    max_batch_bytes = property(adaptive_batch_bytes)
+    caches_results = True
+
+    def __init__(self, api: Optional[SafeGoogleTranslateAPI] = None):
+        self.api = api or SafeGoogleTranslateAPI()
+        self.capacity = RequestBudget(self.api)
+
+    def translate(self, texts, target_lang, source_lang='en'):
+        target_lang = self.api.get_language_code(target_lang)
+        source_lang = self.api.get_language_code(source_lang)
+        try:
+            return self.api.translate_chunk_or_raise(texts, target_lang, source_lang)
+        except Exception:
+            self.api.stats['errors'] += 1
+            self.api.adaptive_delay(success=False)
+            raise
+
+    def has_capacity(self, char_count):
+        # Không nhận việc khi đã chạm limit, để check_rate_limits không phải ngủ
+        return self.capacity.available
+
+    def refresh_capacity(self):
+        self.capacity.refresh()
+
+
+class DeepLProvider(TranslationProvider):
+    """Adapter cho DeepLAPI, quota tính theo ký tự từ /usage"""
+
+    name = "deepl"
+    cost_per_char = 1.0
+
+    def __init__(self, api: DeepLAPI, glossary_id: Optional[str] = None):
+        self.api = api
+        self.glossary_id = glossary_id
+        self.max_concurrency = api.max_concurrency
+        self.max_batch_bytes = api.max_batch_bytes
+        self.max_batch_items = api.max_batch_size
+        self.remaining_characters = api.get_remaining_characters()
+        self.lock = threading.Lock()
+
+    def translate(self, texts, target_lang, source_lang='en'):
+        char_count = sum(len(text) for text in texts)
+        with self.lock:
+            if self.remaining_characters is not None:
+                self.remaining_characters -= char_count
+        try:
+            return self.api._translate_batch(texts, target_lang.upper(), self.glossary_id, source_lang.upper())
+        except QuotaExceededError:
+            with self.lock:
+                self.remaining_characters = 0
+            raise
+        except Exception:
+            # Request lỗi không tính vào quota
+            with self.lock:
+                if self.remaining_characters is not None:
+                    self.remaining_characters += char_count
+            raise
+
+    def has_capacity(self, char_count):
+        with self.lock:
+            return self.remaining_characters is None or self.remaining_characters >= char_count
+
+
+class LocalStubProvider(TranslationProvider):
+    """Provider offline: trả lại text gốc, dùng làm fallback cuối cùng"""
+
+    name = "local-stub"
+    max_concurrency = 1
+    max_batch_bytes = 1024 * 1024
+    max_batch_items = 10000
+    fallback_only = True
+
+    def __init__(self, translate_fn: Optional[Callable[[List[str], str, str], List[str]]] = None):
+        self.translate_fn = translate_fn
+
+    def translate(self, texts, target_lang, source_lang='en'):
+        if self.translate_fn:
+            return self.translate_fn(texts, target_lang, source_lang)
+        return list(texts)
+
+
+class ProviderStats:
+    """Thống kê live của một provider (EWMA latency và error rate)"""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.latency = None  # giây / request
+        self.seconds_per_char = None
+        self.error_rate = 0.0
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.chars = 0
+        self.in_flight = 0
+
+    def record_success(self, elapsed: float, char_count: int):
+        self.requests += 1
+        self.chars += char_count
+        self.consecutive_errors = 0
+        self.error_rate = (1 - self.alpha) * self.error_rate
+        per_char = elapsed / max(char_count, 1)
+        if self.latency is None:
+            self.latency = elapsed
+            self.seconds_per_char = per_char
+        else:
+            self.latency = (1 - self.alpha) * self.latency + self.alpha * elapsed
+            self.seconds_per_char = (1 - self.alpha) * self.seconds_per_char + self.alpha * per_char
+
+    def record_error(self, elapsed: float):
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_errors += 1
+        self.error_rate = (1 - self.alpha) * self.error_rate + self.alpha
+        # Exponential cooldown, cap 60s
+        self.cooldown_until = time.time() + min(2.0 ** self.consecutive_errors, 60.0)
+        if self.latency is not None:
+            self.latency = (1 - self.alpha) * self.latency + self.alpha * elapsed
+
+    def expected_seconds(self, char_count: int, default_latency: float) -> float:
+        """Thời gian dự kiến cho một unit, phạt theo error rate"""
+        if self.seconds_per_char is None:
+            estimate = default_latency
+        else:
+            estimate = max(self.latency or 0.0, self.seconds_per_char * char_count)
+        return estimate * (1 + 2 * self.error_rate)
+
+
+class WorkUnit:
+    """Một nhóm texts liên tiếp được dịch trong một request"""
+
+    def __init__(self, unit_id: int, indices: List[int], size: int, chars: int):
+        self.unit_id = unit_id
+        self.indices = indices
+        self.size = size
+        self.chars = chars
+        self.failures: Dict[str, int] = {}  # provider -> số lần lỗi
+        self.attempts: Dict[str, float] = {}  # provider -> start time
+        self.done = False
+
+
+def pack_units(texts: List[str], max_bytes: int) -> List[WorkUnit]:
+    """
+    Gom texts thành work units theo kích thước UTF-8, giữ nguyên index
+
+    Text lớn hơn max_bytes nằm riêng một unit.
+    """
+    units = []
+    current = []
+    current_size = 0
+    current_chars = 0
+
+    for i, text in enumerate(texts):
+        text_size = len(text.encode('utf-8')) + 1  # +1 cho '\n'
+        if current and current_size + text_size > max_bytes:
+            units.append(WorkUnit(len(units), current, current_size, current_chars))
+            current, current_size, current_chars = [], 0, 0
+        current.append(i)
+        current_size += text_size
+        current_chars += len(text)
+
+    if current:
+        units.append(WorkUnit(len(units), current, current_size, current_chars))
+    return units
+
+
+class TranslationRouter:
+    """Điều phối work units cho nhiều provider cùng lúc"""
+
+    def __init__(self, providers: List[TranslationProvider], unit_bytes: int = 3000,
+                 hedge_factor: float = 3.0, min_hedge_seconds: float = 10.0,
+                 cost_weight: float = 0.0, default_latency: float = 2.0,
+                 max_error_rate: float = 0.8, max_attempts_per_provider: int = 2,
+                 cache: Optional[TranslationCache] = None):
+        """
+        Args:
+            providers: Danh sách providers (theo thứ tự ưu tiên khi chưa có số liệu)
+            unit_bytes: Kích thước mỗi work unit
+            hedge_factor: Hedge khi unit chạy lâu hơn hedge_factor x latency trung bình
+            min_hedge_seconds: Thời gian tối thiểu trước khi hedge
+            cost_weight: Trọng số phạt chi phí (giây cho mỗi đơn vị cost)
+            default_latency: Latency giả định cho provider chưa có số liệu
+            max_error_rate: Error rate vượt ngưỡng này thì provider bị tạm ngưng
+            max_attempts_per_provider: Số lần thử tối đa một unit trên cùng provider
+            cache: Translation cache chung để ghi bản dịch của các provider không tự cache
+        """
+        if not providers:
+            raise ValueError("TranslationRouter needs at least one provider")
+        self.providers = list(providers)
+        # Đảm bảo luôn có đường thoát khi mọi provider đều lỗi
+        if not any(p.fallback_only for p in self.providers):
+            self.providers.append(LocalStubProvider())
+        self.unit_bytes = unit_bytes
+        self.hedge_factor = hedge_factor
+        self.min_hedge_seconds = min_hedge_seconds
+        self.cost_weight = cost_weight
+        self.default_latency = default_latency
+        self.max_error_rate = max_error_rate
+        self.max_attempts_per_provider = max_attempts_per_provider
+        self.cache = cache
+        self.stats: Dict[str, ProviderStats] = {p.name: ProviderStats() for p in self.providers}
+
+        self.condition = threading.Condition()
+        self.pending: List[WorkUnit] = []
+        self.in_flight: Dict[int, WorkUnit] = {}
+        self.results: List[str] = []
+        self.remaining_units = 0
+
+    # ----- Scheduling -----
+
+    def _is_excluded(self, provider: TranslationProvider, unit: WorkUnit) -> bool:
+        return unit.failures.get(provider.name, 0) >= self.max_attempts_per_provider
+
+    def _is_available(self, provider: TranslationProvider, unit: WorkUnit, now: float) -> bool:
+        stats = self.stats[provider.name]
+        if stats.cooldown_until > now:
+            return False
+        if stats.in_flight >= provider.max_concurrency:
+            return False
+        if self._is_excluded(provider, unit) or provider.name in unit.attempts:
+            return False
+        return provider.has_capacity(unit.chars)
+
+    def _score(self, provider: TranslationProvider, unit: WorkUnit) -> float:
+        stats = self.stats[provider.name]
+        expected = stats.expected_seconds(unit.chars, self.default_latency)
+        return expected + self.cost_weight * provider.cost_per_char * unit.chars
+
+    def _primary_usable(self, unit: WorkUnit, now: float) -> bool:
+        """Còn provider chính nào có thể nhận unit (kể cả khi đang bận) không"""
+        for provider in self.providers:
+            if provider.fallback_only or self._is_excluded(provider, unit):
+                continue
+            stats = self.stats[provider.name]
+            if stats.error_rate >= self.max_error_rate and stats.consecutive_errors >= 3:
+                continue
+            if provider.has_capacity(unit.chars):
+                return True
+        return False
+
+    def _best_score(self, unit: WorkUnit, now: float) -> Optional[float]:
+        scores = [self._score(p, unit) for p in self.providers
+                  if not p.fallback_only and not self._is_excluded(p, unit) and p.has_capacity(unit.chars)
+                  and self.stats[p.name].cooldown_until <= now]
+        return min(scores) if scores else None
+
+    def _take_batch(self, provider: TranslationProvider, now: float) -> List[WorkUnit]:
+        """Chọn các unit cho provider (gọi khi đang giữ lock)"""
+        taken = []
+        batch_bytes = 0
+        batch_items = 0
+        # Khi hàng đợi ngắn, provider chậm nhường unit cho provider nhanh
+        tail = len(self.pending) <= len(self.providers)
+
+        for unit in list(self.pending):
+            if not self._is_available(provider, unit, now):
+                continue
+            if provider.fallback_only and self._primary_usable(unit, now):
+                continue
+            if not provider.fallback_only and not taken and tail:
+                best = self._best_score(unit, now)
+                if best is not None and self._score(provider, unit) > 2 * best:
+                    continue
+            if taken and (batch_bytes + unit.size > provider.max_batch_bytes or
+                          batch_items + len(unit.indices) > provider.max_batch_items):
+                break
+            taken.append(unit)
+            batch_bytes += unit.size
+            batch_items += len(unit.indices)
+            if batch_bytes >= provider.max_batch_bytes:
+                break
+
+        for unit in taken:
+            self.pending.remove(unit)
+        return taken
+
+    def _take_hedge(self, provider: TranslationProvider, now: float) -> List[WorkUnit]:
+        """Chọn một unit đang chạy quá lâu để gửi song song (gọi khi đang giữ lock)"""
+        if provider.fallback_only:
+            return []
+        for unit in self.in_flight.values():
+            if unit.done or not self._is_available(provider, unit, now):
+                continue
+            for owner, started in unit.attempts.items():
+                owner_latency = self.stats[owner].latency or self.default_latency
+                if now - started > max(self.min_hedge_seconds, self.hedge_factor * owner_latency):
+                    logging.info(f"Hedging unit {unit.unit_id}: {owner} stalled, also sending to {provider.name}")
+                    return [unit]
+        return []
+
+    def _refresh_capacity(self):
+        for provider in self.providers:
+            provider.refresh_capacity()
+
+    def _acquire(self, provider: TranslationProvider) -> Optional[List[WorkUnit]]:
+        """Chờ đến khi có việc cho provider; None khi job kết thúc"""
+        while True:
+            # Budget có thể phải đọc từ disk: đọc một lần cho mỗi lượt chọn việc, ngoài lock
+            # để các worker khác không phải chờ I/O
+            self._refresh_capacity()
+            with self.condition:
+                if self.remaining_units == 0:
+                    return None
+                now = time.time()
+                units = self._take_batch(provider, now) or self._take_hedge(provider, now)
+                if units:
+                    stats = self.stats[provider.name]
+                    stats.in_flight += 1
+                    for unit in units:
+                        unit.attempts[provider.name] = now
+                        self.in_flight[unit.unit_id] = unit
+                    return units
+                self.condition.wait(timeout=1.0)
+
+    def _complete(self, provider: TranslationProvider, units: List[WorkUnit],
+                  translations: Optional[List[str]], elapsed: float):
+        with self.condition:
+            stats = self.stats[provider.name]
+            stats.in_flight -= 1
+            char_count = sum(unit.chars for unit in units)
+
+            if translations is not None:
+                stats.record_success(elapsed, char_count)
+                position = 0
+                for unit in units:
+                    unit_translations = translations[position:position + len(unit.indices)]
+                    position += len(unit.indices)
+                    unit.attempts.pop(provider.name, None)
+                    if unit.done:
+                        continue  # Hedge khác đã xong trước
+                    unit.done = True
+                    self.in_flight.pop(unit.unit_id, None)
+                    for i, translation in zip(unit.indices, unit_translations):
+                        self.results[i] = translation
+                    self.remaining_units -= 1
+            else:
+                stats.record_error(elapsed)
+                for unit in units:
+                    unit.attempts.pop(provider.name, None)
+                    unit.failures[provider.name] = unit.failures.get(provider.name, 0) + 1
+                    # Đưa lại vào hàng đợi nếu không còn attempt nào khác đang chạy
+                    if not unit.done and not unit.attempts:
+                        self.in_flight.pop(unit.unit_id, None)
+                        self.pending.insert(0, unit)
+
+            self.condition.notify_all()
+
+    def _worker(self, provider: TranslationProvider, texts: List[str], target_lang: str,
+                source_lang: str, progress_callback: Optional[Callable], total_units: int):
+        while True:
+            units = self._acquire(provider)
+            if units is None:
+                return
+
+            batch = [texts[i] for unit in units for i in unit.indices]
+            started = time.time()
+            try:
+                translations = provider.translate(batch, target_lang, source_lang)
+                if len(translations) != len(batch):
+                    raise ProviderError(
+                        f"{provider.name} returned {len(translations)} translations for {len(batch)} texts")
+            except Exception as e:
+                logging.warning(f"Provider {provider.name} failed on {len(batch)} texts: {e}")
+                translations = None
+
+            self._complete(provider, units, translations, time.time() - started)
+            if translations is not None:
+                self._cache_results(provider, batch, translations, target_lang, source_lang)
+
+            if progress_callback:
+                done_units = total_units - self.remaining_units
+                progress_callback(done_units, total_units, f"{provider.name}: unit {done_units}/{total_units}")
+
+    def _cache_results(self, provider: TranslationProvider, batch: List[str], translations: List[str],
+                       target_lang: str, source_lang: str):
+        """Ghi bản dịch vào cache chung (bỏ qua provider tự cache và fallback trả text gốc)"""
+        if self.cache is None or provider.caches_results or provider.fallback_only:
+            return
+        # Cùng key ngôn ngữ với SafeGoogleTranslateAPI.get_language_code
+        for text, translation in zip(batch, translations):
+            self.cache.put(text, translation, target_lang.lower(), source_lang.lower(), provider.name)
+
+    # ----- Public API -----
+
+    def translate_texts(self, texts: List[str], target_lang: str, source_lang: str = 'en',
+                        progress_callback: Optional[Callable] = None) -> List[str]:
+        """
+        Dịch texts bằng tất cả providers
+
+        Args:
+            texts: List of strings to translate
+            target_lang: Target language code (VI, JA, etc.)
+            source_lang: Source language code (default: 'en')
+            progress_callback: Optional callback(current, total, message)
+
+        Returns:
+            List of translated strings
+        """
+        if not texts:
+            return []
+
+        units = pack_units(texts, self.unit_bytes)
+        with self.condition:
+            self.pending = list(units)
+            self.in_flight = {}
+            self.results = list(texts)
+            self.remaining_units = len(units)
+
+        print(f"🔀 Router: {len(texts)} texts in {len(units)} units across "
+              f"{', '.join(p.name for p in self.providers)}")
+
+        threads = []
+        for provider in self.providers:
+            provider.target_lang = target_lang
+            for _ in range(provider.max_concurrency):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(provider, texts, target_lang, source_lang, progress_callback, len(units)),
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        if self.cache is not None:
+            try:
+                self.cache.save()
+            except Exception as e:
+                logging.warning(f"Could not save translation cache: {e}")
+        self.print_statistics()
+        return list(self.results)
+
+    def print_statistics(self):
+        """In thống kê từng provider"""
+        print(f"\n🔀 ROUTER STATISTICS:")
+        for provider in self.providers:
+            stats = self.stats[provider.name]
+            latency = f"{stats.latency:.2f}s" if stats.latency is not None else "n/a"
+            print(f"• {provider.name}: {stats.requests} requests, {stats.errors} errors, "
+                  f"{stats.chars:,} chars, latency {latency}")